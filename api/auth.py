@@ -0,0 +1,18 @@
+# api/auth.py
+from fastapi import APIRouter, Depends, HTTPException
+
+from app.auth.auth_service import AuthService
+from app.auth.schemas.login_request import LoginRequest, TokenResponse
+from api.dependencies import get_auth_service
+from core.exceptions.base import CustomException
+
+auth_router = APIRouter()
+
+@auth_router.post("/auth/login", response_model=TokenResponse)
+async def login(credentials: LoginRequest, service: AuthService = Depends(get_auth_service)):
+    try:
+        return await service.login(credentials.username, credentials.password)
+    except (HTTPException, CustomException) as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error logging in: {str(e)}")
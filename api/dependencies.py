@@ -1,9 +1,79 @@
 # api/dependencies.py
+from typing import Any, Dict, Optional
+
+from fastapi import Depends
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+
+from app.auth.auth_service import AuthService
+from app.user.interfaces.i_user_repo import IUserRepository
+from app.user.user_memory_repo import InMemoryUserRepository
+from app.user.user_partitioned_repo import PartitionedUserRepository
 from app.user.user_repo import UserRepository
+from app.user.user_model import UserStatus
 from app.user.user_service import UserService
-from core.db.database import get_db_connection
+from core.config import config
+from core.container import Container
+from core.db.database import MongoDBConnection, get_db_connection
+from core.db.idempotency import IdempotencyStore
+from core.db.partitions import PartitionSet
+from core.exceptions.base import ForbiddenException, UnauthorizedException
+from core.security.jwt import decode_token
+from core.security.rate_limit import TokenBucketLimiter
+
+bearer_scheme = HTTPBearer(auto_error=False)
+
+def build_container() -> Container:
+    """Register repositories and services once; they are app-scoped singletons"""
+    container = Container()
+    container.register(MongoDBConnection, lambda c: get_db_connection())
+    if config.REPOSITORY_BACKEND == "memory":
+        container.register(IUserRepository, lambda c: InMemoryUserRepository())
+    elif config.REPOSITORY_BACKEND == "partitioned":
+        container.register(PartitionSet, lambda c: PartitionSet.from_config())
+        container.register(IUserRepository, lambda c: PartitionedUserRepository(c.resolve(PartitionSet)))
+    else:
+        container.register(IUserRepository, lambda c: UserRepository(c.resolve(MongoDBConnection)))
+    container.register(UserService, lambda c: UserService(c.resolve(IUserRepository)))
+    container.register(AuthService, lambda c: AuthService(c.resolve(IUserRepository)))
+    container.register(IdempotencyStore, lambda c: IdempotencyStore(
+        c.resolve(MongoDBConnection), config.IDEMPOTENCY_TTL_SECONDS, config.IDEMPOTENCY_LOCK_SECONDS
+    ))
+    if config.RATE_LIMIT_ENABLED:
+        container.register(TokenBucketLimiter, lambda c: TokenBucketLimiter.from_config())
+    return container
+
+container = build_container()
+
+get_user_repository = container.provider(IUserRepository)
+get_user_service = container.provider(UserService)
+get_auth_service = container.provider(AuthService)
+
+async def get_current_user(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme),
+) -> Dict[str, Any]:
+    """Claims of the verified bearer token; 401 when missing or invalid"""
+    if credentials is None:
+        raise UnauthorizedException("Missing bearer token")
+    return decode_token(credentials.credentials)
+
+async def require_auth(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme),
+) -> Optional[Dict[str, Any]]:
+    """get_current_user when AUTH_REQUIRED is set; otherwise tokens are checked only if sent"""
+    if credentials is None and not config.AUTH_REQUIRED:
+        return None
+    return await get_current_user(credentials)
 
-def get_user_service():
-    db = get_db_connection()
-    repository = UserRepository(db)
-    return UserService(repository)
\ No newline at end of file
+async def require_admin(
+    claims: Dict[str, Any] = Depends(get_current_user),
+    repository: IUserRepository = Depends(get_user_repository),
+) -> Dict[str, Any]:
+    """
+    A valid token for a live, active user holding ADMIN_ROLE, regardless of
+    AUTH_REQUIRED. Roles are read from the user rather than the token, so a
+    revoked role or suspension applies before the token expires.
+    """
+    user = await repository.get_by_id(claims["sub"])
+    if user is None or not user.is_active or user.status != UserStatus.ACTIVE or config.ADMIN_ROLE not in user.roles:
+        raise ForbiddenException("Admin role required")
+    return claims
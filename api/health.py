@@ -1,6 +1,8 @@
 from fastapi import APIRouter, HTTPException, Response, status
 from fastapi.responses import JSONResponse
+from app.common.query import query_plans
 from core.db.database import MongoDBConnection
+from core.observability.metrics import metrics
 from pydantic import BaseModel
 health_router = APIRouter()
 
@@ -12,6 +14,20 @@ async def health():
     """
     return {"status": "OK"}
 
+@health_router.get("/health/metrics")
+async def get_metrics():
+    """
+    Process-local metrics snapshot
+    """
+    return metrics.snapshot()
+
+@health_router.get("/health/query-plans")
+async def get_query_plans():
+    """
+    Winning plan per repository method and query shape, as seen by QUERY_PLAN_GUARD
+    """
+    return query_plans.report()
+
 @health_router.get("/health/database")
 async def check_database_health():
     try:
@@ -1,48 +1,137 @@
 # api/routes/user_routes.py
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from datetime import datetime
+from typing import List, Optional
 
 from app.user.user_service import UserService
 from app.user.user_model import User
+from app.user.schemas.user_activity_response import ActiveUsersResponse, LoginHistoryResponse
 from app.user.schemas.user_create_request import UserCreateRequest, UserUpdateRequest
-from api.dependencies import get_user_service
+from app.user.schemas.user_bulk_request import BulkWriteResponse, UserBulkDeleteRequest, UserBulkUpdateRequest
+from app.user.schemas.user_search_response import UserSearchResponse
+from app.user.schemas.user_stats_response import UserStatsResponse
+from api.dependencies import get_user_service, require_admin, require_auth
+from core.cache.response_cache import response_cache
+from core.config import config
+from core.exceptions.base import CustomException
 
 user_router = APIRouter()
 
 @user_router.post("/users", response_model=User)
 async def create_user(user_data: UserCreateRequest, service: UserService = Depends(get_user_service)):
     try:
-        print(user_data)
         user = await service.create_user(user_data.model_dump())
         return user
-    except HTTPException as e:
+    except (HTTPException, CustomException) as e:
         raise e
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error creating user: {str(e)}")
 
-@user_router.get("/users/{user_id}", response_model=User)
+# Declared before /users/{user_id} so "stats", "search" and "active" aren't taken for an id
+@user_router.get("/users/stats", response_model=UserStatsResponse, dependencies=[Depends(require_auth)])
+async def get_user_stats(service: UserService = Depends(get_user_service)):
+    try:
+        return await service.get_user_stats()
+    except (HTTPException, CustomException) as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching user stats: {str(e)}")
+
+@user_router.get("/users/search", response_model=UserSearchResponse, dependencies=[Depends(require_auth)])
+async def search_users(
+    q: str,
+    field: Optional[List[str]] = Query(default=None, description="username, email or full_name; all by default"),
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    service: UserService = Depends(get_user_service),
+):
+    try:
+        items, next_cursor = await service.search_users(q, field, limit, cursor)
+        return UserSearchResponse(items=items, next_cursor=next_cursor)
+    except (HTTPException, CustomException) as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error searching users: {str(e)}")
+
+@user_router.get("/users/active", response_model=ActiveUsersResponse, dependencies=[Depends(require_auth)])
+async def get_active_users_between(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = 100,
+    service: UserService = Depends(get_user_service),
+):
+    try:
+        return await service.get_active_users_between(since, until, limit)
+    except (HTTPException, CustomException) as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching active users: {str(e)}")
+
+@user_router.get("/users/{user_id}/logins", response_model=LoginHistoryResponse, dependencies=[Depends(require_auth)])
+async def get_recent_logins(user_id: str, limit: int = 10, service: UserService = Depends(get_user_service)):
+    try:
+        logins = await service.get_recent_logins(user_id, limit)
+        return LoginHistoryResponse(user_id=user_id, logins=logins)
+    except (HTTPException, CustomException) as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching login history: {str(e)}")
+
+@user_router.get("/users/{user_id}", response_model=User, dependencies=[Depends(require_auth)])
 async def get_user(user_id: str, service: UserService = Depends(get_user_service)):
     try:
         user = await service.get_user(user_id)
         return user
-    except HTTPException as e:
+    except (HTTPException, CustomException) as e:
         raise e
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching user: {str(e)}")
 
-@user_router.get("/users", response_model=List[User])
+@user_router.get("/users", response_model=List[User], dependencies=[Depends(require_auth)])
 async def get_all_users(
+    request: Request,
     skip: int = 0, 
     limit: int = 100, 
     service: UserService = Depends(get_user_service)
 ):
     try:
-        users = await service.get_all_users(skip, limit)
-        return users
+        return await response_cache.respond(
+            request,
+            collections=("users",),
+            params={"skip": skip, "limit": limit},
+            response_model=List[User],
+            produce=(
+                (lambda: service.get_all_users_json(skip, limit))
+                if config.RAW_JSON_READS_ENABLED
+                else (lambda: service.get_all_users(skip, limit))
+            ),
+        )
+    except (HTTPException, CustomException) as e:
+        raise e
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching users: {str(e)}")
 
-@user_router.put("/users/{user_id}", response_model=User)
+@user_router.post("/users/bulk/update", response_model=BulkWriteResponse, dependencies=[Depends(require_admin)])
+async def bulk_update_users(request: UserBulkUpdateRequest, service: UserService = Depends(get_user_service)):
+    try:
+        result = await service.bulk_update_users(request.filter, request.set.model_dump(exclude_none=True), request.dry_run)
+        return BulkWriteResponse(**result, dry_run=request.dry_run)
+    except (HTTPException, CustomException) as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error updating users: {str(e)}")
+
+@user_router.post("/users/bulk/delete", response_model=BulkWriteResponse, dependencies=[Depends(require_admin)])
+async def bulk_delete_users(request: UserBulkDeleteRequest, service: UserService = Depends(get_user_service)):
+    try:
+        result = await service.bulk_delete_users(request.filter, request.dry_run)
+        return BulkWriteResponse(**result, dry_run=request.dry_run)
+    except (HTTPException, CustomException) as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error deleting users: {str(e)}")
+
+@user_router.put("/users/{user_id}", response_model=User, dependencies=[Depends(require_auth)])
 async def update_user(
     user_id: str, 
     update_data: UserUpdateRequest, 
@@ -51,12 +140,12 @@ async def update_user(
     try:
         user = await service.update_user(user_id, update_data.model_dump(exclude_unset=True))
         return user
-    except HTTPException as e:
+    except (HTTPException, CustomException) as e:
         raise e
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error updating user: {str(e)}")
 
-@user_router.delete("/users/{user_id}")
+@user_router.delete("/users/{user_id}", dependencies=[Depends(require_auth)])
 async def delete_user(user_id: str, service: UserService = Depends(get_user_service)):
     try:
         result = await service.delete_user(user_id)
@@ -64,7 +153,7 @@ async def delete_user(user_id: str, service: UserService = Depends(get_user_serv
             return {"message": "User deleted successfully"}
         else:
             raise HTTPException(status_code=404, detail="User not found")
-    except HTTPException as e:
+    except (HTTPException, CustomException) as e:
         raise e
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error deleting user: {str(e)}")
\ No newline at end of file
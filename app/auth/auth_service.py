@@ -0,0 +1,50 @@
+# app/auth/auth_service.py
+import logging
+
+from fastapi import HTTPException
+
+from app.auth.schemas.login_request import TokenResponse
+from app.user.interfaces.i_user_repo import IUserRepository
+from app.user.user_model import UserStatus
+from core.config import config
+from core.security.jwt import ACCESS_TOKEN, REFRESH_TOKEN, create_token
+from core.security.password import hash_password, needs_rehash, verify_dummy_password, verify_password
+
+logger = logging.getLogger(__name__)
+
+class AuthService:
+    def __init__(self, user_repository: IUserRepository):
+        self.user_repository = user_repository
+
+    async def login(self, username: str, password: str) -> TokenResponse:
+        """Verify credentials and issue an access/refresh token pair."""
+        if "@" in username:
+            user = await self.user_repository.get_by_email(username)
+        else:
+            user = await self.user_repository.get_by_username(username)
+
+        if not user:
+            await verify_dummy_password(password)
+            raise HTTPException(status_code=401, detail="Invalid credentials")
+        if not await verify_password(password, user.password_hash):
+            raise HTTPException(status_code=401, detail="Invalid credentials")
+        if not user.is_active or user.status != UserStatus.ACTIVE:
+            raise HTTPException(status_code=403, detail="User is inactive")
+
+        await self.user_repository.update_last_login(user.id)
+        if needs_rehash(user.password_hash):
+            await self._rehash(user.id, password)
+        claims = {"username": user.username}
+        return TokenResponse(
+            access_token=create_token(user.id, ACCESS_TOKEN, claims),
+            refresh_token=create_token(user.id, REFRESH_TOKEN, claims),
+            expires_in=config.ACCESS_TOKEN_MAXAGE * 60,
+        )
+
+    async def _rehash(self, user_id: str, password: str) -> None:
+        """Re-hash at the current cost; only possible now, while the plaintext is at hand"""
+        try:
+            await self.user_repository.update(user_id, {"password_hash": await hash_password(password)})
+        except Exception as e:
+            # Login already succeeded; the next one retries
+            logger.error(f"Failed to rehash password for {user_id}: {str(e)}")
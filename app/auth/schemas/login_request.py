@@ -0,0 +1,12 @@
+# app/auth/schemas/login_request.py
+from pydantic import BaseModel, Field
+
+class LoginRequest(BaseModel):
+    username: str = Field(..., description="Username or email")
+    password: str
+
+class TokenResponse(BaseModel):
+    access_token: str
+    refresh_token: str
+    token_type: str = "bearer"
+    expires_in: int
@@ -0,0 +1,153 @@
+# app/common/archival.py
+import asyncio
+import logging
+import os
+import socket
+from datetime import datetime, timedelta
+from typing import Optional
+
+from pymongo import ASCENDING, DeleteOne, ReplaceOne, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from core.db.checkpoints import CheckpointStore
+from core.db.database import MongoDBConnection
+from core.observability.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class SoftDeleteArchiver:
+    """
+    Moves soft-deleted documents older than the retention window from a hot
+    collection into `<collection>_archive`.
+
+    Each batch is upserted into the archive before it is removed from the hot
+    collection, so a batch interrupted halfway is simply redone on the next run.
+    Only one archiver per collection holds the lease at a time, so workers and
+    the CLI never walk the shared checkpoint concurrently.
+    """
+
+    lease_collection_name = "archival_leases"
+
+    def __init__(
+        self,
+        collection_name: str,
+        db: MongoDBConnection,
+        retention_days: int = 30,
+        batch_size: int = 500,
+        batch_pause_seconds: float = 0.5,
+        lease_seconds: float = 60.0,
+    ):
+        self.collection_name = collection_name
+        self.collection = db.get_collection(collection_name)
+        self.archive = db.get_collection(f"{collection_name}_archive")
+        self.checkpoints = CheckpointStore(db)
+        self.checkpoint_name = f"archival:{collection_name}"
+        self.retention = timedelta(days=retention_days)
+        self.batch_size = batch_size
+        self.batch_pause_seconds = batch_pause_seconds
+        self.lease = timedelta(seconds=lease_seconds)
+        self.leases = db.get_collection(self.lease_collection_name)
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{id(self)}"
+        self._index_ready = False
+
+        self._archived = metrics.counter("archival_documents_archived_total", collection=collection_name)
+        self._batches = metrics.counter("archival_batches_total", collection=collection_name)
+        self._last_batch_at = metrics.gauge("archival_last_batch_timestamp", collection=collection_name)
+        self._last_run_archived = metrics.gauge("archival_last_run_archived", collection=collection_name)
+
+    async def _ensure_index(self) -> None:
+        if self._index_ready:
+            return
+        # Partial index: only the dead documents are indexed, so it stays small
+        await self.collection.create_index(
+            [("is_deleted", ASCENDING), ("_id", ASCENDING)],
+            name="archival_soft_deleted",
+            partialFilterExpression={"is_deleted": True},
+        )
+        self._index_ready = True
+
+    async def _acquire_lease(self, hold: Optional[timedelta] = None) -> bool:
+        """Take or renew the lease for `hold` (default: the lease length)"""
+        now = datetime.utcnow()
+        try:
+            lease = await self.leases.find_one_and_update(
+                {"_id": self.checkpoint_name, "$or": [{"owner": self.owner}, {"expires_at": {"$lt": now}}]},
+                {"$set": {"owner": self.owner, "expires_at": now + (hold or self.lease)}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+        except DuplicateKeyError:
+            # Held by another live archiver (the upsert collided with its document)
+            return False
+        return lease is not None and lease["owner"] == self.owner
+
+    async def archive_batch(self, cutoff: datetime, after_id: Optional[str]) -> Optional[str]:
+        """Archive one batch; returns the last `_id` processed, or None when nothing is left"""
+        query = {"is_deleted": True, "updated_at": {"$lt": cutoff}}
+        if after_id is not None:
+            query["_id"] = {"$gt": after_id}
+        docs = await self.collection.find(query).sort("_id", ASCENDING).limit(self.batch_size).to_list(None)
+        if not docs:
+            return None
+
+        archived_at = datetime.utcnow()
+        await self.archive.bulk_write(
+            [ReplaceOne({"_id": doc["_id"]}, {**doc, "archived_at": archived_at}, upsert=True) for doc in docs],
+            ordered=False,
+        )
+        await self.collection.bulk_write(
+            [DeleteOne({"_id": doc["_id"], "is_deleted": True}) for doc in docs],
+            ordered=False,
+        )
+
+        last_id = docs[-1]["_id"]
+        await self.checkpoints.save(self.checkpoint_name, last_id)
+        self._archived.inc(len(docs))
+        self._batches.inc()
+        self._last_batch_at.set(archived_at.timestamp())
+        return last_id
+
+    async def run_once(self) -> Optional[int]:
+        """
+        Archive everything past retention, resuming from the stored checkpoint.
+        Returns None without doing anything if another archiver holds the lease.
+        """
+        if not await self._acquire_lease():
+            logger.info(f"Archival of {self.collection_name} is running elsewhere; skipping")
+            return None
+        await self._ensure_index()
+        cutoff = datetime.utcnow() - self.retention
+        after_id = await self.checkpoints.get(self.checkpoint_name)
+        archived_before = self._archived.value
+        logger.info(f"Archiving soft-deleted {self.collection_name} older than {cutoff.isoformat()} (resume after {after_id})")
+
+        while True:
+            last_id = await self.archive_batch(cutoff, after_id)
+            if last_id is None:
+                # Pass complete: the next run starts from the beginning again
+                await self.checkpoints.clear(self.checkpoint_name)
+                break
+            after_id = last_id
+            await asyncio.sleep(self.batch_pause_seconds)
+            if not await self._acquire_lease():
+                # Stalled past the lease and taken over; the new holder resumes from the checkpoint
+                logger.warning(f"Lost the archival lease for {self.collection_name}; stopping")
+                break
+
+        archived = self._archived.value - archived_before
+        self._last_run_archived.set(archived)
+        logger.info(f"Archived {archived} documents from {self.collection_name}")
+        return archived
+
+    async def run_forever(self, interval_seconds: float) -> None:
+        while True:
+            try:
+                if await self.run_once() is not None:
+                    # Hold the lease until the next run is due, so other workers don't repeat this pass
+                    await self._acquire_lease(hold=timedelta(seconds=interval_seconds) + self.lease)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Archival of {self.collection_name} failed: {str(e)}")
+            await asyncio.sleep(interval_seconds)
@@ -1,14 +1,27 @@
 # app/common/base_model.py
-from datetime import datetime
-from typing import Optional
+from datetime import datetime, timezone
+from typing import ClassVar, Optional, Tuple
 from pydantic import BaseModel, Field
 
+def naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Timestamps are stored as naive UTC (datetime.utcnow()); bring aware ones into line"""
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
 class BaseDBModel(BaseModel):
+    # Bump when the stored shape changes and register an upgrade from the previous version
+    SCHEMA_VERSION: ClassVar[int] = 0
+    # Fields with a normalized shadow under "search.<field>" for prefix search
+    SEARCH_FIELDS: ClassVar[Tuple[str, ...]] = ()
+
     id: Optional[str] = Field(default=None, alias="_id")
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
     is_active: bool = True
     is_deleted: bool = False
+    # Version the stored document was written at; documents predating versioning are 0
+    schema_version: int = 0
 
     class Config:
         populate_by_name = True
@@ -1,65 +1,424 @@
 # app/common/base_repo.py
-from typing import TypeVar, Generic, List, Optional, Type, Dict, Any
+import logging
+from contextlib import asynccontextmanager
+from typing import TypeVar, List, Optional, Type, Dict, Any, Callable, Awaitable, Sequence, Tuple
 from pydantic import BaseModel
 from datetime import datetime
 import uuid
-from core.db.database import MongoDBConnection
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.read_concern import ReadConcern
+from pymongo.write_concern import WriteConcern
+from app.common.counters import CounterDocument
+from app.common.ibase_repo import IBaseRepository
+from app.common.query import CompiledQuery, Query, check_query_plan
+from app.common.raw_json import RAW_CODEC_OPTIONS, JsonDocumentEncoder
+from app.common.schema import schema_upgrades
+from app.common.search import SEARCH_FIELD, prefix_search, search_indexes, search_keys
+from core.cache.read_cache import ReadCache, get_read_cache
+from core.cache.response_cache import generations
+from core.config import config
+from core.db.causal import current_causal_context
+from core.db.circuit_breaker import CircuitOpenException, is_transient_failure
+from core.db.database import MongoDBConnection, read_preference_from_name
+from core.db.hedging import get_hedged_reader
+from core.db.outbox import CREATE, DELETE, UPDATE, Outbox, compact_changes, outbox_event
+
+logger = logging.getLogger(__name__)
 
 T = TypeVar('T', bound=BaseModel)
 
-class BaseRepository(Generic[T]):
-    def __init__(self, model_class: Type[T], collection_name: str, db: MongoDBConnection):
+class BaseRepository(IBaseRepository[T]):
+    # Index key lists created by ensure_indexes(); subclasses extend this
+    indexes: Sequence[Sequence[Tuple[str, int]]] = (
+        [("is_deleted", ASCENDING), ("created_at", ASCENDING), ("_id", ASCENDING)],
+    )
+    # Stored fields that can be queried but aren't (yet) declared on the model
+    extra_query_fields: Sequence[str] = ()
+    # Fields never copied into outbox change events (e.g. secrets)
+    outbox_exclude_fields: Sequence[str] = ()
+
+    def __init__(
+        self,
+        model_class: Type[T],
+        collection_name: str,
+        db: MongoDBConnection,
+        read_cache: Optional[ReadCache] = None,
+        counters: Optional[CounterDocument] = None,
+        outbox: Optional[Outbox] = None,
+    ):
         self.model = model_class
         self.collection_name = collection_name
         self.db = db
         self.collection = db.get_collection(collection_name)
+        if config.CAUSAL_CONSISTENCY_ENABLED:
+            # Causal guarantees only hold with majority reads and writes
+            self.collection = self.collection.with_options(
+                read_concern=ReadConcern("majority"),
+                write_concern=WriteConcern("majority"),
+            )
+        if read_cache is None and config.READ_CACHE_ENABLED:
+            read_cache = get_read_cache(collection_name)
+        self.read_cache = read_cache
+        self.counters = counters
+        if outbox is None and config.OUTBOX_ENABLED:
+            outbox = Outbox(db, config.OUTBOX_RETENTION_SECONDS)
+        self.outbox = outbox
+        self._hedge_collection = None
+        self._read_collections = {}
+        self.json_encoder = JsonDocumentEncoder(model_class, self._to_model)
+
+    def _to_model(self, doc: Optional[Dict[str, Any]]) -> Optional[T]:
+        """Validate a stored document, upgrading it to the current schema version first"""
+        if doc is None:
+            return None
+        doc, _ = schema_upgrades.upgrade(self.model, doc)
+        return self.model.model_validate(doc)
+
+    async def _execute(self, operation: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """Run a database operation through the connection's circuit breaker"""
+        return await self.db.circuit_breaker.call(operation, *args, **kwargs)
+
+    def _read_collection(self, op_name: str, raw: bool = False):
+        """Collection handle carrying the read preference configured for `op_name`, optionally returning raw BSON"""
+        collection = self._read_collections.get((op_name, raw))
+        if collection is None:
+            mode = config.READ_PREFERENCE_ROUTING.get(op_name, "primary")
+            options = {"read_preference": read_preference_from_name(mode)}
+            if raw:
+                options["codec_options"] = RAW_CODEC_OPTIONS
+            collection = self.collection.with_options(**options)
+            self._read_collections[(op_name, raw)] = collection
+        return collection
+
+    @asynccontextmanager
+    async def _session(self, required: bool = False):
+        """
+        Causally consistent session bound to the current request's causal token.
+        Yields None when there is no token, unless a session is `required`.
+        """
+        context = current_causal_context()
+        if context is None and not required:
+            yield None
+            return
+        async with await self.db.client.start_session(causal_consistency=context is not None) as session:
+            if context is not None:
+                context.apply_to(session)
+            try:
+                yield session
+            finally:
+                if context is not None:
+                    context.update_from(session)
+
+    async def _in_session(self, work: Callable[[Any], Awaitable[Any]], transaction: bool = False) -> Any:
+        """
+        Run `work(session)`, inside a transaction if asked to. Transactions go
+        through with_transaction, which reruns `work` on TransientTransactionError
+        and retries commits with UnknownTransactionCommitResult, so `work` must
+        only touch the database through the session.
+        """
+        async with self._session(required=transaction) as session:
+            if transaction:
+                return await session.with_transaction(work)
+            return await work(session)
+
+    async def _outbox_transaction(self) -> bool:
+        """Whether writes should run in a transaction so their outbox events commit with them"""
+        return self.outbox is not None and await self.db.supports_transactions()
+
+    async def _transact(self, work: Callable[[Any], Awaitable[Any]]) -> Any:
+        """Run a write and its outbox events through the circuit breaker, in one transaction when possible"""
+        async def run():
+            return await self._in_session(work, await self._outbox_transaction())
+        return await self._execute(run)
+
+    async def _append_events(self, op: str, docs: List[Tuple[Any, Optional[Dict[str, Any]]]], session) -> None:
+        """Record (doc_id, changes) events in the outbox with the same session as the write"""
+        if self.outbox is None:
+            return
+        exclude = (*self.outbox_exclude_fields, SEARCH_FIELD)
+        events = [
+            outbox_event(self.collection_name, op, doc_id, compact_changes(changes or {}, exclude))
+            for doc_id, changes in docs
+        ]
+        if session is not None and session.in_transaction:
+            await self.outbox.append(events, session=session)
+            return
+        try:
+            await self.outbox.append(events, session=session)
+        except Exception as e:
+            # Without a transaction the write has already happened; the events are lost
+            logger.error(f"Failed to record {op} events for {self.collection_name}: {str(e)}")
+
+    async def _find_one(self, query: Dict[str, Any], op_name: str, consistent: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        find_one, hedged against a second read preference when hedged reads are
+        enabled. `consistent` reads go to the primary only, never hedged.
+        """
+        async def attempt(collection):
+            async with self._session() as session:
+                return await collection.find_one(query, session=session)
+
+        if consistent:
+            return await attempt(self.collection)
+        collection = self._read_collection(op_name)
+        if not config.HEDGED_READS_ENABLED:
+            return await attempt(collection)
+        if self._hedge_collection is None:
+            self._hedge_collection = self.collection.with_options(
+                read_preference=read_preference_from_name(config.HEDGE_READ_PREFERENCE)
+            )
+        reader = get_hedged_reader(f"{self.collection_name}.{op_name}")
+        return await reader.read(lambda: attempt(collection), lambda: attempt(self._hedge_collection))
+
+    async def _find_many(self, compiled: CompiledQuery, op_name: str, raw: bool = False) -> List[Dict[str, Any]]:
+        """Run a compiled query with the read preference configured for `op_name`"""
+        collection = self._read_collection(op_name)
+        reader = self._read_collection(op_name, raw) if raw else collection
+
+        async def fetch():
+            await check_query_plan(collection, op_name, compiled)
+            async with self._session() as session:
+                cursor = reader.find(compiled.filter, compiled.projection, session=session)
+                if compiled.sort:
+                    cursor = cursor.sort(compiled.sort)
+                cursor = cursor.skip(compiled.skip).limit(compiled.limit)
+                return [doc async for doc in cursor]
+
+        return await self._execute(fetch)
+
+    async def find_documents(self, compiled: CompiledQuery, op_name: str) -> List[Dict[str, Any]]:
+        """Run a compiled query and return the stored documents, for callers merging several repositories"""
+        return await self._find_many(compiled, op_name)
+
+    def query(self) -> Query[T]:
+        """Start a query over live (not soft-deleted) documents"""
+        return Query(self.model, self.extra_query_fields).eq("is_deleted", False)
+
+    async def find(self, query: Query[T], op_name: str) -> List[T]:
+        """Run a built query; `op_name` identifies the caller in the query plan report"""
+        docs = await self._find_many(query.compile(), op_name)
+        return [self._to_model(doc) for doc in docs]
+
+    async def find_json(self, query: Query[T], op_name: str) -> bytes:
+        """
+        find(), returned as the JSON array a route would send. Documents are
+        fetched as raw BSON and encoded without building models.
+        """
+        compiled = query.compile()
+        if compiled.projection is not None:
+            # Partial documents can't be encoded as the full model
+            return self.json_encoder.encode(
+                item.model_dump(by_alias=True) for item in await self.find(query, op_name)
+            )
+        compiled.projection = self.json_encoder.projection
+        docs = await self._find_many(compiled, op_name, raw=True)
+        return self.json_encoder.encode_raw(docs, self.collection.codec_options)
+
+    async def search(self, prefix: str, fields: Sequence[str], limit: int, cursor: Optional[str] = None) -> Tuple[List[T], Optional[str]]:
+        """Prefix search over the model's SEARCH_FIELDS; see app.common.search"""
+        return await prefix_search(self, prefix, fields, limit, cursor)
+
+    async def ensure_indexes(self) -> None:
+        """Create the indexes declared on the repository"""
+        for keys in [*self.indexes, *search_indexes(self.model.SEARCH_FIELDS)]:
+            try:
+                await self.collection.create_index(list(keys))
+            except Exception as e:
+                logger.error(f"Failed to create index {keys} on {self.collection_name}: {str(e)}")
+        if self.outbox is not None:
+            await self.outbox.ensure_indexes()
+
+    async def _find_one_cached(
+        self, cache_key: str, query: Dict[str, Any], op_name: str, consistent: bool = False
+    ) -> Optional[Dict[str, Any]]:
+        """
+        find_one through the read cache, if one is configured. While the database
+        is unreachable, stale cache entries are served instead of failing.
+        `consistent` reads (e.g. uniqueness checks) skip the cache and go to the primary.
+        """
+        if consistent:
+            return await self._execute(self._find_one, query, op_name, consistent=True)
+        if self.read_cache is not None:
+            doc = self.read_cache.get(cache_key)
+            if doc is not None:
+                return doc
+        try:
+            doc = await self._execute(self._find_one, query, op_name)
+        except Exception as e:
+            if self.read_cache is None or not (isinstance(e, CircuitOpenException) or is_transient_failure(e)):
+                raise
+            doc = self.read_cache.get(cache_key, allow_stale=True)
+            if doc is None:
+                raise
+            return doc
+        if doc is not None and self.read_cache is not None:
+            self.read_cache.set(cache_key, doc)
+        return doc
+
+    def _invalidate_cached(self, id: str) -> None:
+        if self.read_cache is not None:
+            self.read_cache.invalidate(id)
 
     async def create(self, item: T) -> T:
         """Create a new item in the database"""
         data = item.model_dump(by_alias=True)
-        
+
         # Generate a new string ID if not present
         if "_id" not in data or not data["_id"]:
             data["_id"] = str(uuid.uuid4())
-        
+
         # Add metadata fields
         data["created_at"] = datetime.utcnow()
         data["updated_at"] = datetime.utcnow()
         data["is_deleted"] = False
+        data["schema_version"] = self.model.SCHEMA_VERSION
+        if self.model.SEARCH_FIELDS:
+            data[SEARCH_FIELD] = search_keys(self.model.SEARCH_FIELDS, data["_id"], data)
+
+        async def write(session):
+            await self.collection.insert_one(data, session=session)
+            await self._append_events(CREATE, [(data["_id"], data)], session)
+            return await self.collection.find_one({"_id": data["_id"]}, session=session)
 
-        await self.collection.insert_one(data)
-        created_item = await self.collection.find_one({"_id": data["_id"]})
-        return self.model.model_validate(created_item)
+        created_item = await self._transact(write)
+        generations.bump(self.collection_name)
+        if self.counters is not None:
+            await self.counters.record(None, created_item)
+        return self._to_model(created_item)
 
-    async def get_by_id(self, id: str) -> Optional[T]:
-        """Get an item by id"""
-        item = await self.collection.find_one({"_id": id, "is_deleted": False})
-        return self.model.model_validate(item) if item else None
+    async def get_by_id(self, id: str, consistent: bool = False) -> Optional[T]:
+        """Get an item by id; `consistent` reads the primary, bypassing cache and hedging"""
+        item = await self._find_one_cached(f"_id:{id}", {"_id": id, "is_deleted": False}, "get_by_id", consistent)
+        return self._to_model(item)
 
     async def get_all(self, skip: int = 0, limit: int = 100) -> List[T]:
         """Get all items with pagination"""
-        cursor = self.collection.find({"is_deleted": False}).skip(skip).limit(limit)
-        return [self.model.model_validate(doc) async for doc in cursor]
+        query = self.query().sort("created_at").sort("_id").skip(skip).limit(limit)
+        return await self.find(query, "get_all")
+
+    async def get_all_json(self, skip: int = 0, limit: int = 100) -> bytes:
+        """get_all() as ready-to-send JSON"""
+        query = self.query().sort("created_at").sort("_id").skip(skip).limit(limit)
+        return await self.find_json(query, "get_all")
 
     async def update(self, id: str, data: Dict[str, Any]) -> Optional[T]:
         """Update an item partially"""
         data["updated_at"] = datetime.utcnow()
-        
-        result = await self.collection.update_one(
-            {"_id": id, "is_deleted": False},
-            {"$set": data}
-        )
-
-        if result.modified_count:
-            updated_item = await self.collection.find_one({"_id": id})
-            if updated_item:
-                return self.model.model_validate(updated_item)
-        return None
+        for field, key in search_keys(self.model.SEARCH_FIELDS, id, data).items():
+            data[f"{SEARCH_FIELD}.{field}"] = key
+        # Counters need the old values; everyone else wants the updated document
+        counted = self.counters is not None and self.counters.affects(data)
+
+        async def write(session):
+            result = await self.collection.find_one_and_update(
+                {"_id": id, "is_deleted": False},
+                {"$set": data},
+                return_document=ReturnDocument.BEFORE if counted else ReturnDocument.AFTER,
+                session=session,
+            )
+            if result is not None:
+                await self._append_events(UPDATE, [(id, data)], session)
+            return result
+
+        updated_item = await self._transact(write)
+        self._invalidate_cached(id)
+        generations.bump(self.collection_name)
+        if updated_item is None:
+            return None
+        if counted:
+            before, updated_item = updated_item, {**updated_item, **data}
+            await self.counters.record(before, updated_item)
+        return self._to_model(updated_item)
 
     async def delete(self, id: str) -> bool:
         """Soft delete an item"""
-        result = await self.collection.update_one(
-            {"_id": id, "is_deleted": False},
-            {"$set": {"is_deleted": True, "updated_at": datetime.utcnow()}}
-        )
-        return result.modified_count > 0
\ No newline at end of file
+        projection = list(self.counters.fields) if self.counters is not None else ["_id"]
+
+        changes = {"is_deleted": True, "updated_at": datetime.utcnow()}
+
+        async def write(session):
+            result = await self.collection.find_one_and_update(
+                {"_id": id, "is_deleted": False},
+                {"$set": changes},
+                projection=projection,
+                session=session,
+            )
+            if result is not None:
+                await self._append_events(DELETE, [(id, None)], session)
+            return result
+
+        before = await self._transact(write)
+        self._invalidate_cached(id)
+        generations.bump(self.collection_name)
+        if before is None:
+            return False
+        if self.counters is not None:
+            await self.counters.record(before, {**before, "is_deleted": True})
+        return True
+
+    def _check_bulk_changes(self, data: Dict[str, Any]) -> None:
+        # Shadow search keys embed each document's _id, so they can't be $set in bulk
+        touched = set(data) & set(self.model.SEARCH_FIELDS)
+        if touched:
+            raise ValueError(f"Bulk updates cannot change {', '.join(sorted(touched))}")
+
+    async def _write_many(self, filter: Dict[str, Any], changes: Dict[str, Any], op: str) -> Dict[str, int]:
+        """
+        `$set` `changes` on every document matching `filter`, in `_id`-ordered
+        batches of BULK_WRITE_BATCH_SIZE. Each batch reads only ids and counted
+        fields, updates them with one update_many (re-checking the filter),
+        records one outbox event per document and applies its counter deltas
+        with one `$inc`.
+        """
+        counted = self.counters is not None and self.counters.affects(changes)
+        projection = ["_id", *(self.counters.fields if counted else ())]
+        matched = modified = 0
+        after_id = None
+        while True:
+            batch_filter = filter if after_id is None else {"$and": [filter, {"_id": {"$gt": after_id}}]}
+
+            async def write(session):
+                cursor = self.collection.find(batch_filter, projection, session=session)
+                docs = await cursor.sort("_id", ASCENDING).limit(config.BULK_WRITE_BATCH_SIZE).to_list(None)
+                if not docs:
+                    return docs, None
+                result = await self.collection.update_many(
+                    {"$and": [filter, {"_id": {"$in": [doc["_id"] for doc in docs]}}]},
+                    {"$set": changes},
+                    session=session,
+                )
+                await self._append_events(op, [(doc["_id"], changes) for doc in docs], session)
+                return docs, result
+
+            docs, result = await self._transact(write)
+            if not docs:
+                break
+            matched += result.matched_count
+            modified += result.modified_count
+            for doc in docs:
+                self._invalidate_cached(doc["_id"])
+            if counted:
+                # A document changed concurrently between the read and the write is off until reconciliation
+                await self.counters.record_many((doc, {**doc, **changes}) for doc in docs)
+            after_id = docs[-1]["_id"]
+        if matched:
+            generations.bump(self.collection_name)
+        return {"matched": matched, "modified": modified}
+
+    async def update_many(self, query: Query[T], data: Dict[str, Any], dry_run: bool = False) -> Dict[str, int]:
+        """Set `data` on every document matching a built query; dry_run only counts the matches"""
+        self._check_bulk_changes(data)
+        compiled = query.compile()
+        if dry_run:
+            matched = await self._execute(self.collection.count_documents, compiled.filter)
+            return {"matched": matched, "modified": 0}
+        return await self._write_many(compiled.filter, {**data, "updated_at": datetime.utcnow()}, UPDATE)
+
+    async def delete_many(self, query: Query[T], dry_run: bool = False) -> Dict[str, int]:
+        """Soft delete every document matching a built query; dry_run only counts the matches"""
+        compiled = query.compile()
+        filter = {**compiled.filter, "is_deleted": False}
+        if dry_run:
+            matched = await self._execute(self.collection.count_documents, filter)
+            return {"matched": matched, "modified": 0}
+        return await self._write_many(filter, {"is_deleted": True, "updated_at": datetime.utcnow()}, DELETE)
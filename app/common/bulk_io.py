@@ -0,0 +1,322 @@
+# app/common/bulk_io.py
+"""
+Parallel NDJSON/BSON import and export for one collection.
+
+Work is split across processes (export by `_id` range, import by byte range
+of the input file), each worker talks to Mongo with its own synchronous
+client and records its progress in a checkpoint file after every batch, so
+an interrupted run resumes where each worker stopped.
+"""
+import json
+import logging
+import os
+import shutil
+import struct
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import bson
+from bson import json_util
+from bson.raw_bson import RawBSONDocument
+from pymongo import MongoClient
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
+
+NDJSON = "ndjson"
+BSON = "bson"
+DUPLICATE_KEY = 11000
+
+Prepare = Callable[[Dict[str, Any]], Optional[Dict[str, Any]]]
+# (collection, batch) -> the documents in the batch that must not be inserted
+Conflicts = Callable[[Any, List[Dict[str, Any]]], List[Dict[str, Any]]]
+
+
+def detect_format(path: str) -> str:
+    return BSON if path.endswith(".bson") else NDJSON
+
+
+def _load_checkpoint(path: str) -> Dict[str, Any]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def _save_checkpoint(path: str, state: Dict[str, Any]) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+@dataclass
+class Target:
+    uri: str
+    db_name: str
+    collection: str
+
+    def connect(self, **codec):
+        client = MongoClient(self.uri, **codec)
+        return client, client[self.db_name][self.collection]
+
+
+# --- export --------------------------------------------------------------
+
+def split_id_ranges(target: Target, parts: int, sample_size: int = 100) -> List[Tuple[Optional[Any], Optional[Any]]]:
+    """Half-open `_id` ranges of roughly equal size, from sampled boundaries"""
+    client, collection = target.connect()
+    try:
+        sample = collection.aggregate([
+            {"$sample": {"size": parts * sample_size}},
+            {"$project": {"_id": 1}},
+            {"$sort": {"_id": 1}},
+        ])
+        ids = [doc["_id"] for doc in sample]
+    finally:
+        client.close()
+    if parts <= 1 or len(ids) < parts:
+        return [(None, None)]
+    bounds = sorted({ids[len(ids) * i // parts] for i in range(1, parts)})
+    return list(zip([None] + bounds, bounds + [None]))
+
+
+def export_range(target: Target, id_range: Tuple[Optional[Any], Optional[Any]], path: str,
+                 fmt: str, batch_size: int, checkpoint_path: str) -> Dict[str, Any]:
+    """Worker: write every document in `id_range` to `path`, resuming from the checkpoint"""
+    state = _load_checkpoint(checkpoint_path)
+    if state.get("done"):
+        return state
+    lo, hi = id_range
+    query: Dict[str, Any] = {}
+    if lo is not None:
+        query["$gte"] = lo
+    if hi is not None:
+        query["$lt"] = hi
+    if "last_id" in state:
+        query = {"$gt": json_util.loads(state["last_id"]), **({"$lt": hi} if hi is not None else {})}
+    offset = state.get("offset", 0)
+    count = state.get("count", 0)
+
+    # BSON dumps copy the server's bytes straight through
+    client, collection = target.connect(document_class=RawBSONDocument)
+    started = time.monotonic()
+    try:
+        with open(path, "ab") as out:
+            out.truncate(offset)
+            cursor = collection.find({"_id": query} if query else {}).sort("_id", 1).batch_size(batch_size)
+            buffer: List[bytes] = []
+            last_id = None
+            for doc in cursor:
+                if fmt == BSON:
+                    buffer.append(doc.raw)
+                else:
+                    decoded = bson.decode(doc.raw)
+                    buffer.append(json_util.dumps(decoded, json_options=json_util.RELAXED_JSON_OPTIONS).encode() + b"\n")
+                last_id = doc["_id"]
+                if len(buffer) >= batch_size:
+                    out.write(b"".join(buffer))
+                    out.flush()
+                    count += len(buffer)
+                    buffer = []
+                    _save_checkpoint(checkpoint_path, {"last_id": json_util.dumps(last_id), "offset": out.tell(), "count": count})
+            out.write(b"".join(buffer))
+            count += len(buffer)
+            state = {"done": True, "offset": out.tell(), "count": count}
+            _save_checkpoint(checkpoint_path, state)
+    finally:
+        client.close()
+    state["seconds"] = time.monotonic() - started
+    return state
+
+
+# --- import --------------------------------------------------------------
+
+def split_file(path: str, fmt: str, parts: int) -> List[Tuple[int, int]]:
+    """Byte ranges that start and end on document boundaries"""
+    size = os.path.getsize(path)
+    if parts <= 1 or size == 0:
+        return [(0, size)]
+    targets = [size * i // parts for i in range(1, parts)]
+    bounds: List[int] = []
+    with open(path, "rb") as f:
+        if fmt == NDJSON:
+            for target in targets:
+                f.seek(target)
+                f.readline()
+                bounds.append(f.tell())
+        else:
+            # BSON documents are length-prefixed, so walk the prefixes without decoding
+            position, pending = 0, iter(targets)
+            target = next(pending, None)
+            while target is not None and position < size:
+                if position >= target:
+                    bounds.append(position)
+                    target = next(pending, None)
+                    continue
+                f.seek(position)
+                (length,) = struct.unpack("<i", f.read(4))
+                position += length
+    bounds = sorted(set(b for b in bounds if 0 < b < size))
+    return list(zip([0] + bounds, bounds + [size]))
+
+
+def _read_documents(f, fmt: str, end: int):
+    """Yield (document, offset after it) until `end`"""
+    while f.tell() < end:
+        if fmt == NDJSON:
+            line = f.readline()
+            if line.strip():
+                yield json_util.loads(line), f.tell()
+        else:
+            header = f.read(4)
+            (length,) = struct.unpack("<i", header)
+            yield bson.decode(header + f.read(length - 4)), f.tell()
+
+
+def _insert(collection, batch: List[Dict[str, Any]]) -> Tuple[int, int]:
+    """insert_many, unordered; duplicates (e.g. a batch redone after resume) are counted, not fatal"""
+    try:
+        return len(collection.insert_many(batch, ordered=False).inserted_ids), 0
+    except BulkWriteError as e:
+        errors = e.details.get("writeErrors", [])
+        if any(error.get("code") != DUPLICATE_KEY for error in errors):
+            raise
+        return e.details.get("nInserted", 0), len(errors)
+
+
+def import_range(target: Target, path: str, fmt: str, byte_range: Tuple[int, int], batch_size: int,
+                 checkpoint_path: str, prepare: Optional[Prepare], conflicts: Optional[Conflicts] = None) -> Dict[str, Any]:
+    """Worker: insert the documents in `byte_range` of `path`, resuming from the checkpoint"""
+    state = _load_checkpoint(checkpoint_path)
+    if state.get("done"):
+        return state
+    start, end = byte_range
+    stats = {key: state.get(key, 0) for key in ("inserted", "duplicates", "rejected", "conflicts")}
+
+    client, collection = target.connect()
+    started = time.monotonic()
+
+    def flush(batch: List[Dict[str, Any]]) -> None:
+        if conflicts is not None:
+            skipped = conflicts(collection, batch)
+            for doc in skipped:
+                logger.warning(f"Skipping {doc['_id']}: conflicts with an existing document")
+            stats["conflicts"] += len(skipped)
+            skipped_ids = {id(doc) for doc in skipped}
+            batch = [doc for doc in batch if id(doc) not in skipped_ids]
+        if batch:
+            inserted, duplicates = _insert(collection, batch)
+            stats["inserted"] += inserted
+            stats["duplicates"] += duplicates
+
+    try:
+        with open(path, "rb") as f:
+            f.seek(state.get("offset", start))
+            batch: List[Dict[str, Any]] = []
+            offset = f.tell()
+            for doc, offset in _read_documents(f, fmt, end):
+                doc = prepare(doc) if prepare else doc
+                if doc is None:
+                    stats["rejected"] += 1
+                    continue
+                batch.append(doc)
+                if len(batch) >= batch_size:
+                    flush(batch)
+                    batch = []
+                    _save_checkpoint(checkpoint_path, {**stats, "offset": offset})
+            flush(batch)
+            state = {**stats, "offset": offset, "done": True}
+            _save_checkpoint(checkpoint_path, state)
+    finally:
+        client.close()
+    state["seconds"] = time.monotonic() - started
+    return state
+
+
+# --- orchestration ---------------------------------------------------------
+
+def _report(label: str, count: int, seconds: float) -> None:
+    rate = count / seconds if seconds > 0 else 0.0
+    logger.info(f"{label}: {count} documents in {seconds:.1f}s ({rate:,.0f}/s)")
+
+
+def bulk_export(target: Target, path: str, workers: int, batch_size: int = 10_000,
+                fmt: Optional[str] = None) -> Dict[str, Any]:
+    fmt = fmt or detect_format(path)
+    checkpoint_dir = f"{path}.checkpoint"
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    ranges_path = os.path.join(checkpoint_dir, "ranges.json")
+    # The split is part of the checkpoint: resuming with different ranges would duplicate documents
+    saved = _load_checkpoint(ranges_path)
+    if saved:
+        ranges = [tuple(json_util.loads(bound) for bound in pair) for pair in saved["ranges"]]
+    else:
+        ranges = split_id_ranges(target, workers)
+        _save_checkpoint(ranges_path, {"ranges": [[json_util.dumps(bound) for bound in pair] for pair in ranges]})
+
+    started = time.monotonic()
+    parts = [f"{path}.part{i:04d}" for i in range(len(ranges))]
+    total = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(export_range, target, id_range, part, fmt, batch_size, os.path.join(checkpoint_dir, f"{i}.json")): i
+            for i, (id_range, part) in enumerate(zip(ranges, parts))
+        }
+        for future in as_completed(futures):
+            state = future.result()
+            total += state["count"]
+            _report(f"export part {futures[future]}", state["count"], state.get("seconds", 0.0))
+
+    with open(path, "wb") as out:
+        for part in parts:
+            with open(part, "rb") as f:
+                shutil.copyfileobj(f, out, 16 * 1024 * 1024)
+            os.remove(part)
+    shutil.rmtree(checkpoint_dir)
+    seconds = time.monotonic() - started
+    _report("export", total, seconds)
+    return {"count": total, "seconds": seconds}
+
+
+def bulk_import(target: Target, path: str, workers: int, batch_size: int = 10_000,
+                fmt: Optional[str] = None, prepare: Optional[Prepare] = None,
+                conflicts: Optional[Conflicts] = None) -> Dict[str, Any]:
+    """
+    Insert every document in `path`. `prepare` normalizes or rejects each
+    document; `conflicts` picks the documents of a batch to skip, e.g. ones
+    repeating a value that must be unique. It sees the collection and the
+    batch only, so repeats split across workers' slices get through.
+    """
+    fmt = fmt or detect_format(path)
+    checkpoint_dir = f"{path}.checkpoint"
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    ranges_path = os.path.join(checkpoint_dir, "ranges.json")
+    saved = _load_checkpoint(ranges_path)
+    if saved:
+        ranges = [tuple(pair) for pair in saved["ranges"]]
+    else:
+        ranges = split_file(path, fmt, workers)
+        _save_checkpoint(ranges_path, {"ranges": ranges})
+
+    started = time.monotonic()
+    totals = {"inserted": 0, "duplicates": 0, "rejected": 0, "conflicts": 0}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(import_range, target, path, fmt, byte_range, batch_size,
+                        os.path.join(checkpoint_dir, f"{i}.json"), prepare, conflicts): i
+            for i, byte_range in enumerate(ranges)
+        }
+        for future in as_completed(futures):
+            state = future.result()
+            for key in totals:
+                totals[key] += state[key]
+            _report(f"import part {futures[future]}", state["inserted"], state.get("seconds", 0.0))
+
+    shutil.rmtree(checkpoint_dir)
+    seconds = time.monotonic() - started
+    _report("import", totals["inserted"], seconds)
+    return {**totals, "seconds": seconds}
@@ -0,0 +1,105 @@
+# app/common/counters.py
+import logging
+from abc import ABC, abstractmethod
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from core.db.database import MongoDBConnection
+
+logger = logging.getLogger(__name__)
+
+
+def nest(flat: Dict[str, int]) -> Dict[str, Any]:
+    """{"by_status.active": 3} -> {"by_status": {"active": 3}}"""
+    nested: Dict[str, Any] = {}
+    for path, value in flat.items():
+        *parents, leaf = path.split(".")
+        node = nested
+        for part in parents:
+            node = node.setdefault(part, {})
+        node[leaf] = value
+    return nested
+
+
+def flatten(nested: Dict[str, Any], prefix: str = "") -> Dict[str, int]:
+    """Inverse of nest()"""
+    flat: Dict[str, int] = {}
+    for key, value in nested.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        else:
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+class CounterDocument(ABC):
+    """
+    Materialized counts for one collection, kept in a single document of
+    `stats_counters` so reading them is one point lookup.
+
+    Repositories call `record(before, after)` on every write that can change a
+    counted field and the difference is applied with `$inc`. `reconcile()`
+    recounts from the collection and overwrites the document to correct drift
+    (e.g. from a write whose `$inc` failed, or documents removed by archival).
+    Increments landing while a recount runs can be lost; the next pass fixes them.
+    """
+
+    collection_name = "stats_counters"
+    # Fields whose change moves a document between counters
+    fields: Iterable[str] = ("is_deleted",)
+
+    def __init__(self, db: MongoDBConnection, name: str):
+        self.db = db
+        self.name = name
+        self.collection = db.get_collection(self.collection_name)
+
+    def keys(self, doc: Dict[str, Any]) -> List[str]:
+        """Dotted counter paths a document contributes one to"""
+        return ["deleted" if doc.get("is_deleted") else "live"]
+
+    @abstractmethod
+    async def recount(self) -> Dict[str, int]:
+        """Exact counts from the source collection, as flat counter paths"""
+        pass
+
+    def affects(self, data: Dict[str, Any]) -> bool:
+        return any(field in data for field in self.fields)
+
+    async def record(self, before: Optional[Dict[str, Any]], after: Optional[Dict[str, Any]]) -> None:
+        """Apply the change between two versions of a document (None = didn't exist)"""
+        await self.record_many([(before, after)])
+
+    async def record_many(self, changes: Iterable[Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]]) -> None:
+        """Apply the changes of many documents with a single $inc"""
+        delta: Counter = Counter()
+        for before, after in changes:
+            delta.update(self.keys(after) if after else [])
+            delta.subtract(self.keys(before) if before else [])
+        inc = {f"counts.{key}": value for key, value in delta.items() if value}
+        if not inc:
+            return
+        try:
+            await self.db.circuit_breaker.call(
+                self.collection.update_one, {"_id": self.name}, {"$inc": inc}, upsert=True
+            )
+        except Exception as e:
+            # The write itself succeeded; the next reconciliation fixes the counts
+            logger.error(f"Failed to update {self.name} counters: {str(e)}")
+
+    async def read(self) -> Dict[str, Any]:
+        doc = await self.db.circuit_breaker.call(self.collection.find_one, {"_id": self.name})
+        return doc or {"_id": self.name, "counts": {}}
+
+    async def reconcile(self) -> Dict[str, int]:
+        """Recount and overwrite; returns the drift that was corrected per counter"""
+        current = await self.read()
+        counts = await self.recount()
+        await self.collection.replace_one(
+            {"_id": self.name},
+            {"_id": self.name, "counts": nest(counts), "reconciled_at": datetime.utcnow()},
+            upsert=True,
+        )
+        drift = Counter(counts)
+        drift.subtract(flatten(current.get("counts", {})))
+        return {key: value for key, value in drift.items() if value}
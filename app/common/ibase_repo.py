@@ -1,6 +1,7 @@
 from abc import ABC, abstractmethod
-from typing import Generic, TypeVar, Optional, List, Dict, Any
+from typing import Generic, TypeVar, Optional, List, Dict, Any, Sequence, Tuple
 from app.common.base_model import BaseDBModel
+from app.common.query import Query
 
 T = TypeVar('T', bound=BaseDBModel)
 
@@ -21,6 +22,38 @@ class IBaseRepository(ABC, Generic[T]):
     async def delete(self, id: str) -> bool:
         pass
 
+    @abstractmethod
+    async def update_many(self, query: Query[T], data: Dict[str, Any], dry_run: bool = False) -> Dict[str, int]:
+        pass
+
+    @abstractmethod
+    async def delete_many(self, query: Query[T], dry_run: bool = False) -> Dict[str, int]:
+        pass
+
     @abstractmethod
     async def get_all(self, skip: int = 0, limit: int = 100) -> List[T]:
-        pass
\ No newline at end of file
+        pass
+
+    @abstractmethod
+    async def get_all_json(self, skip: int = 0, limit: int = 100) -> bytes:
+        pass
+
+    @abstractmethod
+    def query(self) -> Query[T]:
+        pass
+
+    @abstractmethod
+    async def find(self, query: Query[T], op_name: str) -> List[T]:
+        pass
+
+    @abstractmethod
+    async def find_json(self, query: Query[T], op_name: str) -> bytes:
+        pass
+
+    @abstractmethod
+    async def search(self, prefix: str, fields: Sequence[str], limit: int, cursor: Optional[str] = None) -> Tuple[List[T], Optional[str]]:
+        pass
+
+    @abstractmethod
+    async def ensure_indexes(self) -> None:
+        pass
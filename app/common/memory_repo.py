@@ -0,0 +1,283 @@
+# app/common/memory_repo.py
+import copy
+import uuid
+from bisect import bisect_left, insort
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Set, Tuple, Type, TypeVar
+
+from app.common.base_model import BaseDBModel
+from app.common.ibase_repo import IBaseRepository
+from app.common.query import CompiledQuery, Query
+from app.common.raw_json import JsonDocumentEncoder
+from app.common.search import SEARCH_FIELD, prefix_search, search_keys
+from app.common.schema import schema_upgrades
+from core.cache.response_cache import generations
+
+T = TypeVar('T', bound=BaseDBModel)
+
+_MISSING = object()
+
+
+class SortedIndex:
+    """(key, _id) pairs kept in order with bisect, for ordered scans"""
+
+    def __init__(self):
+        self._entries: List[Tuple[Any, str]] = []
+
+    def add(self, key: Any, id: str) -> None:
+        insort(self._entries, (key, id))
+
+    def remove(self, key: Any, id: str) -> None:
+        i = bisect_left(self._entries, (key, id))
+        if i < len(self._entries) and self._entries[i] == (key, id):
+            del self._entries[i]
+
+    def ids(self, skip: int = 0, limit: int = 0) -> List[str]:
+        end = skip + limit if limit else None
+        return [id for _, id in self._entries[skip:end]]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def _get_field(doc: Dict[str, Any], path: str) -> Any:
+    value: Any = doc
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return value
+
+
+def _compare(value: Any, operator: str, operand: Any) -> bool:
+    # Array fields match when any element matches, as in Mongo
+    if isinstance(value, list) and operator not in ("$exists", "$ne", "$nin"):
+        return any(_compare(item, operator, operand) for item in value) or (
+            operator == "$eq" and value == operand
+        )
+    if operator == "$exists":
+        return (value is not _MISSING) == bool(operand)
+    if operator == "$eq":
+        return value == operand
+    if operator == "$ne":
+        return not _compare(value, "$eq", operand)
+    if operator == "$in":
+        return any(_compare(value, "$eq", item) for item in operand)
+    if operator == "$nin":
+        return not _compare(value, "$in", operand)
+    if value is _MISSING or value is None:
+        return False
+    try:
+        if operator == "$gt":
+            return value > operand
+        if operator == "$gte":
+            return value >= operand
+        if operator == "$lt":
+            return value < operand
+        if operator == "$lte":
+            return value <= operand
+    except TypeError:
+        return False
+    raise ValueError(f"Unsupported operator {operator}")
+
+
+def _sort_key(value: Any) -> Tuple:
+    # Missing fields sort after present ones without comparing against them
+    return (1,) if value is _MISSING else (0, value)
+
+
+def sort_documents(docs: List[Dict[str, Any]], sort: Sequence[Tuple[str, int]]) -> List[Dict[str, Any]]:
+    """Sort raw documents in place by a Mongo-style sort spec"""
+    # Stable sorts applied last-key-first give a multi-key sort
+    for field, direction in reversed(sort):
+        docs.sort(key=lambda doc: _sort_key(_get_field(doc, field)), reverse=direction < 0)
+    return docs
+
+
+def matches(doc: Dict[str, Any], filter: Dict[str, Any]) -> bool:
+    """Evaluate the subset of Mongo filter syntax the Query builder produces"""
+    for path, condition in filter.items():
+        value = _get_field(doc, path)
+        if isinstance(condition, dict) and condition and all(k.startswith("$") for k in condition):
+            if not all(_compare(value, op, operand) for op, operand in condition.items()):
+                return False
+        elif not _compare(value, "$eq", condition):
+            return False
+    return True
+
+
+class InMemoryRepository(IBaseRepository[T]):
+    """
+    Zero-I/O repository with the same soft-delete semantics as BaseRepository.
+
+    Live documents are indexed by `_id` (the primary dict), by hash on each of
+    `hash_index_fields`, and in (created_at, _id) order for pagination.
+    Soft-deleted documents stay in storage but leave every secondary index.
+    Counters from `_stat_keys` are maintained on every write. State is per process.
+    """
+
+    hash_index_fields: Sequence[str] = ()
+    extra_query_fields: Sequence[str] = ()
+
+    def __init__(self, model_class: Type[T], collection_name: str):
+        self.model = model_class
+        self.collection_name = collection_name
+        self._docs: Dict[str, Dict[str, Any]] = {}
+        self._hash: Dict[str, Dict[Any, Set[str]]] = {field: {} for field in self.hash_index_fields}
+        self._ordered = SortedIndex()
+        self._counts: Counter = Counter()
+        self.json_encoder = JsonDocumentEncoder(model_class, self._to_model)
+
+    # --- indexes -------------------------------------------------------
+
+    @staticmethod
+    def _order_key(doc: Dict[str, Any]) -> Tuple[Any, str]:
+        return doc["created_at"], doc["_id"]
+
+    def _index(self, doc: Dict[str, Any]) -> None:
+        for field, index in self._hash.items():
+            value = doc.get(field)
+            if value is not None:
+                index.setdefault(value, set()).add(doc["_id"])
+        self._ordered.add(*self._order_key(doc))
+
+    def _unindex(self, doc: Dict[str, Any]) -> None:
+        for field, index in self._hash.items():
+            ids = index.get(doc.get(field))
+            if ids is not None:
+                ids.discard(doc["_id"])
+                if not ids:
+                    del index[doc.get(field)]
+        self._ordered.remove(*self._order_key(doc))
+
+    def _stat_keys(self, doc: Dict[str, Any]) -> List[str]:
+        """Counter paths a document contributes one to; none by default"""
+        return []
+
+    def _count(self, doc: Dict[str, Any], sign: int) -> None:
+        for key in self._stat_keys(doc):
+            self._counts[key] += sign
+
+    def _live(self, id: str) -> Optional[Dict[str, Any]]:
+        doc = self._docs.get(id)
+        return doc if doc is not None and not doc["is_deleted"] else None
+
+    def _lookup(self, field: str, value: Any) -> Optional[Dict[str, Any]]:
+        ids = self._hash[field].get(value)
+        return self._docs[next(iter(ids))] if ids else None
+
+    def _to_model(self, doc: Optional[Dict[str, Any]]) -> Optional[T]:
+        if doc is None:
+            return None
+        doc, _ = schema_upgrades.upgrade(self.model, doc)
+        return self.model.model_validate(doc)
+
+    # --- IBaseRepository ----------------------------------------------
+
+    async def create(self, item: T) -> T:
+        data = item.model_dump(by_alias=True)
+        if not data.get("_id"):
+            data["_id"] = str(uuid.uuid4())
+        if data["_id"] in self._docs:
+            raise ValueError(f"Duplicate _id {data['_id']}")
+        data["created_at"] = datetime.utcnow()
+        data["updated_at"] = datetime.utcnow()
+        data["is_deleted"] = False
+        data["schema_version"] = self.model.SCHEMA_VERSION
+        if self.model.SEARCH_FIELDS:
+            data[SEARCH_FIELD] = search_keys(self.model.SEARCH_FIELDS, data["_id"], data)
+        self._docs[data["_id"]] = data
+        self._index(data)
+        self._count(data, 1)
+        generations.bump(self.collection_name)
+        return self._to_model(data)
+
+    async def get_by_id(self, id: str) -> Optional[T]:
+        return self._to_model(self._live(id))
+
+    async def get_all(self, skip: int = 0, limit: int = 100) -> List[T]:
+        return [self._to_model(self._docs[id]) for id in self._ordered.ids(skip, limit)]
+
+    async def get_all_json(self, skip: int = 0, limit: int = 100) -> bytes:
+        return self.json_encoder.encode(self._docs[id] for id in self._ordered.ids(skip, limit))
+
+    async def update(self, id: str, data: Dict[str, Any]) -> Optional[T]:
+        doc = self._live(id)
+        if doc is None:
+            return None
+        data["updated_at"] = datetime.utcnow()
+        self._unindex(doc)
+        self._count(doc, -1)
+        doc.update(copy.deepcopy(data))
+        # Like `$set` on "search.<field>": creates the subdocument if the stored one predates it
+        doc.setdefault(SEARCH_FIELD, {}).update(search_keys(self.model.SEARCH_FIELDS, id, data))
+        self._index(doc)
+        self._count(doc, 1)
+        generations.bump(self.collection_name)
+        return self._to_model(doc)
+
+    async def delete(self, id: str) -> bool:
+        doc = self._live(id)
+        if doc is None:
+            return False
+        self._unindex(doc)
+        self._count(doc, -1)
+        doc["is_deleted"] = True
+        doc["updated_at"] = datetime.utcnow()
+        self._count(doc, 1)
+        generations.bump(self.collection_name)
+        return True
+
+    async def update_many(self, query: Query[T], data: Dict[str, Any], dry_run: bool = False) -> Dict[str, int]:
+        touched = set(data) & set(self.model.SEARCH_FIELDS)
+        if touched:
+            raise ValueError(f"Bulk updates cannot change {', '.join(sorted(touched))}")
+        ids = [doc["_id"] for doc in self._find_documents(query.compile())]
+        if not dry_run:
+            for id in ids:
+                await self.update(id, dict(data))
+        # updated_at always changes, so every match is modified
+        return {"matched": len(ids), "modified": 0 if dry_run else len(ids)}
+
+    async def delete_many(self, query: Query[T], dry_run: bool = False) -> Dict[str, int]:
+        compiled = query.compile()
+        compiled.filter = {**compiled.filter, "is_deleted": False}
+        ids = [doc["_id"] for doc in self._find_documents(compiled)]
+        if not dry_run:
+            for id in ids:
+                await self.delete(id)
+        return {"matched": len(ids), "modified": 0 if dry_run else len(ids)}
+
+    def query(self) -> Query[T]:
+        return Query(self.model, self.extra_query_fields).eq("is_deleted", False)
+
+    def _candidates(self, compiled: CompiledQuery) -> Iterator[Dict[str, Any]]:
+        """Narrow with a hash index when the filter has an equality on an indexed field"""
+        for field in self._hash:
+            value = compiled.filter.get(field)
+            if value is not None and not isinstance(value, dict):
+                return (self._docs[id] for id in self._hash[field].get(value, ()))
+        if "_id" in compiled.filter and not isinstance(compiled.filter["_id"], dict):
+            doc = self._docs.get(compiled.filter["_id"])
+            return iter([doc] if doc else [])
+        return iter(self._docs.values())
+
+    def _find_documents(self, compiled: CompiledQuery) -> List[Dict[str, Any]]:
+        docs = [doc for doc in self._candidates(compiled) if matches(doc, compiled.filter)]
+        sort_documents(docs, compiled.sort)
+        end = compiled.skip + compiled.limit if compiled.limit else None
+        return docs[compiled.skip:end]
+
+    async def find(self, query: Query[T], op_name: str) -> List[T]:
+        return [self._to_model(doc) for doc in self._find_documents(query.compile())]
+
+    async def find_json(self, query: Query[T], op_name: str) -> bytes:
+        # Projections aren't applied here either, so the full documents are encoded
+        return self.json_encoder.encode(self._find_documents(query.compile()))
+
+    async def search(self, prefix: str, fields: Sequence[str], limit: int, cursor: Optional[str] = None) -> Tuple[List[T], Optional[str]]:
+        return await prefix_search(self, prefix, fields, limit, cursor)
+
+    async def ensure_indexes(self) -> None:
+        """Indexes are maintained on write; nothing to create"""
@@ -0,0 +1,95 @@
+# app/common/migration.py
+import asyncio
+import logging
+from typing import Optional, Type
+
+from pymongo import ReplaceOne
+
+from app.common.base_model import BaseDBModel
+from app.common.schema import schema_upgrades
+from core.db.checkpoints import CheckpointStore
+from core.db.database import MongoDBConnection
+from core.observability.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class SchemaMigrator:
+    """
+    Rewrites documents below the model's SCHEMA_VERSION using the registered
+    upgrades, in `_id` order, at most `docs_per_second`.
+
+    Reads already upgrade on the fly, so this only has to finish eventually.
+    A document is replaced only if its `updated_at` is unchanged since it was
+    read; one written concurrently keeps its old version and the next pass
+    picks it up. Progress is checkpointed per target version.
+    """
+
+    def __init__(
+        self,
+        collection_name: str,
+        model: Type[BaseDBModel],
+        db: MongoDBConnection,
+        batch_size: int = 200,
+        docs_per_second: float = 500,
+    ):
+        self.collection_name = collection_name
+        self.model = model
+        self.collection = db.get_collection(collection_name)
+        self.checkpoints = CheckpointStore(db)
+        self.target_version = model.SCHEMA_VERSION
+        self.checkpoint_name = f"migration:{collection_name}:v{self.target_version}"
+        self.batch_size = batch_size
+        self.docs_per_second = docs_per_second
+
+        self._migrated = metrics.counter("schema_migration_documents_total", collection=collection_name)
+        self._skipped = metrics.counter("schema_migration_conflicts_total", collection=collection_name)
+
+    def _outdated(self) -> dict:
+        # Documents written before versioning have no schema_version at all
+        return {"$or": [
+            {"schema_version": {"$lt": self.target_version}},
+            {"schema_version": {"$exists": False}},
+        ]}
+
+    async def migrate_batch(self, after_id: Optional[str]) -> Optional[str]:
+        """Upgrade one batch; returns the last `_id` seen, or None when nothing is left"""
+        query = self._outdated()
+        if after_id is not None:
+            query = {"$and": [query, {"_id": {"$gt": after_id}}]}
+        docs = await self.collection.find(query).sort("_id", 1).limit(self.batch_size).to_list(None)
+        if not docs:
+            return None
+
+        requests = []
+        for doc in docs:
+            upgraded, _ = schema_upgrades.upgrade(self.model, doc)
+            requests.append(ReplaceOne({"_id": doc["_id"], "updated_at": doc.get("updated_at")}, upgraded))
+        result = await self.collection.bulk_write(requests, ordered=False)
+
+        last_id = docs[-1]["_id"]
+        await self.checkpoints.save(self.checkpoint_name, last_id)
+        self._migrated.inc(result.modified_count)
+        self._skipped.inc(len(docs) - result.matched_count)
+        return last_id
+
+    async def run_once(self) -> int:
+        """Migrate everything outdated, resuming from the stored checkpoint"""
+        after_id = await self.checkpoints.get(self.checkpoint_name)
+        migrated_before = self._migrated.value
+        logger.info(f"Migrating {self.collection_name} to schema v{self.target_version} (resume after {after_id})")
+
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            last_id = await self.migrate_batch(after_id)
+            if last_id is None:
+                break
+            after_id = last_id
+            # Throttle to docs_per_second, counting the time the batch itself took
+            await asyncio.sleep(max(0.0, self.batch_size / self.docs_per_second - (loop.time() - started)))
+
+        await self.checkpoints.clear(self.checkpoint_name)
+        migrated = self._migrated.value - migrated_before
+        logger.info(f"Migrated {migrated} {self.collection_name} documents to schema v{self.target_version}")
+        return migrated
@@ -0,0 +1,339 @@
+# app/common/partitioned_repo.py
+import asyncio
+import logging
+import uuid
+from collections import Counter
+from dataclasses import replace
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Type, TypeVar
+
+from pymongo import DeleteOne, ReplaceOne
+
+from app.common.base_model import BaseDBModel
+from app.common.base_repo import BaseRepository
+from app.common.counters import flatten, nest
+from app.common.ibase_repo import IBaseRepository
+from app.common.memory_repo import sort_documents
+from app.common.query import CompiledQuery, Query
+from app.common.search import prefix_search
+from core.db.database import MongoDBConnection
+from core.db.partitions import PartitionSet
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T', bound=BaseDBModel)
+
+
+def lookup_collection_name(collection_name: str) -> str:
+    return f"{collection_name}_lookup"
+
+
+def lookup_key(field: str, value: Any) -> str:
+    return f"{field}:{value}"
+
+
+class PartitionedRepository(IBaseRepository[T]):
+    """
+    Spreads one logical collection over the partitions of a PartitionSet.
+
+    Documents live on the partition that owns their `_id`. Each of
+    `lookup_fields` gets a `<collection>_lookup` entry `{_id: "field:value",
+    doc_id}` stored on the partition owning that key, so lookups by e.g. email
+    cost two point reads instead of a scatter. Entries are checked against the
+    document they point to, so a stale entry reads as a miss.
+
+    Queries without an `_id` equality fan out to every partition and the sorted
+    pages are merged. Each partition keeps its own circuit breaker.
+    """
+
+    lookup_fields: Sequence[str] = ()
+
+    def __init__(
+        self,
+        model_class: Type[T],
+        collection_name: str,
+        partitions: PartitionSet,
+        shard_factory: Callable[[MongoDBConnection], BaseRepository[T]],
+    ):
+        self.model = model_class
+        self.collection_name = collection_name
+        self.partitions = partitions
+        self.shards: Dict[str, BaseRepository[T]] = {
+            name: shard_factory(connection) for name, connection in partitions.connections.items()
+        }
+        self.lookup_collection = lookup_collection_name(collection_name)
+
+    def _shard(self, id: str) -> BaseRepository[T]:
+        return self.shards[self.partitions.owner(id)]
+
+    def _other_shards(self, id: str) -> List[BaseRepository[T]]:
+        owner = self.partitions.owner(id)
+        return [shard for name, shard in self.shards.items() if name != owner]
+
+    # --- secondary lookups --------------------------------------------
+
+    async def _lookup_call(self, key: str, method: str, *args, **kwargs) -> Any:
+        connection = self.partitions.connection_for(key)
+        collection = connection.get_collection(self.lookup_collection)
+        return await connection.circuit_breaker.call(getattr(collection, method), *args, **kwargs)
+
+    async def _set_lookups(self, id: str, values: Dict[str, Any]) -> None:
+        await asyncio.gather(*(
+            self._lookup_call(lookup_key(field, value), "replace_one",
+                              {"_id": lookup_key(field, value)},
+                              {"_id": lookup_key(field, value), "doc_id": id},
+                              upsert=True)
+            for field, value in values.items() if value is not None
+        ))
+
+    async def _clear_lookups(self, id: str, values: Dict[str, Any]) -> None:
+        # Only remove entries still pointing at this document
+        await asyncio.gather(*(
+            self._lookup_call(lookup_key(field, value), "delete_one", {"_id": lookup_key(field, value), "doc_id": id})
+            for field, value in values.items() if value is not None
+        ))
+
+    def _lookup_values(self, item: Optional[T]) -> Dict[str, Any]:
+        if item is None:
+            return {}
+        return {field: getattr(item, field, None) for field in self.lookup_fields}
+
+    async def find_by_lookup(self, field: str, value: Any, consistent: bool = False) -> Optional[T]:
+        """Point lookup on one of `lookup_fields` through the lookup collection"""
+        entry = await self._lookup_call(lookup_key(field, value), "find_one", {"_id": lookup_key(field, value)})
+        if entry is None:
+            return None
+        item = await self.get_by_id(entry["doc_id"], consistent)
+        if item is None or getattr(item, field, None) != value:
+            return None
+        return item
+
+    # --- IBaseRepository ----------------------------------------------
+
+    async def create(self, item: T) -> T:
+        """Create on the owning partition; the id is assigned here so it can be routed"""
+        if not item.id:
+            item = item.model_copy(update={"id": str(uuid.uuid4())})
+        # Lookups first: an orphaned entry from a failed insert just reads as a miss
+        await self._set_lookups(item.id, self._lookup_values(item))
+        return await self._shard(item.id).create(item)
+
+    async def get_by_id(self, id: str, consistent: bool = False) -> Optional[T]:
+        item = await self._shard(id).get_by_id(id, consistent)
+        if item is not None or len(self.shards) == 1:
+            return item
+        # Not on its owner: possibly not moved yet by an in-progress rebalance
+        for found in await asyncio.gather(*(shard.get_by_id(id, consistent) for shard in self._other_shards(id))):
+            if found is not None:
+                return found
+        return None
+
+    async def get_all(self, skip: int = 0, limit: int = 100) -> List[T]:
+        query = self.query().sort("created_at").sort("_id").skip(skip).limit(limit)
+        return await self.find(query, "get_all")
+
+    async def get_all_json(self, skip: int = 0, limit: int = 100) -> bytes:
+        query = self.query().sort("created_at").sort("_id").skip(skip).limit(limit)
+        return await self.find_json(query, "get_all")
+
+    async def update(self, id: str, data: Dict[str, Any]) -> Optional[T]:
+        before = None
+        if any(field in data for field in self.lookup_fields):
+            before = await self.get_by_id(id)
+
+        updated = await self._shard(id).update(id, data)
+        if updated is None and len(self.shards) > 1:
+            for result in await asyncio.gather(*(shard.update(id, dict(data)) for shard in self._other_shards(id))):
+                updated = updated or result
+        if updated is None or before is None:
+            return updated
+
+        old_values, new_values = self._lookup_values(before), self._lookup_values(updated)
+        changed = [field for field in self.lookup_fields if old_values[field] != new_values[field]]
+        await self._set_lookups(id, {field: new_values[field] for field in changed})
+        await self._clear_lookups(id, {field: old_values[field] for field in changed})
+        return updated
+
+    async def delete(self, id: str) -> bool:
+        item = await self.get_by_id(id) if self.lookup_fields else None
+        deleted = await self._shard(id).delete(id)
+        if not deleted and len(self.shards) > 1:
+            deleted = any(await asyncio.gather(*(shard.delete(id) for shard in self._other_shards(id))))
+        if deleted:
+            await self._clear_lookups(id, self._lookup_values(item))
+        return deleted
+
+    async def update_many(self, query: Query[T], data: Dict[str, Any], dry_run: bool = False) -> Dict[str, int]:
+        touched = set(data) & set(self.lookup_fields)
+        if touched:
+            raise ValueError(f"Bulk updates cannot change lookup fields {', '.join(sorted(touched))}")
+        results = await asyncio.gather(*(shard.update_many(query, data, dry_run) for shard in self.shards.values()))
+        return {key: sum(result[key] for result in results) for key in ("matched", "modified")}
+
+    async def delete_many(self, query: Query[T], dry_run: bool = False) -> Dict[str, int]:
+        # Lookup entries of deleted documents are left behind; they read as misses
+        results = await asyncio.gather(*(shard.delete_many(query, dry_run) for shard in self.shards.values()))
+        return {key: sum(result[key] for result in results) for key in ("matched", "modified")}
+
+    def query(self) -> Query[T]:
+        return next(iter(self.shards.values())).query()
+
+    async def _find_documents(self, compiled: CompiledQuery, op_name: str) -> List[Dict[str, Any]]:
+        """Route `_id` equality queries to the owning partition first, as get_by_id does; scatter-gather anything else"""
+        id = compiled.filter.get("_id")
+        if isinstance(id, str):
+            docs = await self._shard(id).find_documents(compiled, op_name)
+            if docs or len(self.shards) == 1:
+                return docs
+            # Not on its owner: possibly not moved yet by an in-progress rebalance
+            for found in await asyncio.gather(*(shard.find_documents(compiled, op_name) for shard in self._other_shards(id))):
+                if found:
+                    return found
+            return []
+
+        # Every partition returns its first skip+limit; the merged page is cut from those
+        per_shard = replace(compiled, skip=0, limit=compiled.skip + compiled.limit if compiled.limit else 0)
+        pages = await asyncio.gather(*(shard.find_documents(per_shard, op_name) for shard in self.shards.values()))
+        docs = sort_documents([doc for page in pages for doc in page], compiled.sort)
+        end = compiled.skip + compiled.limit if compiled.limit else None
+        return docs[compiled.skip:end]
+
+    async def find(self, query: Query[T], op_name: str) -> List[T]:
+        shard = next(iter(self.shards.values()))
+        return [shard._to_model(doc) for doc in await self._find_documents(query.compile(), op_name)]
+
+    async def find_json(self, query: Query[T], op_name: str) -> bytes:
+        # Merging needs decoded documents for the sort, so only model construction is skipped
+        compiled = query.compile()
+        shard = next(iter(self.shards.values()))
+        if compiled.projection is None:
+            # Sort keys stay in the projection for the merge; the encoder drops them
+            compiled.projection = {**shard.json_encoder.projection, **{name: 1 for name, _ in compiled.sort}}
+            return shard.json_encoder.encode(await self._find_documents(compiled, op_name))
+        return shard.json_encoder.encode(
+            item.model_dump(by_alias=True) for item in await self.find(query, op_name)
+        )
+
+    async def search(self, prefix: str, fields: Sequence[str], limit: int, cursor: Optional[str] = None) -> Tuple[List[T], Optional[str]]:
+        # Each field range is scatter-gathered by find()
+        return await prefix_search(self, prefix, fields, limit, cursor)
+
+    async def ensure_indexes(self) -> None:
+        await asyncio.gather(*(shard.ensure_indexes() for shard in self.shards.values()))
+
+    async def read_counters(self) -> Dict[str, Any]:
+        """Each partition's counters document, summed"""
+        docs = await asyncio.gather(*(shard.counters.read() for shard in self.shards.values()))
+        totals: Counter = Counter()
+        for doc in docs:
+            totals.update(flatten(doc["counts"]))
+        reconciled = [doc["reconciled_at"] for doc in docs if doc.get("reconciled_at")]
+        # Only as fresh as the partition reconciled longest ago
+        reconciled_at = min(reconciled) if len(reconciled) == len(docs) else None
+        return {**nest(dict(totals)), "reconciled_at": reconciled_at}
+
+    async def reconcile_counters(self) -> Dict[str, int]:
+        drift: Counter = Counter()
+        for result in await asyncio.gather(*(shard.counters.reconcile() for shard in self.shards.values())):
+            drift.update(result)
+        return {key: value for key, value in drift.items() if value}
+
+
+class PartitionRebalancer:
+    """
+    Moves documents that sit on a partition other than their owner (after a
+    partition was added or removed) and rebuilds the lookup entries.
+
+    Each batch is upserted on the owner before it is deleted from the source,
+    so an interrupted run is simply repeated; reads fall back to the other
+    partitions until a document has moved. A source document is only deleted
+    if its `updated_at` still matches the copy, so a write landing on it
+    mid-move is copied again rather than lost.
+    """
+
+    # Copies of one batch before documents still being written are left for the next run
+    move_attempts = 3
+
+    def __init__(
+        self,
+        collection_name: str,
+        partitions: PartitionSet,
+        lookup_fields: Sequence[str] = (),
+        batch_size: int = 500,
+        batch_pause_seconds: float = 0.5,
+        dry_run: bool = False,
+    ):
+        self.collection_name = collection_name
+        self.partitions = partitions
+        self.lookup_fields = lookup_fields
+        self.batch_size = batch_size
+        self.batch_pause_seconds = batch_pause_seconds
+        self.dry_run = dry_run
+
+    async def _rebuild_lookups(self, docs: List[Dict[str, Any]]) -> None:
+        entries: Dict[str, List[ReplaceOne]] = {}
+        for doc in docs:
+            if doc.get("is_deleted"):
+                continue
+            for field in self.lookup_fields:
+                if doc.get(field) is None:
+                    continue
+                key = lookup_key(field, doc[field])
+                entries.setdefault(self.partitions.owner(key), []).append(
+                    ReplaceOne({"_id": key}, {"_id": key, "doc_id": doc["_id"]}, upsert=True)
+                )
+        for name, requests in entries.items():
+            collection = self.partitions.connections[name].get_collection(lookup_collection_name(self.collection_name))
+            await collection.bulk_write(requests, ordered=False)
+
+    async def _move(self, source, target, docs: List[Dict[str, Any]]) -> int:
+        """Copy `docs` to `target` and delete the unchanged ones from `source`; returns how many moved"""
+        moved = 0
+        for _ in range(self.move_attempts):
+            await target.bulk_write([ReplaceOne({"_id": doc["_id"]}, doc, upsert=True) for doc in docs], ordered=False)
+            result = await source.bulk_write(
+                [DeleteOne({"_id": doc["_id"], "updated_at": doc.get("updated_at")}) for doc in docs],
+                ordered=False,
+            )
+            moved += result.deleted_count
+            if result.deleted_count == len(docs):
+                break
+            # Updated since they were read: copy the current versions
+            docs = await source.find({"_id": {"$in": [doc["_id"] for doc in docs]}}).to_list(None)
+            if not docs:
+                break
+        else:
+            logger.warning(f"{len(docs)} {self.collection_name} documents kept changing during the move; left for the next run")
+        return moved
+
+    async def rebalance_partition(self, source: str) -> Dict[str, int]:
+        collection = self.partitions.connections[source].get_collection(self.collection_name)
+        scanned = moved = 0
+        after_id = None
+        while True:
+            query = {"_id": {"$gt": after_id}} if after_id is not None else {}
+            docs = await collection.find(query).sort("_id", 1).limit(self.batch_size).to_list(None)
+            if not docs:
+                break
+            after_id = docs[-1]["_id"]
+            scanned += len(docs)
+
+            misplaced: Dict[str, List[Dict[str, Any]]] = {}
+            for doc in docs:
+                owner = self.partitions.owner(doc["_id"])
+                if owner != source:
+                    misplaced.setdefault(owner, []).append(doc)
+            if self.dry_run:
+                moved += sum(len(group) for group in misplaced.values())
+                continue
+
+            await self._rebuild_lookups(docs)
+            for owner, group in misplaced.items():
+                target = self.partitions.connections[owner].get_collection(self.collection_name)
+                moved += await self._move(collection, target, group)
+            await asyncio.sleep(self.batch_pause_seconds)
+
+        logger.info(f"Rebalance of {self.collection_name} on {source}: scanned {scanned}, moved {moved}")
+        return {"scanned": scanned, "moved": moved}
+
+    async def run_once(self) -> Dict[str, Dict[str, int]]:
+        return {name: await self.rebalance_partition(name) for name in self.partitions.names}
@@ -0,0 +1,215 @@
+# app/common/query.py
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, Generic, Iterable, List, Optional, Set, Tuple, Type, TypeVar
+
+from pydantic import BaseModel
+from pymongo import ASCENDING, DESCENDING
+
+from app.common.search import SEARCH_FIELD
+from core.config import config
+from core.exceptions.base import InternalServerException
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T', bound=BaseModel)
+
+
+class UnindexedQueryException(InternalServerException):
+    message = "Query is not supported by an index"
+
+
+@dataclass
+class CompiledQuery:
+    filter: Dict[str, Any]
+    sort: List[Tuple[str, int]] = field(default_factory=list)
+    projection: Optional[Dict[str, int]] = None
+    skip: int = 0
+    limit: int = 0
+
+    def shape(self) -> str:
+        """Filter/sort structure without the values, used to explain each query shape once"""
+        def describe(value):
+            if isinstance(value, dict):
+                return "{" + ",".join(f"{k}:{describe(v)}" for k, v in sorted(value.items())) + "}"
+            return "?"
+        sort = ",".join(f"{name}:{direction}" for name, direction in self.sort)
+        return f"{describe(self.filter)} sort({sort})"
+
+
+class Query(Generic[T]):
+    """
+    Fluent filter/sort/projection builder that only accepts fields known to the model.
+
+        repo.query().eq("status", UserStatus.ACTIVE).sort("created_at").limit(50)
+    """
+
+    def __init__(self, model: Type[T], extra_fields: Iterable[str] = ()):
+        self.model = model
+        self._fields: Set[str] = {"_id"} | set(extra_fields)
+        if getattr(model, "SEARCH_FIELDS", ()):
+            self._fields.add(SEARCH_FIELD)
+        for name, info in model.model_fields.items():
+            self._fields.add(info.alias or name)
+        self._filter: Dict[str, Any] = {}
+        self._sort: List[Tuple[str, int]] = []
+        self._projection: Optional[Dict[str, int]] = None
+        self._skip = 0
+        self._limit = 0
+
+    def _field(self, name: str) -> str:
+        if name == "id":
+            name = "_id"
+        if name.split(".", 1)[0] not in self._fields:
+            raise ValueError(f"Unknown field '{name}' for {self.model.__name__}")
+        return name
+
+    def _add(self, name: str, operator: str, value: Any) -> "Query[T]":
+        name = self._field(name)
+        current = self._filter.get(name)
+        if operator == "$eq" and name not in self._filter:
+            self._filter[name] = value
+            return self
+        if current is not None and not (isinstance(current, dict) and all(k.startswith("$") for k in current)):
+            current = {"$eq": current}
+        if current is not None and operator in current:
+            # Merging would silently keep only the last value
+            raise ValueError(f"{operator} is already set for '{name}'")
+        self._filter[name] = {**(current or {}), operator: value}
+        return self
+
+    def eq(self, name: str, value: Any) -> "Query[T]":
+        return self._add(name, "$eq", value)
+
+    def ne(self, name: str, value: Any) -> "Query[T]":
+        return self._add(name, "$ne", value)
+
+    def gt(self, name: str, value: Any) -> "Query[T]":
+        return self._add(name, "$gt", value)
+
+    def gte(self, name: str, value: Any) -> "Query[T]":
+        return self._add(name, "$gte", value)
+
+    def lt(self, name: str, value: Any) -> "Query[T]":
+        return self._add(name, "$lt", value)
+
+    def lte(self, name: str, value: Any) -> "Query[T]":
+        return self._add(name, "$lte", value)
+
+    def in_(self, name: str, values: Iterable[Any]) -> "Query[T]":
+        return self._add(name, "$in", list(values))
+
+    def nin(self, name: str, values: Iterable[Any]) -> "Query[T]":
+        return self._add(name, "$nin", list(values))
+
+    def exists(self, name: str, exists: bool = True) -> "Query[T]":
+        return self._add(name, "$exists", exists)
+
+    def sort(self, name: str, direction: int = ASCENDING) -> "Query[T]":
+        if direction not in (ASCENDING, DESCENDING):
+            raise ValueError("Sort direction must be ASCENDING or DESCENDING")
+        self._sort.append((self._field(name), direction))
+        return self
+
+    def project(self, *names: str) -> "Query[T]":
+        self._projection = {self._field(name): 1 for name in names}
+        return self
+
+    def skip(self, skip: int) -> "Query[T]":
+        self._skip = skip
+        return self
+
+    def limit(self, limit: int) -> "Query[T]":
+        self._limit = limit
+        return self
+
+    def compile(self) -> CompiledQuery:
+        return CompiledQuery(dict(self._filter), list(self._sort), self._projection, self._skip, self._limit)
+
+
+def _plan_stages(plan: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Flatten an explain() winning plan (classic or SBE layout) into its stages"""
+    stages = []
+    pending = [plan]
+    while pending:
+        node = pending.pop()
+        if "queryPlan" in node:
+            node = node["queryPlan"]
+        stages.append(node)
+        if "inputStage" in node:
+            pending.append(node["inputStage"])
+        pending.extend(node.get("inputStages", []))
+    return stages
+
+
+class QueryPlanRegistry:
+    """Explain results for every (repository method, query shape) seen in this process"""
+
+    def __init__(self):
+        self._plans: Dict[Tuple[str, str], Dict[str, Any]] = {}
+
+    def get(self, op_name: str, shape: str) -> Optional[Dict[str, Any]]:
+        return self._plans.get((op_name, shape))
+
+    def record(self, op_name: str, shape: str, explain: Dict[str, Any]) -> Dict[str, Any]:
+        stages = _plan_stages(explain.get("queryPlanner", {}).get("winningPlan", {}))
+        names = [stage.get("stage") for stage in stages]
+        stats = explain.get("executionStats", {})
+        collscan = "COLLSCAN" in names
+        in_memory_sort = "SORT" in names
+        problems = []
+        if collscan:
+            problems.append("COLLSCAN")
+        if in_memory_sort:
+            problems.append("in-memory SORT")
+        entry = {
+            "method": op_name,
+            "shape": shape,
+            "stages": names,
+            "indexes": [stage["indexName"] for stage in stages if "indexName" in stage],
+            "collscan": collscan,
+            "in_memory_sort": in_memory_sort,
+            "problems": problems,
+            "keys_examined": stats.get("totalKeysExamined"),
+            "docs_examined": stats.get("totalDocsExamined"),
+            "returned": stats.get("nReturned"),
+        }
+        self._plans[(op_name, shape)] = entry
+        return entry
+
+    def report(self) -> List[Dict[str, Any]]:
+        return [self._plans[key] for key in sorted(self._plans)]
+
+
+query_plans = QueryPlanRegistry()
+
+
+async def check_query_plan(collection, op_name: str, compiled: CompiledQuery) -> None:
+    """
+    Explain each query shape once and warn about, or reject, plans that scan the
+    whole collection or sort in memory. Controlled by QUERY_PLAN_GUARD
+    ("off", "warn" or "error"); meant for dev and test, not production.
+    The verdict is cached per shape: "warn" logs it once, "error" raises on
+    every call.
+    """
+    mode = config.QUERY_PLAN_GUARD
+    if mode == "off":
+        return
+    shape = compiled.shape()
+    entry = query_plans.get(op_name, shape)
+    first_seen = entry is None
+    if first_seen:
+        cursor = collection.find(compiled.filter, compiled.projection)
+        if compiled.sort:
+            cursor = cursor.sort(compiled.sort)
+        if compiled.limit:
+            cursor = cursor.limit(compiled.skip + compiled.limit)
+        entry = query_plans.record(op_name, shape, await cursor.explain())
+
+    if not entry["problems"]:
+        return
+    message = f"{op_name} on {collection.name} uses {' and '.join(entry['problems'])} for {shape}"
+    if mode == "error":
+        raise UnindexedQueryException(message)
+    if first_seen:
+        logger.warning(message)
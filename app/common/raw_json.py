@@ -0,0 +1,44 @@
+# app/common/raw_json.py
+from typing import Any, Callable, Dict, Iterable, Type
+
+import bson
+from bson.codec_options import DEFAULT_CODEC_OPTIONS, CodecOptions
+from bson.raw_bson import RawBSONDocument
+from pydantic import BaseModel
+from pydantic_core import to_json
+
+# Cursors opened with these return the server's bytes undecoded
+RAW_CODEC_OPTIONS = CodecOptions(document_class=RawBSONDocument)
+
+
+class JsonDocumentEncoder:
+    """
+    Encodes stored documents as the JSON a route returns for the model, without
+    building the models.
+
+    A document already at the model's SCHEMA_VERSION that has every model field
+    is cut down to those fields and handed straight to pydantic-core's
+    serializer, which formats datetimes the same way the model would; `_id`
+    values that aren't JSON types (ObjectId) become strings. Any other document
+    goes through `to_model`, so older documents come out exactly as before.
+    """
+
+    def __init__(self, model: Type[BaseModel], to_model: Callable[[Dict[str, Any]], BaseModel]):
+        self.model = model
+        self.to_model = to_model
+        self.fields = tuple(info.alias or name for name, info in model.model_fields.items())
+        # Server-side field filtering: nothing outside the model leaves the database
+        self.projection = dict.fromkeys(self.fields, 1)
+
+    def _plain(self, doc: Dict[str, Any]) -> Dict[str, Any]:
+        if doc.get("schema_version", 0) >= self.model.SCHEMA_VERSION and all(field in doc for field in self.fields):
+            return doc if len(doc) == len(self.fields) else {field: doc[field] for field in self.fields}
+        return self.to_model(doc).model_dump(by_alias=True)
+
+    def encode(self, docs: Iterable[Dict[str, Any]]) -> bytes:
+        """JSON array of the given decoded documents"""
+        return to_json([self._plain(doc) for doc in docs], fallback=str)
+
+    def encode_raw(self, docs: Iterable[RawBSONDocument], codec_options: CodecOptions = DEFAULT_CODEC_OPTIONS) -> bytes:
+        """JSON array of raw documents, each decoded once (in C) with the collection's codec options"""
+        return self.encode(bson.decode(doc.raw, codec_options) for doc in docs)
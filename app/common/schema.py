@@ -0,0 +1,56 @@
+# app/common/schema.py
+from typing import Any, Callable, Dict, Tuple, Type
+
+from pydantic import BaseModel
+
+Upgrade = Callable[[Dict[str, Any]], Dict[str, Any]]
+
+
+class SchemaUpgrades:
+    """
+    Per-model upgrade functions, each taking a stored document from version N
+    to N+1. Documents are brought to the model's SCHEMA_VERSION on read, so old
+    documents keep validating while the background migrator rewrites them.
+
+    Upgrades can see documents that were partially updated after an upgrade
+    was written, so they should only fill in what is missing.
+
+        @schema_upgrades.register(User, from_version=0)
+        def add_status(doc):
+            doc.setdefault("status", "active")
+            return doc
+    """
+
+    def __init__(self):
+        self._upgrades: Dict[Type[BaseModel], Dict[int, Upgrade]] = {}
+
+    def register(self, model: Type[BaseModel], from_version: int) -> Callable[[Upgrade], Upgrade]:
+        def decorator(func: Upgrade) -> Upgrade:
+            steps = self._upgrades.setdefault(model, {})
+            if from_version in steps:
+                raise ValueError(f"{model.__name__} already has an upgrade from version {from_version}")
+            if from_version >= model.SCHEMA_VERSION:
+                raise ValueError(f"{model.__name__} upgrade from {from_version} is past SCHEMA_VERSION {model.SCHEMA_VERSION}")
+            steps[from_version] = func
+            return func
+        return decorator
+
+    def upgrade(self, model: Type[BaseModel], doc: Dict[str, Any]) -> Tuple[Dict[str, Any], bool]:
+        """The document at the model's current version, and whether anything ran"""
+        version = doc.get("schema_version", 0)
+        target = model.SCHEMA_VERSION
+        if version >= target:
+            return doc, False
+        steps = self._upgrades.get(model, {})
+        doc = dict(doc)
+        while version < target:
+            try:
+                doc = steps[version](doc)
+            except KeyError:
+                raise LookupError(f"No upgrade registered for {model.__name__} from version {version}")
+            version += 1
+        doc["schema_version"] = version
+        return doc, True
+
+
+schema_upgrades = SchemaUpgrades()
@@ -0,0 +1,134 @@
+# app/common/search.py
+"""
+Prefix search over normalized shadow fields.
+
+Every field listed in a model's SEARCH_FIELDS gets a shadow value under
+`search.<field>`, written with the document: the value NFKC-normalized and
+casefolded, then a NUL and the document `_id`. The `_id` suffix makes each
+key unique, so one index on (is_deleted, search.<field>) serves both the
+prefix range and keyset pagination, with no `$or` and no in-memory sort.
+"""
+import base64
+import binascii
+import json
+import unicodedata
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from pymongo import ASCENDING
+
+from core.exceptions.base import BadRequestException
+
+if TYPE_CHECKING:
+    from app.common.ibase_repo import IBaseRepository
+
+SEARCH_FIELD = "search"
+_SEPARATOR = "\x00"
+
+
+def normalize(value: str) -> str:
+    return unicodedata.normalize("NFKC", value).casefold()
+
+
+def search_key(value: Any, id: str) -> str:
+    return f"{normalize(str(value))}{_SEPARATOR}{id}"
+
+
+def search_keys(fields: Iterable[str], id: str, values: Mapping[str, Any]) -> Dict[str, str]:
+    """Shadow keys for the searchable fields present (and not None) in `values`"""
+    return {field: search_key(values[field], id) for field in fields if values.get(field) is not None}
+
+
+def complete_search_keys(fields: Iterable[str], id: str, doc: Mapping[str, Any]) -> Dict[str, str]:
+    """
+    The document's shadow keys with any missing one filled in. Existing keys
+    win: an update to a document stored before it had shadow keys sets only
+    the updated fields' keys, and those are the current ones.
+    """
+    return {**search_keys(fields, id, doc), **(doc.get(SEARCH_FIELD) or {})}
+
+
+def search_indexes(fields: Iterable[str]) -> List[List[Tuple[str, int]]]:
+    return [[("is_deleted", ASCENDING), (f"{SEARCH_FIELD}.{field}", ASCENDING)] for field in fields]
+
+
+def prefix_bounds(prefix: str) -> Tuple[str, str]:
+    """[lower, upper) covering every key that starts with the normalized prefix"""
+    lower = normalize(prefix)
+    return lower, lower[:-1] + chr(ord(lower[-1]) + 1)
+
+
+def encode_cursor(positions: Dict[str, str]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(positions).encode()).decode()
+
+
+def decode_cursor(cursor: Optional[str], fields: Sequence[str]) -> Dict[str, str]:
+    if not cursor:
+        return {}
+    try:
+        positions = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, ValueError):
+        raise BadRequestException("Invalid search cursor")
+    if not isinstance(positions, dict) or not all(isinstance(key, str) for key in positions.values()):
+        raise BadRequestException("Invalid search cursor")
+    if not set(positions) <= set(fields):
+        raise BadRequestException("Search cursor does not match the searched fields")
+    return positions
+
+
+async def prefix_search(
+    repository: "IBaseRepository",
+    prefix: str,
+    fields: Sequence[str],
+    limit: int,
+    cursor: Optional[str] = None,
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    Items with any of `fields` starting with `prefix` (case-insensitively),
+    ordered by the matched value, and the cursor for the next page (None on
+    the last page).
+
+    Each field is read as its own index range after its cursor position and
+    the ranges are merged, so every query stays bounded by `limit` however
+    many documents match. An item matching on several fields is returned at
+    its first match only.
+    """
+    lower, upper = prefix_bounds(prefix)
+    positions = decode_cursor(cursor, fields)
+    start = dict(positions)
+
+    def returned_earlier(item: Any, matched: str) -> bool:
+        # Any other match at or before that field's starting position was returned on an earlier page
+        for field in fields:
+            if field != matched and field in start and getattr(item, field, None) is not None:
+                key = search_key(getattr(item, field), item.id)
+                if lower <= key < upper and key <= start[field]:
+                    return True
+        return False
+
+    candidates: List[Tuple[str, str, Any]] = []
+    full_fields = set()
+    for field in fields:
+        path = f"{SEARCH_FIELD}.{field}"
+        after = positions.get(field)
+        query = repository.query().lt(path, upper).sort(path).limit(limit)
+        query = query.gt(path, after) if after is not None and after >= lower else query.gte(path, lower)
+        items = await repository.find(query, f"search_{field}")
+        if len(items) == limit:
+            full_fields.add(field)
+        for item in items:
+            candidates.append((search_key(getattr(item, field), item.id), field, item))
+
+    candidates.sort(key=lambda candidate: candidate[0])
+    page, seen = [], set()
+    consumed = 0
+    for key, field, item in candidates:
+        if len(page) == limit:
+            break
+        consumed += 1
+        positions[field] = key
+        if item.id not in seen and not returned_earlier(item, field):
+            seen.add(item.id)
+            page.append(item)
+
+    more = consumed < len(candidates) or bool(full_fields)
+    return page, encode_cursor(positions) if more else None
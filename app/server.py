@@ -1,5 +1,8 @@
+import asyncio
 import os
-from typing import List
+import time
+from contextlib import asynccontextmanager
+from typing import List, Optional
 
 from fastapi import FastAPI, Depends, Request
 from fastapi import status
@@ -7,10 +10,21 @@ from fastapi.exceptions import RequestValidationError
 from fastapi.middleware import Middleware
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
+from api.auth import auth_router
+from api.dependencies import container
 from api.health import health_router
+from app.user.interfaces.i_user_repo import IUserRepository
+from app.user.user_model import User
+from core.config import config
+from core.cache.read_cache import get_read_cache
+from core.cache.response_cache import response_cache
+from core.db.database import MongoDBConnection
+from core.db.idempotency import IdempotencyStore
+from core.db.partitions import PartitionSet
 from core.dependencies.logging import Logging
 from core.exceptions.base import CustomException
 from api.user import user_router
+from core.observability.loop_monitor import LoopLagMonitor
 
 
 def init_routes(app: FastAPI) -> None:
@@ -21,6 +35,7 @@ def init_routes(app: FastAPI) -> None:
     
     app.include_router(health_router, tags=["health"])
     app.include_router(user_router, tags=["user"])
+    app.include_router(auth_router, tags=["auth"])
     return
 
 
@@ -41,6 +56,20 @@ def init_middleware() -> List[Middleware]:
     
         # Middleware(LogEntryMiddleware),
     ]
+    # Optional middlewares are only imported when switched on
+    if config.RATE_LIMIT_ENABLED:
+        # Outside idempotency, so a replayed response still costs the client a token
+        from core.middlewares.rate_limit import RateLimitMiddleware
+        middleware.append(Middleware(RateLimitMiddleware))
+    if config.CAUSAL_CONSISTENCY_ENABLED:
+        from core.middlewares.causal_consistency import CausalConsistencyMiddleware
+        middleware.append(Middleware(CausalConsistencyMiddleware))
+    if config.PROFILING_ENABLED:
+        from core.middlewares.profiling import ProfilingMiddleware
+        middleware.append(Middleware(ProfilingMiddleware))
+    if config.IDEMPOTENCY_ENABLED:
+        from core.middlewares.idempotency import IdempotencyMiddleware
+        middleware.append(Middleware(IdempotencyMiddleware))
     return middleware
 
 
@@ -55,6 +84,180 @@ def init_listeners(app: FastAPI) -> None:
     # Exception handler
     _logger = Logging.get_logger(__name__)
 
+    @app.exception_handler(CustomException)
+    async def custom_exception_handler(request: Request, exc: CustomException):
+        headers = {}
+        retry_after = getattr(exc, "retry_after", None)
+        if retry_after is not None:
+            headers["Retry-After"] = str(max(1, int(retry_after)))
+        return JSONResponse(
+            status_code=exc.code,
+            content={"error_code": exc.error_code, "message": exc.message},
+            headers=headers,
+        )
+
+
+
+async def reconcile_stats_forever(repository: IUserRepository, interval_seconds: float) -> None:
+    _logger = Logging.get_logger(__name__)
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            drift = await repository.reconcile_stats()
+            if drift:
+                _logger.warning(f"Corrected drift in user stats: {drift}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            _logger.error(f"User stats reconciliation failed: {str(e)}")
+
+
+def init_background_tasks() -> List[asyncio.Task]:
+    """Start long-running jobs that live as long as the app"""
+    tasks = []
+    if config.ARCHIVAL_ENABLED:
+        from app.common.archival import SoftDeleteArchiver
+
+        db = container.resolve(MongoDBConnection)
+        for collection_name in config.ARCHIVAL_COLLECTIONS:
+            archiver = SoftDeleteArchiver(
+                collection_name,
+                db,
+                retention_days=config.ARCHIVAL_RETENTION_DAYS,
+                batch_size=config.ARCHIVAL_BATCH_SIZE,
+                batch_pause_seconds=config.ARCHIVAL_BATCH_PAUSE_SECONDS,
+                lease_seconds=config.ARCHIVAL_LEASE_SECONDS,
+            )
+            tasks.append(asyncio.create_task(archiver.run_forever(config.ARCHIVAL_INTERVAL_SECONDS)))
+    if config.SCHEMA_MIGRATION_ENABLED:
+        from app.common.migration import SchemaMigrator
+
+        migrator = SchemaMigrator(
+            "users",
+            User,
+            container.resolve(MongoDBConnection),
+            batch_size=config.SCHEMA_MIGRATION_BATCH_SIZE,
+            docs_per_second=config.SCHEMA_MIGRATION_DOCS_PER_SECOND,
+        )
+        tasks.append(asyncio.create_task(migrator.run_once()))
+    if config.STATS_RECONCILE_INTERVAL_SECONDS > 0:
+        repository = container.resolve(IUserRepository)
+        tasks.append(asyncio.create_task(reconcile_stats_forever(repository, config.STATS_RECONCILE_INTERVAL_SECONDS)))
+    return tasks
+
+
+def _connections() -> List[MongoDBConnection]:
+    """Every database the user repository writes to"""
+    if config.REPOSITORY_BACKEND == "partitioned":
+        return list(container.resolve(PartitionSet).connections.values())
+    return [container.resolve(MongoDBConnection)]
+
+
+def init_change_streams() -> List[asyncio.Task]:
+    """One consumer per database holding the watched collections"""
+    if not config.CHANGE_STREAMS_ENABLED:
+        return []
+    from core.db.change_streams import ChangeStreamConsumer, bump_generation, invalidate_read_cache
+
+    tasks = []
+    for db in _connections():
+        consumer = ChangeStreamConsumer(db, config.CHANGE_STREAM_COLLECTIONS, config.CHANGE_STREAM_CHECKPOINT_EVERY)
+        for collection_name in config.CHANGE_STREAM_COLLECTIONS:
+            consumer.register(collection_name, bump_generation(collection_name))
+            if config.READ_CACHE_ENABLED:
+                cache = get_read_cache(collection_name)
+                consumer.register(collection_name, invalidate_read_cache(cache))
+                consumer.on_history_lost(cache.clear)
+        consumer.on_history_lost(response_cache.clear)
+        tasks.append(asyncio.create_task(consumer.run_forever()))
+    return tasks
+
+
+def init_outbox_publishers() -> List[asyncio.Task]:
+    """One publisher per database holding an outbox; a lease keeps one active across workers"""
+    if not config.OUTBOX_ENABLED or config.REPOSITORY_BACKEND == "memory":
+        return []
+    from core.db.outbox import OutboxPublisher
+    from core.db.outbox_sinks import sink_from_spec
+
+    tasks = []
+    for db in _connections():
+        publisher = OutboxPublisher(
+            db,
+            [sink_from_spec(spec) for spec in config.OUTBOX_SINKS],
+            batch_size=config.OUTBOX_BATCH_SIZE,
+            poll_interval_seconds=config.OUTBOX_POLL_INTERVAL_SECONDS,
+            lease_seconds=config.OUTBOX_LEASE_SECONDS,
+        )
+        tasks.append(asyncio.create_task(publisher.run_forever()))
+    return tasks
+
+
+async def init_indexes() -> None:
+    """Create the indexes each repository declares"""
+    if not config.ENSURE_INDEXES_ON_STARTUP:
+        return
+    for repository in (container.resolve(IUserRepository),):
+        await repository.ensure_indexes()
+    if config.IDEMPOTENCY_ENABLED:
+        await container.resolve(IdempotencyStore).ensure_indexes()
+
+
+def warm_up() -> None:
+    """
+    Build what the first requests would otherwise pay for: the signing keys
+    (loading PyJWT and cryptography with them) and the dummy hash. Runs in a
+    thread once the app is serving, so it never delays startup.
+    """
+    from core.security.jwt import ACCESS_TOKEN, REFRESH_TOKEN, _private_key, _public_key
+    from core.security.password import _dummy_hash
+
+    _logger = Logging.get_logger(__name__)
+    started = time.monotonic()
+    import jwt  # noqa: F401
+
+    for token_type in (ACCESS_TOKEN, REFRESH_TOKEN):
+        try:
+            _public_key(token_type)
+            _private_key(token_type)
+        except CustomException as e:
+            # Verify-only deployments have no private key; the first real use reports it
+            _logger.debug(f"Skipped warming {token_type} keys: {e.message}")
+    _dummy_hash()
+    _logger.info(f"Warm-up finished in {(time.monotonic() - started) * 1000:.0f}ms")
+
+
+def init_loop_monitor() -> Optional[LoopLagMonitor]:
+    if not config.LOOP_MONITOR_ENABLED:
+        return None
+    detect_stalls = config.LOOP_STALL_DETECTION
+    if detect_stalls is None:
+        detect_stalls = config.DEBUG
+    monitor = LoopLagMonitor(
+        interval=config.LOOP_MONITOR_INTERVAL_MS / 1000,
+        stall_threshold=config.LOOP_STALL_THRESHOLD_MS / 1000,
+        detect_stalls=detect_stalls,
+    )
+    monitor.start()
+    return monitor
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    monitor = init_loop_monitor()
+    app.state.container = container
+    container.init_singletons()
+    await init_indexes()
+    tasks = init_background_tasks() + init_change_streams() + init_outbox_publishers()
+    if config.STARTUP_WARMUP_ENABLED:
+        tasks.append(asyncio.create_task(asyncio.to_thread(warm_up)))
+    yield
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    if monitor is not None:
+        await monitor.stop()
+    await container.aclose()
 
 
 def create_app() -> FastAPI:
@@ -64,6 +267,7 @@ def create_app() -> FastAPI:
         docs_url="/docs",
         middleware=init_middleware(),
         dependencies=init_dependencies(),
+        lifespan=lifespan,
     )
     init_routes(app=app)
     init_listeners(app=app)
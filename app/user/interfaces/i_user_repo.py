@@ -1,16 +1,18 @@
 # app/user/interfaces/i_user_repo.py
 from abc import ABC, abstractmethod
-from typing import Optional, List
-from app.common.base_repo import BaseRepository
+from datetime import datetime
+from typing import Any, Dict, Optional, List
+from app.common.ibase_repo import IBaseRepository
 from app.user.user_model import User, UserStatus
 
-class IUserRepository(BaseRepository[User], ABC):
+class IUserRepository(IBaseRepository[User], ABC):
+    # consistent=True reads the primary, bypassing caches and hedging (e.g. uniqueness checks)
     @abstractmethod
-    async def get_by_email(self, email: str) -> Optional[User]:
+    async def get_by_email(self, email: str, consistent: bool = False) -> Optional[User]:
         pass
 
     @abstractmethod
-    async def get_by_username(self, username: str) -> Optional[User]:
+    async def get_by_username(self, username: str, consistent: bool = False) -> Optional[User]:
         pass
 
     @abstractmethod
@@ -27,4 +29,23 @@ class IUserRepository(BaseRepository[User], ABC):
 
     @abstractmethod
     async def get_users_by_role(self, role: str, skip: int = 0, limit: int = 100) -> List[User]:
-        pass
\ No newline at end of file
+        pass
+
+    @abstractmethod
+    async def get_recent_logins(self, user_id: str, limit: int = 10) -> List[datetime]:
+        pass
+
+    @abstractmethod
+    async def get_active_users_between(self, since: datetime, until: datetime, limit: int = 100) -> Dict[str, Any]:
+        """count of users active in [since, until) and the `limit` most recent: user_id, last_at, events"""
+        pass
+
+    @abstractmethod
+    async def get_stats(self) -> Dict[str, Any]:
+        """Materialized counts: live, deleted, by_status, by_role"""
+        pass
+
+    @abstractmethod
+    async def reconcile_stats(self) -> Dict[str, int]:
+        """Recount from storage; returns the corrected drift per counter"""
+        pass
@@ -0,0 +1,22 @@
+# app/user/schemas/user_activity_response.py
+from datetime import datetime
+from typing import List
+from pydantic import BaseModel
+
+class LoginHistoryResponse(BaseModel):
+    user_id: str
+    # Newest first
+    logins: List[datetime]
+
+class ActiveUser(BaseModel):
+    user_id: str
+    last_at: datetime
+    # Events in the user's buckets overlapping the window
+    events: int
+
+class ActiveUsersResponse(BaseModel):
+    since: datetime
+    until: datetime
+    count: int
+    # The most recently active first
+    users: List[ActiveUser]
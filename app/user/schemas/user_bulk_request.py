@@ -0,0 +1,56 @@
+# app/user/schemas/user_bulk_request.py
+from datetime import datetime
+from typing import List, Optional
+from pydantic import BaseModel, ConfigDict, Field, field_validator, model_validator
+from app.common.base_model import naive_utc
+from app.user.user_model import UserStatus
+
+class UserFilter(BaseModel):
+    """Users to act on; criteria are ANDed and at least one is required"""
+    model_config = ConfigDict(extra="forbid")
+
+    ids: Optional[List[str]] = Field(default=None, min_length=1, max_length=10_000)
+    status: Optional[UserStatus] = None
+    role: Optional[str] = None
+    is_active: Optional[bool] = None
+    created_after: Optional[datetime] = None
+    created_before: Optional[datetime] = None
+
+    @field_validator("created_after", "created_before")
+    @classmethod
+    def to_naive_utc(cls, value: Optional[datetime]) -> Optional[datetime]:
+        # Compared with stored naive UTC timestamps, in Mongo and in memory alike
+        return naive_utc(value)
+
+    @model_validator(mode="after")
+    def require_criteria(self):
+        if not self.model_dump(exclude_none=True):
+            raise ValueError("At least one filter criterion is required")
+        return self
+
+class UserBulkChanges(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    status: Optional[UserStatus] = None
+    is_active: Optional[bool] = None
+
+    @model_validator(mode="after")
+    def require_changes(self):
+        if not self.model_dump(exclude_none=True):
+            raise ValueError("At least one field to set is required")
+        return self
+
+class UserBulkUpdateRequest(BaseModel):
+    filter: UserFilter
+    set: UserBulkChanges
+    # Only count the users that would change
+    dry_run: bool = False
+
+class UserBulkDeleteRequest(BaseModel):
+    filter: UserFilter
+    dry_run: bool = False
+
+class BulkWriteResponse(BaseModel):
+    matched: int
+    modified: int
+    dry_run: bool
@@ -0,0 +1,9 @@
+# app/user/schemas/user_search_response.py
+from typing import List, Optional
+from pydantic import BaseModel
+from app.user.user_model import User
+
+class UserSearchResponse(BaseModel):
+    items: List[User]
+    # Pass back as `cursor` for the next page; null on the last page
+    next_cursor: Optional[str] = None
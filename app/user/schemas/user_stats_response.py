@@ -0,0 +1,12 @@
+# app/user/schemas/user_stats_response.py
+from datetime import datetime
+from typing import Dict, Optional
+from pydantic import BaseModel, Field
+
+class UserStatsResponse(BaseModel):
+    live: int = 0
+    deleted: int = 0
+    by_status: Dict[str, int] = Field(default_factory=dict)
+    by_role: Dict[str, int] = Field(default_factory=dict)
+    # When the counters were last recounted from the collection
+    reconciled_at: Optional[datetime] = None
@@ -0,0 +1,209 @@
+# app/user/user_activity.py
+"""
+Login and activity history stored with the bucket pattern.
+
+Each user gets one document per day (or week) in `user_activity`, holding
+that period's events in an array capped at the newest `max_events`. An event
+is appended with a single upserted `$push`, so the collection and its indexes
+grow with active users per period rather than with events, and a TTL index
+drops buckets past the retention period.
+"""
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import ASCENDING, DESCENDING
+
+from core.config import config
+from core.db.database import MongoDBConnection
+
+logger = logging.getLogger(__name__)
+
+LOGIN = "login"
+GRANULARITIES = {"day": timedelta(days=1), "week": timedelta(weeks=1)}
+
+
+def bucket_start(at: datetime, granularity: str) -> datetime:
+    """Start of the day, or of the ISO week (Monday), containing `at`"""
+    start = at.replace(hour=0, minute=0, second=0, microsecond=0)
+    return start - timedelta(days=start.weekday()) if granularity == "week" else start
+
+
+def bucket_id(user_id: str, start: datetime) -> str:
+    return f"{user_id}:{start:%Y-%m-%d}"
+
+
+def newest_events(buckets: List[Dict[str, Any]], limit: int, event: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Up to `limit` events from buckets given newest first, newest event first"""
+    events: List[Dict[str, Any]] = []
+    for bucket in buckets:
+        events.extend(e for e in bucket["events"] if event is None or e["event"] == event)
+        if len(events) >= limit:
+            break
+    events.sort(key=lambda e: e["at"], reverse=True)
+    return events[:limit]
+
+
+def most_recent(users: List[Dict[str, Any]], limit: int) -> List[Dict[str, Any]]:
+    ranked = sorted(users, key=lambda user: user["user_id"])
+    ranked.sort(key=lambda user: user["last_at"], reverse=True)
+    return ranked[:limit]
+
+
+def active_in_window(buckets: List[Dict[str, Any]], limit: int) -> Dict[str, Any]:
+    """Group window buckets by user: how many users, and the `limit` most recently active"""
+    users: Dict[str, Dict[str, Any]] = {}
+    for bucket in buckets:
+        user = users.setdefault(bucket["user_id"], {"user_id": bucket["user_id"], "last_at": bucket["last_at"], "events": 0})
+        user["last_at"] = max(user["last_at"], bucket["last_at"])
+        user["events"] += bucket["count"]
+    return {"count": len(users), "users": most_recent(list(users.values()), limit)}
+
+
+def merge_active(results: List[Dict[str, Any]], limit: int) -> Dict[str, Any]:
+    """Combine active_users() results over disjoint sets of users (e.g. partitions)"""
+    return {
+        "count": sum(result["count"] for result in results),
+        "users": most_recent([user for result in results for user in result["users"]], limit),
+    }
+
+
+class ActivityBuckets:
+    """Per-user activity buckets in MongoDB"""
+
+    collection_name = "user_activity"
+    indexes = (
+        # A user's buckets newest first ("last N logins")
+        [("user_id", ASCENDING), ("start", DESCENDING)],
+        # Buckets overlapping a time window ("active users between")
+        [("start", ASCENDING), ("last_at", ASCENDING)],
+    )
+
+    def __init__(
+        self,
+        db: MongoDBConnection,
+        granularity: Optional[str] = None,
+        max_events: Optional[int] = None,
+        retention_days: Optional[int] = None,
+    ):
+        self.db = db
+        self.collection = db.get_collection(self.collection_name)
+        self.granularity = granularity or config.ACTIVITY_BUCKET_GRANULARITY
+        if self.granularity not in GRANULARITIES:
+            raise ValueError(f"Unknown activity bucket granularity: {self.granularity}")
+        self.max_events = max_events or config.ACTIVITY_BUCKET_MAX_EVENTS
+        self.retention = timedelta(days=retention_days or config.ACTIVITY_RETENTION_DAYS)
+
+    def _oldest_start(self) -> datetime:
+        return bucket_start(datetime.utcnow() - self.retention, self.granularity)
+
+    async def ensure_indexes(self) -> None:
+        for keys, options in (
+            *((list(keys), {}) for keys in self.indexes),
+            ([("expires_at", ASCENDING)], {"expireAfterSeconds": 0}),
+        ):
+            try:
+                await self.collection.create_index(keys, **options)
+            except Exception as e:
+                logger.error(f"Failed to create index {keys} on {self.collection_name}: {str(e)}")
+
+    async def record(self, user_id: str, event: str, at: Optional[datetime] = None, **data: Any) -> None:
+        """Append one event to the user's current bucket, creating the bucket if needed"""
+        at = at or datetime.utcnow()
+        start = bucket_start(at, self.granularity)
+        try:
+            await self.db.circuit_breaker.call(
+                self.collection.update_one,
+                {"_id": bucket_id(user_id, start)},
+                {
+                    "$setOnInsert": {
+                        "user_id": user_id,
+                        "start": start,
+                        "expires_at": start + GRANULARITIES[self.granularity] + self.retention,
+                    },
+                    "$push": {"events": {"$each": [{"at": at, "event": event, **data}], "$slice": -self.max_events}},
+                    "$inc": {"count": 1},
+                    "$min": {"first_at": at},
+                    "$max": {"last_at": at},
+                },
+                upsert=True,
+            )
+        except Exception as e:
+            # History is best effort; the action it describes already happened
+            logger.error(f"Failed to record {event} activity for {user_id}: {str(e)}")
+
+    async def recent(self, user_id: str, limit: int, event: Optional[str] = None) -> List[Dict[str, Any]]:
+        """The user's newest `limit` events, reading buckets newest first until enough are found"""
+        cursor = self.collection.find(
+            {"user_id": user_id, "start": {"$gte": self._oldest_start()}}, {"events": 1}
+        ).sort("start", DESCENDING).batch_size(4)
+        buckets = []
+        found = 0
+        async for bucket in cursor:
+            buckets.append(bucket)
+            found += sum(1 for e in bucket["events"] if event is None or e["event"] == event)
+            if found >= limit:
+                break
+        await cursor.close()
+        return newest_events(buckets, limit, event)
+
+    async def active_users(self, since: datetime, until: datetime, limit: int) -> Dict[str, Any]:
+        """
+        Users with any activity between `since` and `until`: how many, and the
+        `limit` most recently active with their event counts. Counts cover
+        whole buckets, so the edges of the window are approximate by up to one
+        bucket. The $group holds every active user in the window, so it may
+        spill to disk; callers keep the window short.
+        """
+        pipeline = [
+            {"$match": {
+                "start": {"$gte": bucket_start(since, self.granularity), "$lt": until},
+                "last_at": {"$gte": since},
+            }},
+            {"$group": {"_id": "$user_id", "last_at": {"$max": "$last_at"}, "events": {"$sum": "$count"}}},
+            {"$facet": {
+                "count": [{"$count": "n"}],
+                "users": [{"$sort": {"last_at": DESCENDING, "_id": ASCENDING}}, {"$limit": limit}],
+            }},
+        ]
+        result = (await self.db.circuit_breaker.call(lambda: self.collection.aggregate(pipeline, allowDiskUse=True).to_list(1)))[0]
+        return {
+            "count": result["count"][0]["n"] if result["count"] else 0,
+            "users": [{"user_id": row["_id"], "last_at": row["last_at"], "events": row["events"]} for row in result["users"]],
+        }
+
+
+class InMemoryActivityBuckets:
+    """The same buckets kept in a dict, for the memory backend"""
+
+    def __init__(self, granularity: Optional[str] = None, max_events: Optional[int] = None):
+        self.granularity = granularity or config.ACTIVITY_BUCKET_GRANULARITY
+        if self.granularity not in GRANULARITIES:
+            raise ValueError(f"Unknown activity bucket granularity: {self.granularity}")
+        self.max_events = max_events or config.ACTIVITY_BUCKET_MAX_EVENTS
+        self._buckets: Dict[str, Dict[str, Any]] = {}
+        self._by_user: Dict[str, List[Tuple[datetime, str]]] = defaultdict(list)
+
+    async def record(self, user_id: str, event: str, at: Optional[datetime] = None, **data: Any) -> None:
+        at = at or datetime.utcnow()
+        start = bucket_start(at, self.granularity)
+        id = bucket_id(user_id, start)
+        bucket = self._buckets.get(id)
+        if bucket is None:
+            bucket = self._buckets[id] = {"user_id": user_id, "start": start, "events": [], "count": 0, "first_at": at, "last_at": at}
+            self._by_user[user_id].append((start, id))
+            self._by_user[user_id].sort(reverse=True)
+        bucket["events"] = (bucket["events"] + [{"at": at, "event": event, **data}])[-self.max_events:]
+        bucket["count"] += 1
+        bucket["first_at"] = min(bucket["first_at"], at)
+        bucket["last_at"] = max(bucket["last_at"], at)
+
+    async def recent(self, user_id: str, limit: int, event: Optional[str] = None) -> List[Dict[str, Any]]:
+        return newest_events([self._buckets[id] for _, id in self._by_user.get(user_id, ())], limit, event)
+
+    async def active_users(self, since: datetime, until: datetime, limit: int) -> Dict[str, Any]:
+        earliest = bucket_start(since, self.granularity)
+        return active_in_window(
+            [b for b in self._buckets.values() if earliest <= b["start"] < until and b["last_at"] >= since], limit
+        )
@@ -0,0 +1,60 @@
+# app/user/user_bulk.py
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+from app.common.schema import schema_upgrades
+from app.common.search import SEARCH_FIELD, complete_search_keys
+from app.user.user_model import User
+
+REQUIRED_FIELDS = ("username", "email", "password_hash")
+# Unique among live users, as UserService.create_user enforces
+UNIQUE_FIELDS = ("email", "username")
+
+
+def prepare_user_document(doc: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Normalize an imported user document, or None to reject it. Passwords must
+    arrive already hashed: plaintext would mean one bcrypt round per user.
+    Documents that would not load as a `User` (after schema upgrades, as on
+    read) are rejected too.
+    """
+    if "password" in doc or any(not doc.get(field) for field in REQUIRED_FIELDS):
+        return None
+    now = datetime.utcnow()
+    doc.setdefault("_id", str(uuid.uuid4()))
+    doc.setdefault("created_at", now)
+    doc.setdefault("updated_at", now)
+    doc.setdefault("is_active", True)
+    doc.setdefault("is_deleted", False)
+    # Searchable straight away rather than once the migrator reaches it
+    doc[SEARCH_FIELD] = complete_search_keys(User.SEARCH_FIELDS, doc["_id"], doc)
+    # Without schema_version the document reads as v0 and is upgraded lazily
+    try:
+        User.model_validate(schema_upgrades.upgrade(User, doc)[0])
+    except (ValidationError, LookupError):
+        return None
+    return doc
+
+
+def find_user_conflicts(collection, batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Documents in `batch` whose email or username already belongs to another
+    live user, or to an earlier document in the batch. Documents matching only
+    themselves (a batch redone after resume) are left to the duplicate count.
+    """
+    taken: Dict[Tuple[str, Any], Any] = {}
+    for field in UNIQUE_FIELDS:
+        existing = collection.find({field: {"$in": [doc[field] for doc in batch]}, "is_deleted": False}, {field: 1})
+        for doc in existing:
+            taken[(field, doc[field])] = doc["_id"]
+    conflicts = []
+    for doc in batch:
+        keys = [(field, doc[field]) for field in UNIQUE_FIELDS]
+        if any(taken.get(key, doc["_id"]) != doc["_id"] for key in keys):
+            conflicts.append(doc)
+            continue
+        taken.update((key, doc["_id"]) for key in keys)
+    return conflicts
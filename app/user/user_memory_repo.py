@@ -0,0 +1,63 @@
+# app/user/user_memory_repo.py
+from typing import Any, Dict, Optional, List
+from datetime import datetime
+from app.common.counters import nest
+from app.common.memory_repo import InMemoryRepository
+from app.user.interfaces.i_user_repo import IUserRepository
+from app.user.user_activity import LOGIN, InMemoryActivityBuckets
+from app.user.user_model import User, UserStatus
+from app.user.user_stats import user_stat_keys
+
+class InMemoryUserRepository(InMemoryRepository[User], IUserRepository):
+    hash_index_fields = ("email", "username")
+
+    def __init__(self):
+        super().__init__(User, "users")
+        self.activity = InMemoryActivityBuckets()
+
+    def _stat_keys(self, doc: Dict[str, Any]) -> List[str]:
+        return user_stat_keys(doc)
+
+    async def get_by_email(self, email: str, consistent: bool = False) -> Optional[User]:
+        """Get user by email"""
+        return self._to_model(self._lookup("email", email))
+
+    async def get_by_username(self, username: str, consistent: bool = False) -> Optional[User]:
+        """Get user by username"""
+        return self._to_model(self._lookup("username", username))
+
+    async def update_last_login(self, user_id: str) -> Optional[User]:
+        """Update user's last login timestamp and append the login to its history bucket"""
+        now = datetime.utcnow()
+        await self.activity.record(user_id, LOGIN, now)
+        return await self.update(user_id, {"last_login": now})
+
+    async def update_status(self, user_id: str, status: UserStatus) -> Optional[User]:
+        """Update user's status"""
+        return await self.update(user_id, {"status": status})
+
+    async def get_active_users(self, skip: int = 0, limit: int = 100) -> List[User]:
+        """Get active users with pagination"""
+        query = self.query().eq("status", UserStatus.ACTIVE).sort("_id").skip(skip).limit(limit)
+        return await self.find(query, "get_active_users")
+
+    async def get_users_by_role(self, role: str, skip: int = 0, limit: int = 100) -> List[User]:
+        """Get users by role with pagination"""
+        query = self.query().eq("roles", role).sort("_id").skip(skip).limit(limit)
+        return await self.find(query, "get_users_by_role")
+
+    async def get_recent_logins(self, user_id: str, limit: int = 10) -> List[datetime]:
+        """Times of the user's newest logins, newest first"""
+        return [event["at"] for event in await self.activity.recent(user_id, limit, LOGIN)]
+
+    async def get_active_users_between(self, since: datetime, until: datetime, limit: int = 100) -> Dict[str, Any]:
+        """Users with activity in the window, from their activity buckets"""
+        return await self.activity.active_users(since, until, limit)
+
+    async def get_stats(self) -> Dict[str, Any]:
+        """User counts maintained on write"""
+        return nest({key: value for key, value in self._counts.items() if value})
+
+    async def reconcile_stats(self) -> Dict[str, int]:
+        """Counters are updated with the data itself, so they cannot drift"""
+        return {}
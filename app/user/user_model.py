@@ -1,7 +1,11 @@
 # app/user/user_model.py
 from pydantic import BaseModel, EmailStr, Field, field_validator
 from enum import Enum
+from datetime import datetime
+from typing import List, Optional
 from app.common.base_model import BaseDBModel
+from app.common.schema import schema_upgrades
+from app.common.search import SEARCH_FIELD, complete_search_keys
 
 class UserStatus(str, Enum):
     ACTIVE = "active"
@@ -9,13 +13,35 @@ class UserStatus(str, Enum):
     SUSPENDED = "suspended"
 
 class User(BaseDBModel):
+    SCHEMA_VERSION = 2
+    SEARCH_FIELDS = ("username", "email", "full_name")
+
     username: str = Field(..., min_length=3, max_length=50)
     email: EmailStr
     password_hash: str
     full_name: str
+    status: UserStatus = UserStatus.ACTIVE
+    roles: List[str] = Field(default_factory=list)
+    last_login: Optional[datetime] = None
 
     @field_validator('username')
     def username_alphanumeric(cls, v):
         if not v.replace("_", "").replace("-", "").isalnum():
             raise ValueError('Username must be alphanumeric')
-        return v
\ No newline at end of file
+        return v
+
+
+@schema_upgrades.register(User, from_version=0)
+def add_status_roles_last_login(doc: dict) -> dict:
+    """v1: status (derived from is_active), roles and last_login"""
+    doc.setdefault("status", UserStatus.ACTIVE.value if doc.get("is_active", True) else UserStatus.INACTIVE.value)
+    doc.setdefault("roles", [])
+    doc.setdefault("last_login", None)
+    return doc
+
+
+@schema_upgrades.register(User, from_version=1)
+def add_search_keys(doc: dict) -> dict:
+    """v2: prefix search shadow fields, each filled separately in case an update already set some"""
+    doc[SEARCH_FIELD] = complete_search_keys(User.SEARCH_FIELDS, doc["_id"], doc)
+    return doc
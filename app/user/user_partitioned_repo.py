@@ -0,0 +1,62 @@
+# app/user/user_partitioned_repo.py
+import asyncio
+from typing import Any, Dict, Optional, List
+from datetime import datetime
+from app.common.partitioned_repo import PartitionedRepository
+from app.user.interfaces.i_user_repo import IUserRepository
+from app.user.user_activity import LOGIN, merge_active
+from app.user.user_model import User, UserStatus
+from app.user.user_repo import UserRepository
+from core.db.partitions import PartitionSet
+
+class PartitionedUserRepository(PartitionedRepository[User], IUserRepository):
+    lookup_fields = ("email", "username")
+
+    def __init__(self, partitions: PartitionSet):
+        super().__init__(User, "users", partitions, UserRepository)
+
+    async def get_by_email(self, email: str, consistent: bool = False) -> Optional[User]:
+        """Get user by email"""
+        return await self.find_by_lookup("email", email, consistent)
+
+    async def get_by_username(self, username: str, consistent: bool = False) -> Optional[User]:
+        """Get user by username"""
+        return await self.find_by_lookup("username", username, consistent)
+
+    async def update_last_login(self, user_id: str) -> Optional[User]:
+        """Update user's last login timestamp and append the login to its history bucket"""
+        now = datetime.utcnow()
+        await self._shard(user_id).activity.record(user_id, LOGIN, now)
+        return await self.update(user_id, {"last_login": now})
+
+    async def update_status(self, user_id: str, status: UserStatus) -> Optional[User]:
+        """Update user's status"""
+        return await self.update(user_id, {"status": status})
+
+    async def get_active_users(self, skip: int = 0, limit: int = 100) -> List[User]:
+        """Get active users with pagination"""
+        query = self.query().eq("status", UserStatus.ACTIVE).sort("_id").skip(skip).limit(limit)
+        return await self.find(query, "get_active_users")
+
+    async def get_users_by_role(self, role: str, skip: int = 0, limit: int = 100) -> List[User]:
+        """Get users by role with pagination"""
+        query = self.query().eq("roles", role).sort("_id").skip(skip).limit(limit)
+        return await self.find(query, "get_users_by_role")
+
+    async def get_recent_logins(self, user_id: str, limit: int = 10) -> List[datetime]:
+        """Times of the user's newest logins, newest first"""
+        return [event["at"] for event in await self._shard(user_id).activity.recent(user_id, limit, LOGIN)]
+
+    async def get_active_users_between(self, since: datetime, until: datetime, limit: int = 100) -> Dict[str, Any]:
+        """Active users of every partition; a user's buckets live on the partition owning the user"""
+        return merge_active(await asyncio.gather(
+            *(shard.activity.active_users(since, until, limit) for shard in self.shards.values())
+        ), limit)
+
+    async def get_stats(self) -> Dict[str, Any]:
+        """User counts summed over every partition's counters document"""
+        return await self.read_counters()
+
+    async def reconcile_stats(self) -> Dict[str, int]:
+        """Recount users on every partition"""
+        return await self.reconcile_counters()
@@ -1,27 +1,49 @@
 # app/user/user_repo.py
-from typing import Optional, List
+from typing import Any, Dict, Optional, List
 from datetime import datetime
+from pymongo import ASCENDING
+from app.common.base_repo import BaseRepository
 from app.user.interfaces.i_user_repo import IUserRepository
+from app.user.user_activity import LOGIN, ActivityBuckets
 from app.user.user_model import User, UserStatus
+from app.user.user_stats import UserStatsCounters
 from core.db.database import MongoDBConnection
 
-class UserRepository(IUserRepository):
+class UserRepository(BaseRepository[User], IUserRepository):
+    indexes = BaseRepository.indexes + (
+        [("email", ASCENDING)],
+        [("username", ASCENDING)],
+        [("status", ASCENDING), ("is_deleted", ASCENDING), ("_id", ASCENDING)],
+        [("roles", ASCENDING), ("is_deleted", ASCENDING), ("_id", ASCENDING)],
+    )
+
+    outbox_exclude_fields = ("password_hash",)
+
     def __init__(self, db: MongoDBConnection):
-        super().__init__(User, "users", db)
+        super().__init__(User, "users", db, counters=UserStatsCounters(db))
+        self.activity = ActivityBuckets(db)
 
-    async def get_by_email(self, email: str) -> Optional[User]:
+    async def ensure_indexes(self) -> None:
+        await super().ensure_indexes()
+        await self.activity.ensure_indexes()
+
+    async def get_by_email(self, email: str, consistent: bool = False) -> Optional[User]:
         """Get user by email"""
-        doc = await self.collection.find_one({"email": email, "is_deleted": False})
-        return User.model_validate(doc) if doc else None
+        doc = await self._find_one_cached(f"email:{email}", {"email": email, "is_deleted": False}, "get_by_email", consistent)
+        return self._to_model(doc)
 
-    async def get_by_username(self, username: str) -> Optional[User]:
+    async def get_by_username(self, username: str, consistent: bool = False) -> Optional[User]:
         """Get user by username"""
-        doc = await self.collection.find_one({"username": username, "is_deleted": False})
-        return User.model_validate(doc) if doc else None
+        doc = await self._find_one_cached(
+            f"username:{username}", {"username": username, "is_deleted": False}, "get_by_username", consistent
+        )
+        return self._to_model(doc)
 
     async def update_last_login(self, user_id: str) -> Optional[User]:
-        """Update user's last login timestamp"""
-        return await self.update(user_id, {"last_login": datetime.utcnow()})
+        """Update user's last login timestamp and append the login to its history bucket"""
+        now = datetime.utcnow()
+        await self.activity.record(user_id, LOGIN, now)
+        return await self.update(user_id, {"last_login": now})
 
     async def update_status(self, user_id: str, status: UserStatus) -> Optional[User]:
         """Update user's status"""
@@ -29,16 +51,27 @@ class UserRepository(IUserRepository):
 
     async def get_active_users(self, skip: int = 0, limit: int = 100) -> List[User]:
         """Get active users with pagination"""
-        cursor = self.collection.find({
-            "is_deleted": False,
-            "status": UserStatus.ACTIVE
-        }).skip(skip).limit(limit)
-        return [User.model_validate(doc) async for doc in cursor]
-    
+        query = self.query().eq("status", UserStatus.ACTIVE).sort("_id").skip(skip).limit(limit)
+        return await self.find(query, "get_active_users")
+
     async def get_users_by_role(self, role: str, skip: int = 0, limit: int = 100) -> List[User]:
         """Get users by role with pagination"""
-        cursor = self.collection.find({
-            "is_deleted": False,
-            "roles": role
-        }).skip(skip).limit(limit)
-        return [User.model_validate(doc) async for doc in cursor]
\ No newline at end of file
+        query = self.query().eq("roles", role).sort("_id").skip(skip).limit(limit)
+        return await self.find(query, "get_users_by_role")
+
+    async def get_recent_logins(self, user_id: str, limit: int = 10) -> List[datetime]:
+        """Times of the user's newest logins, newest first"""
+        return [event["at"] for event in await self.activity.recent(user_id, limit, LOGIN)]
+
+    async def get_active_users_between(self, since: datetime, until: datetime, limit: int = 100) -> Dict[str, Any]:
+        """Users with activity in the window, from their activity buckets"""
+        return await self.activity.active_users(since, until, limit)
+
+    async def get_stats(self) -> Dict[str, Any]:
+        """User counts from the counters document"""
+        doc = await self.counters.read()
+        return {**doc["counts"], "reconciled_at": doc.get("reconciled_at")}
+
+    async def reconcile_stats(self) -> Dict[str, int]:
+        """Recount users and correct the counters document"""
+        return await self.counters.reconcile()
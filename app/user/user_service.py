@@ -1,13 +1,19 @@
 # app/user/user_service.py
-from typing import Optional, List, Dict, Any
+from datetime import datetime, timedelta
+from typing import Optional, List, Dict, Any, Sequence, Tuple
 from fastapi import HTTPException
-import bcrypt
+from app.common.base_model import naive_utc
 from app.user.interfaces.i_user_service import IUserService
 from app.user.user_model import User
-from app.user.user_repo import UserRepository
+from app.user.interfaces.i_user_repo import IUserRepository
+from app.user.schemas.user_bulk_request import UserFilter
+from app.common.query import Query
+from core.config import config
+from core.exceptions.base import BadRequestException
+from core.security.password import hash_password
 
 class UserService(IUserService):
-    def __init__(self, user_repository: UserRepository):
+    def __init__(self, user_repository: IUserRepository):
         self.user_repository = user_repository
 
     async def create_user(self, user_data: dict) -> User:
@@ -15,10 +21,9 @@ class UserService(IUserService):
         if not isinstance(user_data, dict):
             raise ValueError(f"Invalid user_data format: Expected dict, got {type(user_data)}")
 
-        print(user_data)
-        if await self.user_repository.get_by_email(user_data["email"]):
+        if await self.user_repository.get_by_email(user_data["email"], consistent=True):
             raise HTTPException(status_code=400, detail="Email already registered")
-        if await self.user_repository.get_by_username(user_data["username"]):
+        if await self.user_repository.get_by_username(user_data["username"], consistent=True):
             raise HTTPException(status_code=400, detail="Username already taken")
 
         # Extract and hash password before storing
@@ -26,7 +31,7 @@ class UserService(IUserService):
         if not password:
             raise HTTPException(status_code=400, detail="Password is required")
 
-        hashed_password = bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
+        hashed_password = await hash_password(password)
         user_data["password_hash"] = hashed_password  # Store hashed password
 
         user = User(**user_data)
@@ -43,18 +48,96 @@ class UserService(IUserService):
         """Get all users with pagination."""
         return await self.user_repository.get_all(skip, limit)
 
+    async def get_all_users_json(self, skip: int = 0, limit: int = 100) -> bytes:
+        """Same page as get_all_users, already encoded as the response JSON."""
+        return await self.user_repository.get_all_json(skip, limit)
+
+    async def search_users(
+        self, prefix: str, fields: Optional[Sequence[str]] = None, limit: int = 20, cursor: Optional[str] = None
+    ) -> Tuple[List[User], Optional[str]]:
+        """Users whose username, email or full name starts with `prefix`, one keyset page at a time."""
+        prefix = prefix.strip()
+        if not config.SEARCH_MIN_PREFIX_LENGTH <= len(prefix) <= config.SEARCH_MAX_PREFIX_LENGTH:
+            raise BadRequestException(
+                f"Search prefix must be {config.SEARCH_MIN_PREFIX_LENGTH} to {config.SEARCH_MAX_PREFIX_LENGTH} characters"
+            )
+        fields = list(fields or User.SEARCH_FIELDS)
+        unknown = set(fields) - set(User.SEARCH_FIELDS)
+        if unknown:
+            raise BadRequestException(f"Cannot search on {', '.join(sorted(unknown))}")
+        limit = max(1, min(limit, config.SEARCH_MAX_RESULTS))
+        return await self.user_repository.search(prefix, fields, limit, cursor)
+
     async def update_user(self, user_id: str, user_data: Dict[str, Any]) -> User:
         """Update user details."""
         # Handle password updates separately if needed
         if "password" in user_data:
             password = user_data.pop("password")
-            user_data["password_hash"] = bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
+            user_data["password_hash"] = await hash_password(password)
             
         updated_user = await self.user_repository.update(user_id, user_data)
         if not updated_user:
             raise HTTPException(status_code=404, detail="User not found")
         return updated_user
 
+    def _filter_query(self, user_filter: UserFilter) -> Query[User]:
+        query = self.user_repository.query()
+        if user_filter.ids is not None:
+            query = query.in_("_id", user_filter.ids)
+        if user_filter.status is not None:
+            query = query.eq("status", user_filter.status)
+        if user_filter.role is not None:
+            query = query.eq("roles", user_filter.role)
+        if user_filter.is_active is not None:
+            query = query.eq("is_active", user_filter.is_active)
+        if user_filter.created_after is not None:
+            query = query.gte("created_at", user_filter.created_after)
+        if user_filter.created_before is not None:
+            query = query.lt("created_at", user_filter.created_before)
+        return query
+
+    async def bulk_update_users(self, user_filter: UserFilter, changes: Dict[str, Any], dry_run: bool = False) -> Dict[str, int]:
+        """Set the same fields on every matching user."""
+        return await self.user_repository.update_many(self._filter_query(user_filter), changes, dry_run)
+
+    async def bulk_delete_users(self, user_filter: UserFilter, dry_run: bool = False) -> Dict[str, int]:
+        """Soft delete every matching user; refused when more than BULK_DELETE_MAX_MATCHES match."""
+        counted = await self.user_repository.delete_many(self._filter_query(user_filter), dry_run=True)
+        if dry_run:
+            return counted
+        if counted["matched"] > config.BULK_DELETE_MAX_MATCHES:
+            raise BadRequestException(
+                f"Filter matches {counted['matched']} users; at most {config.BULK_DELETE_MAX_MATCHES} "
+                "can be deleted at once. Narrow the filter."
+            )
+        return await self.user_repository.delete_many(self._filter_query(user_filter))
+
+    async def get_recent_logins(self, user_id: str, limit: int = 10) -> List[datetime]:
+        """The user's newest login times, newest first."""
+        await self.get_user(user_id)
+        return await self.user_repository.get_recent_logins(user_id, max(1, min(limit, config.ACTIVITY_MAX_RESULTS)))
+
+    async def get_active_users_between(
+        self, since: Optional[datetime] = None, until: Optional[datetime] = None, limit: int = 100
+    ) -> Dict[str, Any]:
+        """Users with any activity in [since, until); the last day by default."""
+        # Buckets hold naive UTC times; aware bounds (e.g. "...Z" in the query) are converted to match
+        until = naive_utc(until) or datetime.utcnow()
+        since = naive_utc(since) or until - timedelta(days=1)
+        if since >= until:
+            raise BadRequestException("`since` must be before `until`")
+        if until - since > timedelta(days=config.ACTIVITY_RETENTION_DAYS):
+            raise BadRequestException(f"Activity is kept for {config.ACTIVITY_RETENTION_DAYS} days")
+        if until - since > timedelta(days=config.ACTIVITY_MAX_WINDOW_DAYS):
+            raise BadRequestException(f"The window can span at most {config.ACTIVITY_MAX_WINDOW_DAYS} days")
+        limit = max(1, min(limit, config.ACTIVITY_MAX_RESULTS))
+        result = await self.user_repository.get_active_users_between(since, until, limit)
+        return {"since": since, "until": until, **result}
+
+    async def get_user_stats(self) -> Dict[str, Any]:
+        """User totals by state, status and role."""
+        return await self.user_repository.get_stats()
+
     async def delete_user(self, user_id: str) -> bool:
         """Delete a user."""
         return await self.user_repository.delete(user_id)
\ No newline at end of file
@@ -0,0 +1,50 @@
+# app/user/user_stats.py
+from typing import Any, Dict, List
+
+from app.common.counters import CounterDocument
+from app.common.schema import schema_upgrades
+from app.user.user_model import User, UserStatus
+from core.db.database import MongoDBConnection
+
+
+def user_stat_keys(doc: Dict[str, Any]) -> List[str]:
+    """Counters a user document contributes to: live/deleted, and per status and role while live"""
+    if doc.get("is_deleted"):
+        return ["deleted"]
+    doc, _ = schema_upgrades.upgrade(User, doc)
+    status = doc.get("status") or UserStatus.ACTIVE
+    keys = ["live", f"by_status.{getattr(status, 'value', status)}"]
+    keys.extend(f"by_role.{role}" for role in set(doc.get("roles") or ()))
+    return keys
+
+
+class UserStatsCounters(CounterDocument):
+    # is_active decides the status of documents that predate the status field
+    fields = ("is_deleted", "status", "roles", "is_active")
+
+    def __init__(self, db: MongoDBConnection):
+        super().__init__(db, "users")
+        self.users = db.get_collection("users")
+
+    def keys(self, doc: Dict[str, Any]) -> List[str]:
+        return user_stat_keys(doc)
+
+    async def recount(self) -> Dict[str, int]:
+        live = {"$match": {"is_deleted": False}}
+        # Same rule as the v1 upgrade for documents without a status
+        legacy_status = {"$cond": [{"$eq": ["$is_active", False]}, UserStatus.INACTIVE.value, UserStatus.ACTIVE.value]}
+        pipeline = [{"$facet": {
+            "state": [{"$group": {"_id": {"$eq": ["$is_deleted", True]}, "n": {"$sum": 1}}}],
+            "status": [live, {"$group": {"_id": {"$ifNull": ["$status", legacy_status]}, "n": {"$sum": 1}}}],
+            "roles": [
+                live,
+                {"$project": {"roles": {"$setUnion": [{"$ifNull": ["$roles", []]}, []]}}},
+                {"$unwind": "$roles"},
+                {"$group": {"_id": "$roles", "n": {"$sum": 1}}},
+            ],
+        }}]
+        result = (await self.users.aggregate(pipeline).to_list(1))[0]
+        counts = {"deleted" if row["_id"] else "live": row["n"] for row in result["state"]}
+        counts.update({f"by_status.{row['_id']}": row["n"] for row in result["status"]})
+        counts.update({f"by_role.{row['_id']}": row["n"] for row in result["roles"]})
+        return counts
@@ -0,0 +1,69 @@
+# core/cache/read_cache.py
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Set, Tuple
+
+from core.config import config
+
+
+class ReadCache:
+    """
+    LRU cache of raw documents keyed by lookup (e.g. "_id:<id>", "email:<email>").
+
+    Entries older than `ttl_seconds` are not returned by default, but stay around
+    until evicted so they can still be served with `allow_stale=True` while the
+    database is unavailable.
+    """
+
+    def __init__(self, ttl_seconds: float = 30.0, max_entries: int = 10_000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._keys_by_id: Dict[Any, Set[str]] = {}
+
+    def get(self, key: str, allow_stale: bool = False) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        stored_at, doc = entry
+        if not allow_stale and time.monotonic() - stored_at > self.ttl_seconds:
+            return None
+        self._entries.move_to_end(key)
+        return doc
+
+    def set(self, key: str, doc: Dict[str, Any]) -> None:
+        self._entries[key] = (time.monotonic(), doc)
+        self._entries.move_to_end(key)
+        self._keys_by_id.setdefault(doc.get("_id"), set()).add(key)
+        while len(self._entries) > self.max_entries:
+            old_key, (_, old_doc) = self._entries.popitem(last=False)
+            self._forget_key(old_doc.get("_id"), old_key)
+
+    def invalidate(self, doc_id: Any) -> None:
+        """Drop every lookup key that resolved to the given document"""
+        for key in self._keys_by_id.pop(doc_id, ()):
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._keys_by_id.clear()
+
+    def _forget_key(self, doc_id: Any, key: str) -> None:
+        keys = self._keys_by_id.get(doc_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_id[doc_id]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_caches: Dict[str, ReadCache] = {}
+
+
+def get_read_cache(name: str) -> ReadCache:
+    """Process-wide read cache for a collection"""
+    if name not in _caches:
+        _caches[name] = ReadCache(config.READ_CACHE_TTL_SECONDS, config.READ_CACHE_MAX_ENTRIES)
+    return _caches[name]
@@ -0,0 +1,108 @@
+# core/cache/response_cache.py
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, Optional, Tuple
+
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+
+from core.config import config
+from core.observability.metrics import metrics
+
+
+class Generations:
+    """
+    Per-collection write counters. Every write bumps its collection, and cache
+    keys include the current numbers, so one increment orphans every cached
+    page for that collection; orphaned entries simply age out of the LRU.
+    Process-local: other workers learn about writes through the TTL, or
+    sooner when a change stream consumer bumps them.
+    """
+
+    def __init__(self):
+        self._generations: Dict[str, int] = {}
+
+    def get(self, collection: str) -> int:
+        return self._generations.get(collection, 0)
+
+    def bump(self, collection: str) -> None:
+        self._generations[collection] = self._generations.get(collection, 0) + 1
+
+
+generations = Generations()
+
+
+class ResponseCache:
+    """LRU of pre-serialized JSON bodies, so a hit skips the query, validation and encoding"""
+
+    def __init__(self, ttl_seconds: float = 30.0, max_entries: int = 1000, clock: Callable[[], float] = time.monotonic):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[float, bytes]]" = OrderedDict()
+        self._adapters: Dict[Any, TypeAdapter] = {}
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        stored_at, body = entry
+        if self._clock() - stored_at > self.ttl_seconds:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return body
+
+    def set(self, key: Hashable, body: bytes) -> None:
+        self._entries[key] = (self._clock(), body)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def serialize(self, value: Any, response_model: Any) -> bytes:
+        """JSON as FastAPI would render it for `response_model` (by alias)"""
+        adapter = self._adapters.get(response_model)
+        if adapter is None:
+            adapter = self._adapters[response_model] = TypeAdapter(response_model)
+        return adapter.dump_json(value, by_alias=True)
+
+    async def respond(
+        self,
+        request: Request,
+        collections: Iterable[str],
+        params: Dict[str, Any],
+        response_model: Any,
+        produce: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        """
+        Serve a list route from cache, or run `produce` and cache its serialized result.
+        `params` are the parsed query parameters, so defaults and ordering don't split the key.
+        `produce` may also return the JSON body itself, as bytes.
+        """
+        if not config.RESPONSE_CACHE_ENABLED:
+            result = await produce()
+            return Response(result, media_type="application/json") if isinstance(result, bytes) else result
+
+        route = request.scope.get("route")
+        path = getattr(route, "path", request.url.path)
+        key = (
+            path,
+            tuple(sorted(params.items())),
+            tuple((name, generations.get(name)) for name in collections),
+        )
+        body = self.get(key)
+        if body is not None:
+            metrics.counter("response_cache_hits_total", route=path).inc()
+            return Response(body, media_type="application/json", headers={"X-Cache": "HIT"})
+
+        metrics.counter("response_cache_misses_total", route=path).inc()
+        result = await produce()
+        body = result if isinstance(result, bytes) else self.serialize(result, response_model)
+        self.set(key, body)
+        return Response(body, media_type="application/json", headers={"X-Cache": "MISS"})
+
+
+response_cache = ResponseCache(config.RESPONSE_CACHE_TTL_SECONDS, config.RESPONSE_CACHE_MAX_ENTRIES)
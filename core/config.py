@@ -1,6 +1,7 @@
 import os
+from functools import lru_cache
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import Dict, List, Optional
 
 
 class Config(BaseSettings):
@@ -15,10 +16,158 @@ class Config(BaseSettings):
     MONGO_USERNAME: str = os.getenv("MONGO_INITDB_ROOT_USERNAME", "default_user")
     MONGO_PASSWORD: str = os.getenv("MONGO_INITDB_ROOT_PASSWORD", "default_pass")
     MONGO_URI: str = os.getenv("MONGODB_LOCAL_URI", "mongodb://localhost:27017/mydatabase")
+    # "mongo", "partitioned" (users spread over MONGODB_PARTITIONS), or "memory"
+    # for the zero-I/O in-process backend (benchmarks, small single-worker deployments)
+    REPOSITORY_BACKEND: str = "mongo"
+    # Partition name -> URI (database taken from the URI path). Names feed the
+    # hash, so keep them stable; adding one moves ~1/N of users (see `main.py rebalance`)
+    MONGODB_PARTITIONS: Dict[str, str] = {}
+    MONGO_SERVER_SELECTION_TIMEOUT_MS: int = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000))
+
+    # Circuit breaker around repository operations
+    DB_CIRCUIT_FAILURE_THRESHOLD: int = 5
+    DB_CIRCUIT_TIMEOUT_RATE_THRESHOLD: float = 0.5
+    DB_CIRCUIT_WINDOW_SIZE: int = 20
+    DB_CIRCUIT_MIN_CALLS: int = 10
+    DB_CIRCUIT_RECOVERY_TIMEOUT_SECONDS: float = 30.0
+    DB_CIRCUIT_HALF_OPEN_MAX_CALLS: int = 1
+
+    # In-process read cache for repository lookups
+    READ_CACHE_ENABLED: bool = False
+    READ_CACHE_TTL_SECONDS: float = 30.0
+    READ_CACHE_MAX_ENTRIES: int = 10_000
+
+    # Pre-serialized list responses, invalidated by per-collection write generations
+    RESPONSE_CACHE_ENABLED: bool = False
+    RESPONSE_CACHE_TTL_SECONDS: float = 30.0
+    RESPONSE_CACHE_MAX_ENTRIES: int = 1000
+    # List routes encode stored documents straight to JSON instead of validating models
+    RAW_JSON_READS_ENABLED: bool = False
+
+    # Prefix search (GET /users/search)
+    SEARCH_MIN_PREFIX_LENGTH: int = 2
+    SEARCH_MAX_PREFIX_LENGTH: int = 100
+    SEARCH_MAX_RESULTS: int = 50
+
+    # Documents per read-then-update_many batch in bulk updates/deletes
+    BULK_WRITE_BATCH_SIZE: int = 1000
+    # A bulk delete matching more users than this is refused; narrow the filter
+    BULK_DELETE_MAX_MATCHES: int = 1000
+
+    # Transactional outbox of user change events, drained to sinks ("file:<path>", "webhook:<url>", "queue")
+    OUTBOX_ENABLED: bool = False
+    OUTBOX_SINKS: List[str] = []
+    OUTBOX_BATCH_SIZE: int = 500
+    OUTBOX_POLL_INTERVAL_SECONDS: float = 1.0
+    OUTBOX_LEASE_SECONDS: float = 30.0
+    OUTBOX_RETENTION_SECONDS: int = 7 * 24 * 3600
+
+    # Change streams fan writes from every worker out to the in-process caches
+    # above (read cache and response cache generations); needs a replica set
+    CHANGE_STREAMS_ENABLED: bool = False
+    CHANGE_STREAM_COLLECTIONS: List[str] = ["users"]
+    CHANGE_STREAM_CHECKPOINT_EVERY: int = 100
+
+    # Hedged point reads (get_by_id / get_by_email / get_by_username)
+    HEDGED_READS_ENABLED: bool = False
+    HEDGE_READ_PREFERENCE: str = "secondaryPreferred"
+    HEDGE_DELAY_PERCENTILE: float = 95.0
+    HEDGE_MIN_DELAY_MS: float = 5.0
+    HEDGE_MAX_DELAY_MS: float = 1000.0
+    HEDGE_BUDGET_PERCENT: float = 5.0
+
+    # Per-operation read preference; operations not listed (and all writes) use the
+    # primary. Opt-in, e.g. {"get_all": "secondaryPreferred"}: secondaries lag, so
+    # enable CAUSAL_CONSISTENCY_ENABLED too or clients may not see their own writes
+    READ_PREFERENCE_ROUTING: Dict[str, str] = {}
+    # Causally consistent sessions, with the client's position carried in a header/cookie
+    CAUSAL_CONSISTENCY_ENABLED: bool = False
+    CAUSAL_TOKEN_HEADER: str = "X-Causal-Token"
+    CAUSAL_TOKEN_COOKIE: str = "causal_token"
+
+    # Periodic recount of the materialized user counters (0 disables)
+    STATS_RECONCILE_INTERVAL_SECONDS: int = 6 * 60 * 60
+
+    # Idempotency-Key support on mutating routes under the listed prefixes
+    IDEMPOTENCY_ENABLED: bool = False
+    IDEMPOTENCY_HEADER: str = "Idempotency-Key"
+    IDEMPOTENCY_PATH_PREFIXES: List[str] = ["/users"]
+    IDEMPOTENCY_TTL_SECONDS: int = 24 * 60 * 60
+    # A claim older than this is considered abandoned (worker died mid-request)
+    IDEMPOTENCY_LOCK_SECONDS: float = 30
+    # How long a duplicate waits for the in-flight original before giving up with 409
+    IDEMPOTENCY_WAIT_SECONDS: float = 10
+    IDEMPOTENCY_POLL_INTERVAL_SECONDS: float = 0.05
+
+    # Background archival of soft-deleted documents
+    ARCHIVAL_ENABLED: bool = False
+    ARCHIVAL_COLLECTIONS: List[str] = ["users"]
+    ARCHIVAL_RETENTION_DAYS: int = 30
+    ARCHIVAL_BATCH_SIZE: int = 500
+    ARCHIVAL_BATCH_PAUSE_SECONDS: float = 0.5
+    ARCHIVAL_INTERVAL_SECONDS: float = 3600.0
+    # One archiver per collection at a time across workers and the CLI
+    ARCHIVAL_LEASE_SECONDS: float = 60.0
+
+    # Background rewrite of documents below their model's SCHEMA_VERSION
+    SCHEMA_MIGRATION_ENABLED: bool = False
+    SCHEMA_MIGRATION_BATCH_SIZE: int = 200
+    SCHEMA_MIGRATION_DOCS_PER_SECOND: float = 500
+
+    # Explain each query shape once and flag COLLSCAN / in-memory SORT: "off", "warn" or "error"
+    QUERY_PLAN_GUARD: str = "off"
+    ENSURE_INDEXES_ON_STARTUP: bool = True
+
+    # On-demand / sampled request profiling
+    PROFILING_ENABLED: bool = False
+    PROFILING_HEADER: str = "X-Profile"
+    PROFILING_ADMIN_TOKEN: str = os.getenv("PROFILING_ADMIN_TOKEN", "")
+    PROFILING_MODE: str = "sampling"  # "sampling" or "deterministic"
+    PROFILING_SAMPLE_INTERVAL_MS: float = 5.0
+    PROFILING_OUTPUT_DIR: str = "profiles"
+    PROFILING_SAMPLE_EVERY_N: int = 0  # aggregate mode: profile 1-in-N requests per route, 0 disables
+    PROFILING_AGGREGATE_FLUSH_EVERY: int = 20
+
+    # Event-loop lag sampling; stall detection (stack dump of blocking code) defaults to DEBUG
+    LOOP_MONITOR_ENABLED: bool = True
+    LOOP_MONITOR_INTERVAL_MS: float = 100.0
+    LOOP_STALL_DETECTION: Optional[bool] = None
+    LOOP_STALL_THRESHOLD_MS: float = 100.0
+
+    # Load JWT keys, PyJWT and bcrypt in a background thread once the app is serving
+    STARTUP_WARMUP_ENABLED: bool = True
+
+    # bcrypt cost for new hashes. Pin it per machine type from `main.py calibrate-hash`
+    # (timed against PASSWORD_HASH_TARGET_MS); never below PASSWORD_HASH_MIN_COST,
+    # the cost existing hashes were made with
+    PASSWORD_HASH_COST: int = 12
+    PASSWORD_HASH_TARGET_MS: float = 250.0
+    PASSWORD_HASH_MIN_COST: int = 12
+    PASSWORD_HASH_MAX_COST: int = 16
+
+    # Login/activity history: one document per user per "day" or "week", capped at the newest events
+    ACTIVITY_BUCKET_GRANULARITY: str = "day"
+    ACTIVITY_BUCKET_MAX_EVENTS: int = 100
+    ACTIVITY_RETENTION_DAYS: int = 180
+    # Widest window "active users between" will group over in one query
+    ACTIVITY_MAX_WINDOW_DAYS: int = 31
+    ACTIVITY_MAX_RESULTS: int = 100
 
     # Redis Configuration
     REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379")
 
+    # Per-client token buckets (API key, JWT subject or client IP), shared through Redis
+    RATE_LIMIT_ENABLED: bool = False
+    RATE_LIMIT_PATH_PREFIXES: List[str] = ["/users"]
+    RATE_LIMIT_RATE_PER_SECOND: float = 20.0
+    RATE_LIMIT_BURST: int = 40
+    # Tokens a worker takes from Redis per round trip and spends locally
+    RATE_LIMIT_LOCAL_BATCH: int = 5
+    RATE_LIMIT_API_KEY_HEADER: str = "X-API-Key"
+    # SHA-256 hex digests of the API keys that get their own bucket; other keys count against the caller's IP
+    RATE_LIMIT_API_KEY_HASHES: List[str] = []
+    RATE_LIMIT_REDIS_TIMEOUT_SECONDS: float = 0.1
+
     # JWT Configuration (Access Tokens)
     ACCESS_TOKEN_PRIVATE_KEY: str = os.getenv("ACCESS_TOKEN_PRIVATE_KEY", "")
     ACCESS_TOKEN_PUBLIC_KEY: str = os.getenv("ACCESS_TOKEN_PUBLIC_KEY", "")
@@ -30,12 +179,18 @@ class Config(BaseSettings):
     REFRESH_TOKEN_PUBLIC_KEY: str = os.getenv("REFRESH_TOKEN_PUBLIC_KEY", "")
     REFRESH_TOKEN_EXPIRED_IN: str = os.getenv("REFRESH_TOKEN_EXPIRED_IN", "60m")
     REFRESH_TOKEN_MAXAGE: int = int(os.getenv("REFRESH_TOKEN_MAXAGE", 60))
+    JWT_ALGORITHM: str = "RS256"
+    AUTH_REQUIRED: bool = False
+    # Role needed for admin-only routes (bulk writes), checked whatever AUTH_REQUIRED says
+    ADMIN_ROLE: str = "admin"
+    AUTH_TOKEN_CACHE_MAX_ENTRIES: int = 10_000
 
 
 class DevelopmentConfig(Config):
     ENV: str = "dev"
     LOG_LEVEL: str = "DEBUG"
     LOG_HANDLERS: List[str] = ["console"]
+    QUERY_PLAN_GUARD: str = "warn"
 
 
 class ProductionConfig(Config):
@@ -45,13 +200,26 @@ class ProductionConfig(Config):
     LOG_HANDLERS: List[str] = ["watchtower", "console"]
 
 
-def get_config():
-    env = os.getenv("ENV", "local")
-    config_type = {
-        "dev": DevelopmentConfig(),
-        "prod": ProductionConfig(),
-    }
-    return config_type.get(env, Config())
+class TestConfig(Config):
+    ENV: str = "test"
+    QUERY_PLAN_GUARD: str = "error"
+
+
+CONFIG_CLASSES = {
+    "dev": DevelopmentConfig,
+    "prod": ProductionConfig,
+    "test": TestConfig,
+}
+
+
+@lru_cache(maxsize=None)
+def _load_config(env: str) -> Config:
+    # Settings read the environment and validate every field, so build only the one in use
+    return CONFIG_CLASSES.get(env, Config)()
+
+
+def get_config() -> Config:
+    return _load_config(os.getenv("ENV", "local"))
 
 
 config: Config = get_config()
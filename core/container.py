@@ -0,0 +1,113 @@
+# core/container.py
+import inspect
+import logging
+from contextlib import contextmanager
+from enum import Enum
+from typing import Any, Callable, Dict, Hashable, MutableMapping, Optional
+
+from fastapi import Request
+
+logger = logging.getLogger(__name__)
+
+REQUEST_CACHE_KEY = "container.request_cache"
+
+
+class Scope(str, Enum):
+    SINGLETON = "singleton"  # one instance per process, built at startup
+    REQUEST = "request"  # one instance per HTTP request
+    TRANSIENT = "transient"  # a new instance on every resolve
+
+
+class Provider:
+    __slots__ = ("factory", "scope")
+
+    def __init__(self, factory: Callable[["Container"], Any], scope: Scope):
+        self.factory = factory
+        self.scope = scope
+
+
+class Container:
+    """
+    Minimal dependency container. Factories receive the container so they can
+    resolve their own dependencies:
+
+        container.register(UserService, lambda c: UserService(c.resolve(UserRepository)))
+        get_user_service = container.provider(UserService)   # use with Depends()
+    """
+
+    def __init__(self):
+        self._providers: Dict[Hashable, Provider] = {}
+        self._singletons: Dict[Hashable, Any] = {}
+
+    def register(self, key: Hashable, factory: Callable[["Container"], Any], scope: Scope = Scope.SINGLETON) -> None:
+        self._providers[key] = Provider(factory, scope)
+        self._singletons.pop(key, None)
+
+    def resolve(self, key: Hashable, request_cache: Optional[MutableMapping[Hashable, Any]] = None) -> Any:
+        instance = self._singletons.get(key)
+        if instance is not None:
+            return instance
+        try:
+            provider = self._providers[key]
+        except KeyError:
+            raise LookupError(f"Nothing registered for {key!r}")
+
+        if provider.scope == Scope.SINGLETON:
+            instance = self._singletons[key] = provider.factory(self)
+        elif provider.scope == Scope.REQUEST and request_cache is not None:
+            instance = request_cache.get(key)
+            if instance is None:
+                instance = request_cache[key] = provider.factory(self)
+        else:
+            instance = provider.factory(self)
+        return instance
+
+    def provider(self, key: Hashable) -> Callable[[Request], Any]:
+        """FastAPI dependency resolving `key`; async so it never hops to the threadpool"""
+        async def dependency(request: Request) -> Any:
+            instance = self._singletons.get(key)
+            if instance is not None:
+                return instance
+            return self.resolve(key, request.scope.setdefault(REQUEST_CACHE_KEY, {}))
+
+        dependency.__name__ = f"provide_{getattr(key, '__name__', key)}"
+        return dependency
+
+    def init_singletons(self) -> None:
+        """Build every singleton up front so the first request doesn't pay for it"""
+        for key, provider in self._providers.items():
+            if provider.scope == Scope.SINGLETON:
+                self.resolve(key)
+
+    @contextmanager
+    def override(self, key: Hashable, factory: Callable[["Container"], Any], scope: Scope = Scope.TRANSIENT):
+        """
+        Temporarily replace a registration, e.g. with a fake in tests. Singletons
+        are rebuilt while the override is active, so dependents pick it up too.
+        """
+        previous = self._providers.get(key)
+        previous_singletons = self._singletons
+        self._singletons = {}
+        self._providers[key] = Provider(factory, scope)
+        try:
+            yield
+        finally:
+            if previous is not None:
+                self._providers[key] = previous
+            else:
+                del self._providers[key]
+            self._singletons = previous_singletons
+
+    async def aclose(self) -> None:
+        """Close singletons that expose close()/aclose(), newest first"""
+        for key, instance in reversed(list(self._singletons.items())):
+            close = getattr(instance, "aclose", None) or getattr(instance, "close", None)
+            if close is None:
+                continue
+            try:
+                result = close()
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                logger.error(f"Failed to close {key!r}: {str(e)}")
+        self._singletons.clear()
@@ -0,0 +1,75 @@
+# core/db/causal.py
+import base64
+import binascii
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+import bson
+from bson.errors import BSONError
+from bson.timestamp import Timestamp
+
+
+class CausalContext:
+    """
+    Cluster and operation time observed by one client, carried between requests so
+    that a read after a write (on any worker) is causally ordered after it.
+    """
+
+    def __init__(self, cluster_time: Optional[Dict[str, Any]] = None, operation_time: Optional[Timestamp] = None):
+        self.cluster_time = cluster_time
+        self.operation_time = operation_time
+        self.changed = False
+
+    def apply_to(self, session) -> None:
+        if self.cluster_time is not None:
+            session.advance_cluster_time(self.cluster_time)
+        if self.operation_time is not None:
+            session.advance_operation_time(self.operation_time)
+
+    def update_from(self, session) -> None:
+        cluster_time = session.cluster_time
+        if cluster_time is not None and (
+            self.cluster_time is None or cluster_time["clusterTime"] > self.cluster_time["clusterTime"]
+        ):
+            self.cluster_time = cluster_time
+            self.changed = True
+        operation_time = session.operation_time
+        if operation_time is not None and (self.operation_time is None or operation_time > self.operation_time):
+            self.operation_time = operation_time
+            self.changed = True
+
+    def encode(self) -> str:
+        raw = bson.encode({"clusterTime": self.cluster_time, "operationTime": self.operation_time})
+        return base64.urlsafe_b64encode(raw).decode()
+
+    @classmethod
+    def decode(cls, token: Optional[str]) -> "CausalContext":
+        """Parse a client-supplied token; anything malformed just starts a fresh context"""
+        if not token:
+            return cls()
+        try:
+            data = bson.decode(base64.urlsafe_b64decode(token.encode()))
+        except (BSONError, binascii.Error, ValueError):
+            return cls()
+        cluster_time = data.get("clusterTime")
+        operation_time = data.get("operationTime")
+        if not isinstance(cluster_time, dict) or not isinstance(cluster_time.get("clusterTime"), Timestamp):
+            cluster_time = None
+        if not isinstance(operation_time, Timestamp):
+            operation_time = None
+        return cls(cluster_time, operation_time)
+
+
+_causal_context: ContextVar[Optional[CausalContext]] = ContextVar("causal_context", default=None)
+
+
+def current_causal_context() -> Optional[CausalContext]:
+    return _causal_context.get()
+
+
+def set_causal_context(context: Optional[CausalContext]):
+    return _causal_context.set(context)
+
+
+def reset_causal_context(token) -> None:
+    _causal_context.reset(token)
@@ -0,0 +1,153 @@
+# core/db/change_streams.py
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+from core.cache.read_cache import ReadCache
+from core.cache.response_cache import generations
+from core.db.checkpoints import CheckpointStore
+from core.db.database import MongoDBConnection
+from core.observability.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Resume token no longer in the oplog / unusable: events were missed
+_HISTORY_LOST_CODES = {260, 280, 286}
+# Change streams need a replica set or sharded cluster
+_NOT_SUPPORTED_CODES = {40573}
+
+
+@dataclass
+class ChangeEvent:
+    collection: str
+    operation: str  # insert / update / replace / delete
+    document_id: Any
+    full_document: Optional[Dict[str, Any]]
+
+
+Handler = Callable[[ChangeEvent], None]
+
+
+class ChangeStreamConsumer:
+    """
+    Watches the given collections with one database-level change stream and
+    fans each event out to the handlers registered for its collection, so
+    in-process caches hear about writes made by every other worker.
+
+    The resume token is saved every `checkpoint_every` events (and when idle),
+    so after a restart the stream resumes where it stopped and replays the
+    invalidations that were missed. If the token has fallen off the oplog, the
+    `on_history_lost` hooks run (e.g. clearing caches) and the stream restarts
+    from now.
+    """
+
+    def __init__(
+        self,
+        db: MongoDBConnection,
+        collections: Sequence[str],
+        checkpoint_every: int = 100,
+        retry_seconds: float = 5.0,
+    ):
+        self.db = db
+        self.collections = list(collections)
+        self.checkpoints = CheckpointStore(db)
+        self.checkpoint_name = f"change_stream:{db.name}"
+        self.checkpoint_every = checkpoint_every
+        self.retry_seconds = retry_seconds
+        self._handlers: Dict[str, List[Handler]] = {}
+        self._history_lost_hooks: List[Callable[[], None]] = []
+
+        self._events = metrics.counter("change_stream_events_total", stream=db.name)
+        self._lag = metrics.gauge("change_stream_lag_seconds", stream=db.name)
+        self._restarts = metrics.counter("change_stream_restarts_total", stream=db.name)
+
+    def register(self, collection: str, handler: Handler) -> None:
+        self._handlers.setdefault(collection, []).append(handler)
+
+    def on_history_lost(self, hook: Callable[[], None]) -> None:
+        self._history_lost_hooks.append(hook)
+
+    def _dispatch(self, change: Dict[str, Any]) -> None:
+        collection = change.get("ns", {}).get("coll")
+        event = ChangeEvent(
+            collection=collection,
+            operation=change["operationType"],
+            document_id=change.get("documentKey", {}).get("_id"),
+            full_document=change.get("fullDocument"),
+        )
+        for handler in self._handlers.get(collection, ()):
+            try:
+                handler(event)
+            except Exception as e:
+                logger.error(f"Change handler for {collection} failed: {str(e)}")
+        cluster_time = change.get("clusterTime")
+        if cluster_time is not None:
+            self._lag.set(max(0.0, time.time() - cluster_time.time))
+
+    async def _consume(self) -> None:
+        token = await self.checkpoints.get(self.checkpoint_name)
+        pipeline = [{"$match": {"ns.coll": {"$in": self.collections}}}]
+        async with self.db.db.watch(
+            pipeline, full_document="updateLookup", resume_after=token, max_await_time_ms=1000
+        ) as stream:
+            logger.info(f"Watching {self.collections} on {self.db.name} (resumed: {token is not None})")
+            pending = 0
+            while stream.alive:
+                # Returns None after max_await_time_ms without events
+                change = await stream.try_next()
+                if change is not None:
+                    self._dispatch(change)
+                    self._events.inc()
+                    pending += 1
+                    if pending < self.checkpoint_every:
+                        continue
+                else:
+                    # Caught up: nothing is waiting, so there is no lag
+                    self._lag.set(0.0)
+                    if not pending:
+                        continue
+                if stream.resume_token is not None:
+                    await self.checkpoints.save(self.checkpoint_name, stream.resume_token)
+                pending = 0
+
+    async def run_forever(self) -> None:
+        while True:
+            try:
+                await self._consume()
+            except asyncio.CancelledError:
+                raise
+            except OperationFailure as e:
+                if e.code in _NOT_SUPPORTED_CODES:
+                    logger.error(f"Change streams unavailable on {self.db.name} (needs a replica set); consumer stopped")
+                    return
+                if e.code in _HISTORY_LOST_CODES:
+                    logger.warning(f"Change stream history lost on {self.db.name}; restarting from now")
+                    await self.checkpoints.clear(self.checkpoint_name)
+                    for hook in self._history_lost_hooks:
+                        hook()
+                else:
+                    logger.error(f"Change stream on {self.db.name} failed: {str(e)}")
+            except PyMongoError as e:
+                logger.error(f"Change stream on {self.db.name} failed: {str(e)}")
+            self._restarts.inc()
+            await asyncio.sleep(self.retry_seconds)
+
+
+def invalidate_read_cache(cache: ReadCache) -> Handler:
+    """Drop cached lookups for the changed document, refreshing its `_id` entry if one was cached"""
+    def handler(event: ChangeEvent) -> None:
+        was_cached = cache.get(f"_id:{event.document_id}", allow_stale=True) is not None
+        cache.invalidate(event.document_id)
+        doc = event.full_document
+        if was_cached and doc is not None and not doc.get("is_deleted"):
+            cache.set(f"_id:{event.document_id}", doc)
+    return handler
+
+
+def bump_generation(collection: str) -> Handler:
+    """Orphan cached list pages for the collection"""
+    return lambda event: generations.bump(collection)
@@ -0,0 +1,28 @@
+# core/db/checkpoints.py
+from datetime import datetime
+from typing import Any, Optional
+
+from core.db.database import MongoDBConnection
+
+
+class CheckpointStore:
+    """Resume positions for background jobs, one document per job name"""
+
+    collection_name = "job_checkpoints"
+
+    def __init__(self, db: MongoDBConnection):
+        self.collection = db.get_collection(self.collection_name)
+
+    async def get(self, name: str) -> Optional[Any]:
+        doc = await self.collection.find_one({"_id": name})
+        return doc["value"] if doc else None
+
+    async def save(self, name: str, value: Any) -> None:
+        await self.collection.update_one(
+            {"_id": name},
+            {"$set": {"value": value, "updated_at": datetime.utcnow()}},
+            upsert=True,
+        )
+
+    async def clear(self, name: str) -> None:
+        await self.collection.delete_one({"_id": name})
@@ -0,0 +1,142 @@
+# core/db/circuit_breaker.py
+import asyncio
+import logging
+import time
+from collections import deque
+from enum import Enum
+from typing import Any, Awaitable, Callable, Deque, Optional, TypeVar
+
+from pymongo.errors import ConnectionFailure, ExecutionTimeout, WTimeoutError
+
+from core.exceptions.base import ServiceUnavailableException
+
+logger = logging.getLogger(__name__)
+
+R = TypeVar("R")
+
+
+class CircuitState(str, Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitOpenException(ServiceUnavailableException):
+    message = "Database temporarily unavailable"
+
+    def __init__(self, message=None, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def is_transient_failure(exc: BaseException) -> bool:
+    """Errors that say the database is unreachable or slow, as opposed to a bad query"""
+    return isinstance(exc, (ConnectionFailure, ExecutionTimeout, WTimeoutError, asyncio.TimeoutError))
+
+
+def is_timeout(exc: BaseException) -> bool:
+    return isinstance(exc, asyncio.TimeoutError) or bool(getattr(exc, "timeout", False))
+
+
+class CircuitBreaker:
+    """
+    Fails fast once the database looks unhealthy.
+
+    The circuit opens after `failure_threshold` consecutive transient failures, or
+    when at least `min_calls` of the last `window_size` calls were recorded and the
+    share of timeouts among them reaches `timeout_rate_threshold`. After
+    `recovery_timeout` seconds it lets up to `half_open_max_calls` trial calls
+    through; a successful trial closes the circuit, a failed one re-opens it.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        timeout_rate_threshold: float = 0.5,
+        window_size: int = 20,
+        min_calls: int = 10,
+        recovery_timeout: float = 30.0,
+        half_open_max_calls: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.timeout_rate_threshold = timeout_rate_threshold
+        self.min_calls = min_calls
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self._clock = clock
+
+        self._state = CircuitState.CLOSED
+        self._consecutive_failures = 0
+        self._outcomes: Deque[bool] = deque(maxlen=window_size)  # True when the call timed out
+        self._opened_at = 0.0
+        self._half_open_in_flight = 0
+
+    @property
+    def state(self) -> CircuitState:
+        if self._state == CircuitState.OPEN and self._clock() - self._opened_at >= self.recovery_timeout:
+            self._transition(CircuitState.HALF_OPEN)
+        return self._state
+
+    def _transition(self, state: CircuitState) -> None:
+        if state == self._state:
+            return
+        logger.warning(f"Circuit '{self.name}' {self._state.value} -> {state.value}")
+        self._state = state
+        if state == CircuitState.OPEN:
+            self._opened_at = self._clock()
+        elif state == CircuitState.CLOSED:
+            self._consecutive_failures = 0
+            self._outcomes.clear()
+        self._half_open_in_flight = 0
+
+    def _acquire(self) -> None:
+        state = self.state
+        if state == CircuitState.OPEN:
+            retry_after = max(0.0, self.recovery_timeout - (self._clock() - self._opened_at))
+            raise CircuitOpenException(retry_after=retry_after)
+        if state == CircuitState.HALF_OPEN:
+            if self._half_open_in_flight >= self.half_open_max_calls:
+                raise CircuitOpenException(retry_after=self.recovery_timeout)
+            self._half_open_in_flight += 1
+
+    def record_success(self) -> None:
+        if self._state == CircuitState.HALF_OPEN:
+            self._transition(CircuitState.CLOSED)
+            return
+        self._consecutive_failures = 0
+        self._outcomes.append(False)
+
+    def record_failure(self, timed_out: bool = False) -> None:
+        if self._state == CircuitState.HALF_OPEN:
+            self._transition(CircuitState.OPEN)
+            return
+        self._consecutive_failures += 1
+        self._outcomes.append(timed_out)
+        if self._consecutive_failures >= self.failure_threshold:
+            self._transition(CircuitState.OPEN)
+        elif len(self._outcomes) >= self.min_calls:
+            timeout_rate = sum(self._outcomes) / len(self._outcomes)
+            if timeout_rate >= self.timeout_rate_threshold:
+                self._transition(CircuitState.OPEN)
+
+    async def call(self, func: Callable[..., Awaitable[R]], *args: Any, **kwargs: Any) -> R:
+        """Run `func` through the breaker, raising CircuitOpenException while open"""
+        self._acquire()
+        try:
+            result = await func(*args, **kwargs)
+        except asyncio.CancelledError:
+            if self._state == CircuitState.HALF_OPEN:
+                self._half_open_in_flight = max(0, self._half_open_in_flight - 1)
+            raise
+        except Exception as e:
+            if is_transient_failure(e):
+                self.record_failure(timed_out=is_timeout(e))
+            else:
+                # The server answered, it just didn't like the request
+                self.record_success()
+            raise
+        self.record_success()
+        return result
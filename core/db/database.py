@@ -1,31 +1,88 @@
 # core/db/database.py
 import os
+from typing import Optional
+
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReadPreference, uri_parser
+
+from core.config import config
+from core.db.circuit_breaker import CircuitBreaker
+
+READ_PREFERENCES = {
+    "primary": ReadPreference.PRIMARY,
+    "primaryPreferred": ReadPreference.PRIMARY_PREFERRED,
+    "secondary": ReadPreference.SECONDARY,
+    "secondaryPreferred": ReadPreference.SECONDARY_PREFERRED,
+    "nearest": ReadPreference.NEAREST,
+}
+
+def read_preference_from_name(name: str):
+    """Map a read preference mode name (as in a connection string) to a pymongo read preference"""
+    try:
+        return READ_PREFERENCES[name]
+    except KeyError:
+        raise ValueError(f"Unknown read preference: {name}")
 
 class MongoDBConnection:
     _instance = None
-    
+
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super().__new__(cls)
             cls._instance._initialize()
         return cls._instance
-    
-    def _initialize(self):
+
+    @classmethod
+    def connect(cls, uri: str, db_name: Optional[str] = None, name: str = "mongodb") -> "MongoDBConnection":
+        """
+        A separate, non-singleton connection, e.g. one per storage partition.
+        The database comes from `db_name`, else the URI path, else DB_NAME.
+        """
+        instance = super().__new__(cls)
+        instance._initialize(uri, db_name or uri_parser.parse_uri(uri).get("database"), name)
+        return instance
+
+    def _initialize(self, uri: Optional[str] = None, db_name: Optional[str] = None, name: str = "mongodb"):
         # Configuration
-        self.uri = os.getenv("MONGODB_URI", "mongodb://localhost:27017")
-        self.db_name = os.getenv("DB_NAME", "design_pattern_poc")
-        
+        self.name = name
+        self.uri = uri or os.getenv("MONGODB_URI", "mongodb://localhost:27017")
+        self.db_name = db_name or os.getenv("DB_NAME", "design_pattern_poc")
+
         # Create MongoDB client (async motor client)
-        self.client = AsyncIOMotorClient(self.uri)
+        self.client = AsyncIOMotorClient(
+            self.uri,
+            serverSelectionTimeoutMS=config.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        )
         self.db = self.client[self.db_name]
-    
+        self._supports_transactions: Optional[bool] = None
+
+        # Shared by every repository on this connection so one outage trips the circuit for all of them
+        self.circuit_breaker = CircuitBreaker(
+            name,
+            failure_threshold=config.DB_CIRCUIT_FAILURE_THRESHOLD,
+            timeout_rate_threshold=config.DB_CIRCUIT_TIMEOUT_RATE_THRESHOLD,
+            window_size=config.DB_CIRCUIT_WINDOW_SIZE,
+            min_calls=config.DB_CIRCUIT_MIN_CALLS,
+            recovery_timeout=config.DB_CIRCUIT_RECOVERY_TIMEOUT_SECONDS,
+            half_open_max_calls=config.DB_CIRCUIT_HALF_OPEN_MAX_CALLS,
+        )
+
+    async def supports_transactions(self) -> bool:
+        """Replica sets and sharded clusters do; a standalone mongod doesn't. Checked once."""
+        if self._supports_transactions is None:
+            hello = await self.client.admin.command("hello")
+            self._supports_transactions = "setName" in hello or hello.get("msg") == "isdbgrid"
+        return self._supports_transactions
+
     def get_collection(self, collection_name: str):
         return self.db[collection_name]
-    
+
     async def close(self):
         self.client.close()
+        # A closed client can't be used again; the next get_db_connection() opens a new one
+        if MongoDBConnection._instance is self:
+            MongoDBConnection._instance = None
 
 # Singleton instance
 def get_db_connection() -> MongoDBConnection:
-    return MongoDBConnection()
\ No newline at end of file
+    return MongoDBConnection()
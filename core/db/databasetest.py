@@ -4,8 +4,6 @@ from pymongo import MongoClient
 from pymongo.encryption import ClientEncryption
 from pymongo.encryption_options import AutoEncryptionOpts
 from pymongo.errors import EncryptionError
-from cryptography.hazmat.primitives import serialization
-from cryptography.hazmat.primitives.asymmetric import rsa
 from typing import Optional, Dict, Any
 
 class EncryptionLevel:
@@ -36,7 +34,20 @@ class MongoDBConnection:
         self.key_vault_coll = "__keyVault"
         self.key_vault_namespace = f"{self.key_vault_db}.{self.key_vault_coll}"
         self.master_key_path = "master-key.pem"
-        
+        self._client = None
+
+    @property
+    def client(self) -> MongoClient:
+        # The key vault and encrypted client are only set up on first use
+        if self._client is None:
+            self._connect()
+        return self._client
+
+    @property
+    def db(self):
+        return self.client[self.db_name]
+
+    def _connect(self):
         # Generate or load master key
         self._generate_master_key()
         
@@ -59,11 +70,13 @@ class MongoDBConnection:
         )
         
         # Create MongoDB client
-        self.client = MongoClient(self.uri, auto_encryption_opts=self.auto_encryption_opts)
-        self.db = self.client[self.db_name]
+        self._client = MongoClient(self.uri, auto_encryption_opts=self.auto_encryption_opts)
     
     def _generate_master_key(self):
         if not os.path.exists(self.master_key_path):
+            from cryptography.hazmat.primitives import serialization
+            from cryptography.hazmat.primitives.asymmetric import rsa
+
             private_key = rsa.generate_private_key(
                 public_exponent=65537,
                 key_size=2048
@@ -81,15 +94,17 @@ class MongoDBConnection:
             return f.read()
     
     def _generate_data_key(self):
+        # Runs before the encrypted client exists, so the key vault gets a plain one
+        key_vault_client = MongoClient(self.uri)
         client_encryption = ClientEncryption(
             self.kms_providers,
             self.key_vault_namespace,
-            MongoClient(self.uri),
-            self.db.codec_options
+            key_vault_client,
+            key_vault_client[self.db_name].codec_options
         )
         
         # Check if data key already exists
-        key_vault = self.client[self.key_vault_db][self.key_vault_coll]
+        key_vault = key_vault_client[self.key_vault_db][self.key_vault_coll]
         if key_vault.count_documents({}) == 0:
             self._data_key_id = client_encryption.create_data_key(
                 "local",
@@ -128,9 +143,9 @@ class MongoDBConnection:
         return self.db[collection_name]
 
     async def close(self):
-        self.client.close()
+        if self._client is not None:
+            self._client.close()
 
-# Singleton instance
-mongodb_connection = MongoDBConnection()
 def get_db_connection() -> MongoDBConnection:
-    return mongodb_connection
\ No newline at end of file
+    # Built on first call rather than at import time
+    return MongoDBConnection()
@@ -0,0 +1,149 @@
+# core/db/hedging.py
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Optional, TypeVar
+
+from core.config import config
+from core.observability.metrics import metrics
+
+R = TypeVar("R")
+
+
+class LatencyTracker:
+    """Sliding window of recent latencies with a lazily refreshed percentile"""
+
+    def __init__(self, percentile: float, window_size: int = 1000, refresh_every: int = 50):
+        self.percentile = percentile
+        self._samples: Deque[float] = deque(maxlen=window_size)
+        self._refresh_every = refresh_every
+        self._since_refresh = 0
+        self._value: Optional[float] = None
+
+    def observe(self, seconds: float) -> None:
+        self._samples.append(seconds)
+        self._since_refresh += 1
+        if self._value is None or self._since_refresh >= self._refresh_every:
+            ordered = sorted(self._samples)
+            index = min(len(ordered) - 1, math.ceil(self.percentile / 100 * len(ordered)) - 1)
+            self._value = ordered[max(0, index)]
+            self._since_refresh = 0
+
+    @property
+    def value(self) -> Optional[float]:
+        return self._value
+
+
+class HedgeBudget:
+    """Each request earns `ratio` of a hedge; a hedge spends a whole one"""
+
+    def __init__(self, ratio: float, burst: float = 10.0):
+        self.ratio = ratio
+        self.burst = burst
+        self._tokens = 0.0
+
+    def earn(self) -> None:
+        self._tokens = min(self.burst, self._tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        if self._tokens >= 1.0:
+            self._tokens -= 1.0
+            return True
+        return False
+
+
+class HedgedReader:
+    """
+    Starts a second, differently-routed attempt when the first one is slower than
+    the tracked latency percentile. The first successful answer wins and the
+    other attempt is cancelled, except that a None ("not found") from the hedge
+    is not trusted: a lagging secondary may not have the document yet, so a
+    miss waits for the primary's answer.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        percentile: float = 95.0,
+        min_delay: float = 0.005,
+        max_delay: float = 1.0,
+        budget_ratio: float = 0.05,
+    ):
+        self.name = name
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.latency = LatencyTracker(percentile)
+        self.budget = HedgeBudget(budget_ratio)
+
+        self._requests = metrics.counter("hedged_reads_requests_total", op=name)
+        self._hedges = metrics.counter("hedged_reads_hedges_total", op=name)
+        self._hedge_wins = metrics.counter("hedged_reads_hedge_wins_total", op=name)
+        self._hedge_rate = metrics.gauge("hedged_reads_hedge_rate", op=name)
+        self._win_rate = metrics.gauge("hedged_reads_win_rate", op=name)
+
+    def delay(self) -> float:
+        observed = self.latency.value
+        if observed is None:
+            return self.max_delay
+        return min(self.max_delay, max(self.min_delay, observed))
+
+    def _update_rates(self) -> None:
+        self._hedge_rate.set(self._hedges.value / self._requests.value)
+        if self._hedges.value:
+            self._win_rate.set(self._hedge_wins.value / self._hedges.value)
+
+    async def read(self, primary: Callable[[], Awaitable[R]], hedge: Callable[[], Awaitable[R]]) -> R:
+        self._requests.inc()
+        self.budget.earn()
+        started = time.monotonic()
+
+        primary_task = asyncio.ensure_future(primary())
+        tasks = [primary_task]
+        try:
+            done, _ = await asyncio.wait({primary_task}, timeout=self.delay())
+            if done or not self.budget.try_spend():
+                result = await primary_task
+                self.latency.observe(time.monotonic() - started)
+                return result
+
+            self._hedges.inc()
+            hedge_task = asyncio.ensure_future(hedge())
+            tasks.append(hedge_task)
+            pending = {primary_task, hedge_task}
+            failure: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                if primary_task in done and primary_task.exception() is None:
+                    self.latency.observe(time.monotonic() - started)
+                    return primary_task.result()
+                if hedge_task in done and hedge_task.exception() is None and hedge_task.result() is not None:
+                    self._hedge_wins.inc()
+                    self.latency.observe(time.monotonic() - started)
+                    return hedge_task.result()
+                for task in done:
+                    if task.exception() is not None:
+                        failure = failure or task.exception()
+            # Only reached once the primary has failed
+            raise failure
+        finally:
+            self._update_rates()
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+
+_readers: Dict[str, HedgedReader] = {}
+
+
+def get_hedged_reader(name: str) -> HedgedReader:
+    """Process-wide hedged reader for one repository operation, e.g. "users.get_by_id" """
+    if name not in _readers:
+        _readers[name] = HedgedReader(
+            name,
+            percentile=config.HEDGE_DELAY_PERCENTILE,
+            min_delay=config.HEDGE_MIN_DELAY_MS / 1000,
+            max_delay=config.HEDGE_MAX_DELAY_MS / 1000,
+            budget_ratio=config.HEDGE_BUDGET_PERCENT / 100,
+        )
+    return _readers[name]
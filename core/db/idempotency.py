@@ -0,0 +1,91 @@
+# core/db/idempotency.py
+import logging
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+from pymongo import ASCENDING
+from pymongo.errors import DuplicateKeyError
+
+from core.db.database import MongoDBConnection
+
+logger = logging.getLogger(__name__)
+
+IN_PROGRESS = "in_progress"
+COMPLETED = "completed"
+
+
+class IdempotencyStore:
+    """
+    Idempotency records, one document per (client, key). A record is claimed
+    as in-progress before the request runs and holds the stored response once
+    it completes. Each claim carries an owner token, so a request whose claim
+    was taken over after `lock_seconds` can no longer complete or release it.
+    Mongo's TTL monitor removes records after `ttl_seconds`.
+    """
+
+    collection_name = "idempotency_keys"
+
+    def __init__(self, db: MongoDBConnection, ttl_seconds: int, lock_seconds: float):
+        self.db = db
+        self.collection = db.get_collection(self.collection_name)
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self.lock = timedelta(seconds=lock_seconds)
+
+    async def ensure_indexes(self) -> None:
+        try:
+            await self.collection.create_index([("expires_at", ASCENDING)], expireAfterSeconds=0)
+        except Exception as e:
+            logger.error(f"Failed to create TTL index on {self.collection_name}: {str(e)}")
+
+    async def _call(self, method: str, *args, **kwargs) -> Any:
+        return await self.db.circuit_breaker.call(getattr(self.collection, method), *args, **kwargs)
+
+    async def claim(self, key: str, fingerprint: str) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        """
+        Claim `key` for this request. Returns (owner token, None) when the
+        caller now owns it, otherwise (None, the existing record): in progress
+        elsewhere, completed, or made by a request with another fingerprint.
+        """
+        now = datetime.utcnow()
+        owner = uuid.uuid4().hex
+        try:
+            await self._call("insert_one", {
+                "_id": key,
+                "fingerprint": fingerprint,
+                "owner": owner,
+                "status": IN_PROGRESS,
+                "locked_until": now + self.lock,
+                "expires_at": now + self.ttl,
+            })
+            return owner, None
+        except DuplicateKeyError:
+            pass
+
+        existing = await self._call("find_one", {"_id": key})
+        if existing is None:
+            # Expired or released in between; the next attempt will claim it
+            return None, {"_id": key, "fingerprint": fingerprint, "status": IN_PROGRESS}
+        if existing["status"] == IN_PROGRESS and existing["fingerprint"] == fingerprint and existing["locked_until"] < now:
+            # Abandoned claim on the same request: take it over, unless another request just did
+            result = await self._call(
+                "update_one",
+                {"_id": key, "status": IN_PROGRESS, "owner": existing.get("owner"), "locked_until": existing["locked_until"]},
+                {"$set": {"owner": owner, "locked_until": now + self.lock}},
+            )
+            if result.modified_count:
+                return owner, None
+        return None, existing
+
+    async def complete(self, key: str, owner: str, response: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Store the response if `owner` still holds the claim; None if it was taken over"""
+        record = {**response, "status": COMPLETED, "expires_at": datetime.utcnow() + self.ttl}
+        result = await self._call("update_one", {"_id": key, "owner": owner, "status": IN_PROGRESS}, {"$set": record})
+        if not result.matched_count:
+            logger.warning(f"Idempotency claim on {key} was taken over; response not stored")
+            return None
+        return record
+
+    async def release(self, key: str, owner: str) -> None:
+        """Drop this request's in-progress claim so a retry runs the request again"""
+        await self._call("delete_one", {"_id": key, "owner": owner, "status": IN_PROGRESS})
@@ -0,0 +1,161 @@
+# core/db/outbox.py
+import asyncio
+import logging
+import os
+import socket
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from bson import ObjectId
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from core.db.checkpoints import CheckpointStore
+from core.db.database import MongoDBConnection
+from core.db.outbox_sinks import OutboxSink
+from core.observability.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+CREATE = "create"
+UPDATE = "update"
+DELETE = "delete"
+
+
+def outbox_event(collection: str, op: str, doc_id: Any, changes: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """A compact change event: what happened to which document, and the fields written"""
+    event = {"_id": ObjectId(), "collection": collection, "op": op, "doc_id": doc_id, "at": datetime.utcnow(), "published_at": None}
+    if changes:
+        event["changes"] = changes
+    return event
+
+
+def compact_changes(data: Dict[str, Any], exclude: Iterable[str]) -> Dict[str, Any]:
+    """Written fields worth publishing: no excluded (e.g. secret) fields and no dotted internals"""
+    excluded = set(exclude)
+    return {key: value for key, value in data.items() if key not in excluded and "." not in key}
+
+
+class Outbox:
+    """
+    Change events stored next to the data they describe. Repositories append
+    events with the same session as the write, so inside a transaction both
+    commit or neither does. Published events are removed by a TTL index after
+    `retention_seconds`.
+    """
+
+    collection_name = "outbox"
+
+    def __init__(self, db: MongoDBConnection, retention_seconds: int = 7 * 24 * 3600):
+        self.db = db
+        self.collection = db.get_collection(self.collection_name)
+        self.retention_seconds = retention_seconds
+
+    async def ensure_indexes(self) -> None:
+        for keys, options in (
+            ([("published_at", ASCENDING), ("_id", ASCENDING)], {}),
+            ([("published_at", ASCENDING)], {"expireAfterSeconds": self.retention_seconds}),
+        ):
+            try:
+                await self.collection.create_index(keys, **options)
+            except Exception as e:
+                logger.error(f"Failed to create index {keys} on {self.collection_name}: {str(e)}")
+
+    async def append(self, events: List[Dict[str, Any]], session=None) -> None:
+        if events:
+            await self.collection.insert_many(events, ordered=False, session=session)
+
+
+class OutboxPublisher:
+    """
+    Drains unpublished outbox events, oldest first, in batches of `batch_size`:
+    each batch goes to every sink and is then marked published, so delivery is
+    at least once and sinks should de-duplicate on the event `_id`.
+
+    Events are selected by "not yet published" rather than by position, so an
+    event whose transaction committed late is still delivered. Only one
+    publisher per database holds the lease at a time; the others stand by.
+    The last published event is checkpointed, and delivery lag (now minus the
+    newest delivered event's time) is reported as a gauge.
+    """
+
+    lease_collection_name = "outbox_leases"
+
+    def __init__(
+        self,
+        db: MongoDBConnection,
+        sinks: Sequence[OutboxSink],
+        batch_size: int = 500,
+        poll_interval_seconds: float = 1.0,
+        lease_seconds: float = 30.0,
+    ):
+        self.db = db
+        self.outbox = Outbox(db)
+        self.sinks = list(sinks)
+        self.batch_size = batch_size
+        self.poll_interval_seconds = poll_interval_seconds
+        self.lease = timedelta(seconds=lease_seconds)
+        self.leases = db.get_collection(self.lease_collection_name)
+        self.checkpoints = CheckpointStore(db)
+        self.name = f"outbox:{db.name}"
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{id(self)}"
+
+        self._published = metrics.counter("outbox_events_published_total", outbox=db.name)
+        self._failures = metrics.counter("outbox_publish_failures_total", outbox=db.name)
+        self._lag = metrics.gauge("outbox_delivery_lag_seconds", outbox=db.name)
+        self._backlog = metrics.gauge("outbox_backlog", outbox=db.name)
+
+    async def _acquire_lease(self) -> bool:
+        now = datetime.utcnow()
+        try:
+            lease = await self.leases.find_one_and_update(
+                {"_id": self.name, "$or": [{"owner": self.owner}, {"expires_at": {"$lt": now}}]},
+                {"$set": {"owner": self.owner, "expires_at": now + self.lease}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+        except DuplicateKeyError:
+            # Held by another live publisher (the upsert collided with its document)
+            return False
+        return lease is not None and lease["owner"] == self.owner
+
+    async def publish_batch(self) -> int:
+        """Deliver one batch; returns how many events were published"""
+        cursor = self.outbox.collection.find({"published_at": None}).sort("_id", ASCENDING).limit(self.batch_size)
+        events = await cursor.to_list(None)
+        if not events:
+            self._lag.set(0.0)
+            self._backlog.set(0)
+            return 0
+
+        for sink in self.sinks:
+            await sink.publish(events)
+
+        ids = [event["_id"] for event in events]
+        now = datetime.utcnow()
+        await self.outbox.collection.update_many({"_id": {"$in": ids}}, {"$set": {"published_at": now}})
+        await self.checkpoints.save(self.name, {"last_id": ids[-1], "published_at": now})
+        self._published.inc(len(events))
+        self._lag.set(max(0.0, (now - max(event["at"] for event in events)).total_seconds()))
+        return len(events)
+
+    async def run_forever(self) -> None:
+        while True:
+            try:
+                if not await self._acquire_lease():
+                    await asyncio.sleep(self.lease.total_seconds() / 2)
+                    continue
+                # Keep draining while batches come back full
+                while await self.publish_batch() == self.batch_size and await self._acquire_lease():
+                    pass
+                self._backlog.set(await self.outbox.collection.count_documents({"published_at": None}))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._failures.inc()
+                logger.error(f"Outbox publishing on {self.db.name} failed: {str(e)}")
+            await asyncio.sleep(self.poll_interval_seconds)
+
+    async def aclose(self) -> None:
+        for sink in self.sinks:
+            await sink.aclose()
@@ -0,0 +1,78 @@
+# core/db/outbox_sinks.py
+import asyncio
+import urllib.request
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List
+
+from bson import json_util
+
+
+def encode_events(events: List[Dict[str, Any]]) -> List[str]:
+    """One relaxed extended-JSON line per event (ObjectIds and dates stay readable)"""
+    return [json_util.dumps(event, json_options=json_util.RELAXED_JSON_OPTIONS) for event in events]
+
+
+class OutboxSink(ABC):
+    """Destination for published outbox events. publish() must raise if the batch wasn't delivered."""
+
+    @abstractmethod
+    async def publish(self, events: List[Dict[str, Any]]) -> None:
+        pass
+
+    async def aclose(self) -> None:
+        pass
+
+
+class FileSink(OutboxSink):
+    """Appends events to an NDJSON file"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def _write(self, lines: List[str]) -> None:
+        with open(self.path, "a") as f:
+            f.write("".join(f"{line}\n" for line in lines))
+
+    async def publish(self, events: List[Dict[str, Any]]) -> None:
+        await asyncio.to_thread(self._write, encode_events(events))
+
+
+class WebhookSink(OutboxSink):
+    """POSTs each batch as one JSON array; any non-2xx response fails the batch"""
+
+    def __init__(self, url: str, timeout_seconds: float = 10.0):
+        self.url = url
+        self.timeout_seconds = timeout_seconds
+
+    def _post(self, body: bytes) -> None:
+        request = urllib.request.Request(self.url, data=body, method="POST", headers={"Content-Type": "application/json"})
+        # urlopen raises HTTPError for non-2xx responses
+        with urllib.request.urlopen(request, timeout=self.timeout_seconds):
+            pass
+
+    async def publish(self, events: List[Dict[str, Any]]) -> None:
+        body = f"[{','.join(encode_events(events))}]".encode()
+        await asyncio.to_thread(self._post, body)
+
+
+class QueueSink(OutboxSink):
+    """In-process stand-in for a message queue; publishing waits while the queue is full"""
+
+    def __init__(self, maxsize: int = 10_000):
+        self.queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue(maxsize)
+
+    async def publish(self, events: List[Dict[str, Any]]) -> None:
+        for event in events:
+            await self.queue.put(event)
+
+
+def sink_from_spec(spec: str) -> OutboxSink:
+    """`file:<path>`, `webhook:<url>` or `queue`"""
+    kind, _, target = spec.partition(":")
+    if kind == "file" and target:
+        return FileSink(target)
+    if kind == "webhook" and target:
+        return WebhookSink(target)
+    if kind == "queue":
+        return QueueSink()
+    raise ValueError(f"Unknown outbox sink: {spec}")
@@ -0,0 +1,50 @@
+# core/db/partitions.py
+import asyncio
+import hashlib
+from typing import Dict, Optional, Tuple
+
+from core.config import config
+from core.db.database import MongoDBConnection
+
+
+def _score(partition: str, key: str) -> int:
+    digest = hashlib.blake2b(f"{partition}:{key}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+class PartitionSet:
+    """
+    A fixed set of named Mongo connections with rendezvous (highest random
+    weight) hashing of keys onto them.
+
+    The hash only depends on the key and the partition names, so every process
+    routes a key the same way, and adding a partition moves only the keys that
+    the new partition now wins (~1/N of them) instead of reshuffling everything.
+    """
+
+    def __init__(self, connections: Dict[str, MongoDBConnection]):
+        if not connections:
+            raise ValueError("PartitionSet needs at least one partition")
+        self.connections = dict(connections)
+        self.names: Tuple[str, ...] = tuple(sorted(self.connections))
+
+    @classmethod
+    def from_config(cls, partitions: Optional[Dict[str, str]] = None) -> "PartitionSet":
+        partitions = partitions if partitions is not None else config.MONGODB_PARTITIONS
+        return cls({
+            name: MongoDBConnection.connect(uri, name=f"mongodb:{name}")
+            for name, uri in partitions.items()
+        })
+
+    def owner(self, key: str) -> str:
+        """Name of the partition that owns `key`"""
+        return max(self.names, key=lambda name: _score(name, key))
+
+    def connection_for(self, key: str) -> MongoDBConnection:
+        return self.connections[self.owner(key)]
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    async def close(self):
+        await asyncio.gather(*(connection.close() for connection in self.connections.values()))
@@ -4,7 +4,6 @@ import logging.config
 import sys
 import traceback
 from starlette.datastructures import Headers
-import pydash
 
 config = {
     "version": 1,
@@ -48,6 +47,8 @@ class RedactingHeaderFilter(logging.Filter):
     def filter(self, record):
         if record.levelname != "ERROR":
             if isinstance(record.args, Headers):
+                import pydash  # only needed when headers are logged; keeps it off the import path
+
                 header_log = dict(record.args.items())
                 if "user" in header_log:
                     try:
@@ -0,0 +1,31 @@
+# core/middlewares/causal_consistency.py
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+
+from core.config import config
+from core.db.causal import CausalContext, reset_causal_context, set_causal_context
+
+
+class CausalConsistencyMiddleware(BaseHTTPMiddleware):
+    """
+    Restores the client's causal token (header or cookie) for the duration of the
+    request and hands the advanced token back on the response.
+    """
+
+    async def dispatch(self, request: Request, call_next):
+        token = request.headers.get(config.CAUSAL_TOKEN_HEADER) or request.cookies.get(config.CAUSAL_TOKEN_COOKIE)
+        context = CausalContext.decode(token)
+        # The context object is shared by reference, so updates made while the
+        # endpoint runs are visible here even though it runs in another task.
+        context_token = set_causal_context(context)
+        try:
+            response = await call_next(request)
+        finally:
+            reset_causal_context(context_token)
+
+        if context.operation_time is not None:
+            encoded = context.encode()
+            response.headers[config.CAUSAL_TOKEN_HEADER] = encoded
+            if context.changed:
+                response.set_cookie(config.CAUSAL_TOKEN_COOKIE, encoded, httponly=True, samesite="lax")
+        return response
@@ -0,0 +1,170 @@
+# core/middlewares/idempotency.py
+import asyncio
+import hashlib
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+
+from core.config import config
+from core.db.idempotency import COMPLETED, IdempotencyStore
+from core.exceptions.base import CustomException
+from core.observability.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+MUTATING_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+MAX_KEY_LENGTH = 255
+# Client errors that depend on the moment rather than the request; a retry may well succeed
+TRANSIENT_CLIENT_ERRORS = {401, 403, 408, 409, 425, 429}
+
+
+def _error(status_code: int, error_code: str, message: str, headers: Optional[Dict[str, str]] = None) -> JSONResponse:
+    return JSONResponse(status_code=status_code, content={"error_code": error_code, "message": message}, headers=headers)
+
+
+class IdempotencyMiddleware(BaseHTTPMiddleware):
+    """
+    Idempotency-Key support for mutating requests under IDEMPOTENCY_PATH_PREFIXES.
+
+    The first request with a key runs normally and its response is stored if it
+    is final: a 2xx, or a 4xx that a retry would get again. Retries with the same key and body get the stored response
+    back without reaching the route. A retry that arrives while the original is
+    still running waits for it: in-process through a shared future, across
+    workers by polling the store. Reusing a key with a different body is a 422.
+    """
+
+    def __init__(self, app):
+        super().__init__(app)
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._replays = metrics.counter("idempotency_replays_total")
+        self._waits = metrics.counter("idempotency_waits_total")
+
+    @staticmethod
+    def _applies(request: Request) -> bool:
+        return request.method in MUTATING_METHODS and any(
+            request.url.path.startswith(prefix) for prefix in config.IDEMPOTENCY_PATH_PREFIXES
+        )
+
+    @staticmethod
+    def _record_id(request: Request, key: str) -> str:
+        # Keys are chosen by clients, so scope them to the caller's credentials
+        principal = hashlib.sha256(request.headers.get("authorization", "").encode()).hexdigest()[:16]
+        return f"{principal}:{key}"
+
+    @staticmethod
+    def _storable(status_code: int) -> bool:
+        return 200 <= status_code < 300 or (400 <= status_code < 500 and status_code not in TRANSIENT_CLIENT_ERRORS)
+
+    @staticmethod
+    def _fingerprint(request: Request, body: bytes) -> str:
+        digest = hashlib.sha256(f"{request.method} {request.url.path}\0".encode())
+        digest.update(body)
+        return digest.hexdigest()
+
+    def _replay(self, record: Dict[str, Any], fingerprint: str) -> Response:
+        if record["fingerprint"] != fingerprint:
+            return _error(422, "IDEMPOTENCY_KEY_REUSED", "Idempotency key was already used for a different request")
+        self._replays.inc()
+        response = Response(content=record["body"], status_code=record["status_code"])
+        response.raw_headers = self._decode_headers(record["headers"]) + [
+            (b"content-length", str(len(record["body"])).encode()),
+            (b"idempotent-replayed", b"true"),
+        ]
+        return response
+
+    @staticmethod
+    def _encode_headers(raw_headers: List[Tuple[bytes, bytes]]) -> List[List[str]]:
+        return [[name.decode("latin-1"), value.decode("latin-1")] for name, value in raw_headers if name != b"content-length"]
+
+    @staticmethod
+    def _decode_headers(headers: List[List[str]]) -> List[Tuple[bytes, bytes]]:
+        return [(name.encode("latin-1"), value.encode("latin-1")) for name, value in headers]
+
+    def _conflict(self) -> Response:
+        retry_after = str(max(1, int(config.IDEMPOTENCY_WAIT_SECONDS)))
+        return _error(409, "IDEMPOTENCY_KEY_IN_USE", "A request with this idempotency key is still in progress",
+                      headers={"Retry-After": retry_after})
+
+    async def _claim(self, store: IdempotencyStore, record_id: str, fingerprint: str, deadline: float):
+        """(owner, None) once this request owns the key; (None, record) to replay; (None, None) on timeout"""
+        loop = asyncio.get_running_loop()
+        while True:
+            owner, existing = await store.claim(record_id, fingerprint)
+            if owner is not None:
+                return owner, None
+            if existing["status"] == COMPLETED or existing["fingerprint"] != fingerprint:
+                return None, existing
+            if loop.time() >= deadline:
+                return None, None
+            self._waits.inc()
+            await asyncio.sleep(config.IDEMPOTENCY_POLL_INTERVAL_SECONDS)
+
+    async def dispatch(self, request: Request, call_next):
+        key = request.headers.get(config.IDEMPOTENCY_HEADER)
+        if not key or not self._applies(request):
+            return await call_next(request)
+        if len(key) > MAX_KEY_LENGTH:
+            return _error(400, "IDEMPOTENCY_KEY_INVALID", f"Idempotency key longer than {MAX_KEY_LENGTH} characters")
+
+        body = await request.body()
+        fingerprint = self._fingerprint(request, body)
+        record_id = self._record_id(request, key)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + config.IDEMPOTENCY_WAIT_SECONDS
+
+        # Duplicates in this process wait on the leader's future instead of the store
+        while (inflight := self._inflight.get(record_id)) is not None:
+            self._waits.inc()
+            try:
+                record = await asyncio.wait_for(asyncio.shield(inflight), max(0.0, deadline - loop.time()))
+            except asyncio.TimeoutError:
+                return self._conflict()
+            if record is not None:
+                return self._replay(record, fingerprint)
+            # The leader failed without storing a response; try to take over
+
+        future = loop.create_future()
+        self._inflight[record_id] = future
+        record = None
+        try:
+            store: IdempotencyStore = request.app.state.container.resolve(IdempotencyStore)
+            try:
+                owner, record = await self._claim(store, record_id, fingerprint, deadline)
+            except CustomException as e:
+                return _error(e.code, e.error_code, e.message)
+            if owner is None:
+                return self._replay(record, fingerprint) if record is not None else self._conflict()
+
+            try:
+                response = await call_next(request)
+                response_body = b"".join([chunk async for chunk in response.body_iterator])
+            except BaseException:
+                await asyncio.shield(store.release(record_id, owner))
+                raise
+
+            try:
+                if not self._storable(response.status_code):
+                    # Not final (server errors, throttling, auth, conflicts); let a retry run the request again
+                    await store.release(record_id, owner)
+                else:
+                    record = await store.complete(record_id, owner, {
+                        "fingerprint": fingerprint,
+                        "status_code": response.status_code,
+                        "headers": self._encode_headers(response.raw_headers),
+                        "body": response_body,
+                    })
+            except Exception as e:
+                # The work is done; failing the response now would only invite another retry
+                logger.error(f"Failed to store idempotent response for {record_id}: {str(e)}")
+            replayable = Response(content=response_body, status_code=response.status_code, background=response.background)
+            replayable.raw_headers = [h for h in response.raw_headers if h[0] != b"content-length"] + [
+                (b"content-length", str(len(response_body)).encode())
+            ]
+            return replayable
+        finally:
+            del self._inflight[record_id]
+            # Waiters only replay completed responses; anything else sends them back to the store
+            future.set_result(record if record is not None and record["status"] == COMPLETED else None)
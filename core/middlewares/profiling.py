@@ -0,0 +1,118 @@
+# core/middlewares/profiling.py
+import asyncio
+import hmac
+import logging
+import os
+
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.routing import Match
+
+from core.config import config
+from core.observability.profiler import (
+    AllocationTracer,
+    DeterministicProfiler,
+    RouteProfileAggregator,
+    acquire_capture,
+    artifact_name,
+    create_profiler,
+    release_capture,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _route_path(request: Request) -> str:
+    """Route template (e.g. /users/{user_id}) so per-route sampling doesn't key on ids"""
+    for route in request.app.router.routes:
+        match, child_scope = route.matches(request.scope)
+        if match == Match.FULL:
+            route = child_scope.get("route", route)
+            return getattr(route, "path", request.url.path)
+    return request.url.path
+
+
+class ProfilingMiddleware(BaseHTTPMiddleware):
+    """
+    Opt-in request profiling.
+
+    On demand: a request carrying the admin token in PROFILING_HEADER is profiled
+    and the artifact name is returned in X-Profile-Artifact. Sending
+    X-Profile-Allocations: 1 adds a tracemalloc snapshot.
+    Aggregate: with PROFILING_SAMPLE_EVERY_N > 0, every Nth request per route is
+    profiled and merged into one pstats file per route.
+    """
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.output_dir = config.PROFILING_OUTPUT_DIR
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.aggregator = None
+        if config.PROFILING_SAMPLE_EVERY_N > 0:
+            self.aggregator = RouteProfileAggregator(
+                self.output_dir, config.PROFILING_SAMPLE_EVERY_N, config.PROFILING_AGGREGATE_FLUSH_EVERY
+            )
+
+    def _requested(self, request: Request) -> bool:
+        token = request.headers.get(config.PROFILING_HEADER)
+        return bool(token and config.PROFILING_ADMIN_TOKEN) and hmac.compare_digest(token, config.PROFILING_ADMIN_TOKEN)
+
+    async def dispatch(self, request: Request, call_next):
+        if self._requested(request):
+            return await self._profile_one(request, call_next)
+        if self.aggregator is not None:
+            route = f"{request.method} {_route_path(request)}"
+            if self.aggregator.should_profile(route):
+                return await self._profile_aggregate(route, request, call_next)
+        return await call_next(request)
+
+    async def _profile_one(self, request: Request, call_next):
+        if not acquire_capture():
+            response = await call_next(request)
+            response.headers["X-Profile-Artifact"] = "skipped: another capture is running"
+            return response
+        try:
+            profiler = create_profiler(config.PROFILING_MODE, config.PROFILING_SAMPLE_INTERVAL_MS / 1000)
+            tracer = AllocationTracer() if request.headers.get("X-Profile-Allocations") == "1" else None
+            if tracer:
+                tracer.start()
+            profiler.start()
+            try:
+                response = await call_next(request)
+            finally:
+                profiler.stop()
+                if tracer:
+                    tracer.stop()
+        finally:
+            release_capture()
+
+        base = os.path.join(self.output_dir, artifact_name(request.method, request.url.path))
+
+        def write():
+            written = [profiler.write(base)]
+            if tracer:
+                written.append(tracer.write(base))
+            return written
+
+        artifacts = await asyncio.to_thread(write)
+        logger.info(f"Profiled {request.method} {request.url.path}: {', '.join(artifacts)}")
+        response.headers["X-Profile-Artifact"] = ",".join(os.path.basename(path) for path in artifacts)
+        return response
+
+    async def _profile_aggregate(self, route: str, request: Request, call_next):
+        if not acquire_capture():
+            return await call_next(request)
+        profiler = DeterministicProfiler()
+        try:
+            profiler.start()
+            try:
+                response = await call_next(request)
+            finally:
+                profiler.stop()
+        finally:
+            release_capture()
+
+        stats = self.aggregator.add(route, profiler)
+        if stats is not None:
+            await asyncio.to_thread(stats.dump_stats, self.aggregator.path_for(route))
+        return response
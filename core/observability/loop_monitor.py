@@ -0,0 +1,82 @@
+# core/observability/loop_monitor.py
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from typing import Optional
+
+from core.observability.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+LAG_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+class LoopLagMonitor:
+    """
+    Measures event-loop lag by how late a periodic sleep wakes up, exported as
+    the `event_loop_lag_seconds` histogram.
+
+    With stall detection on, a watchdog thread notices when the loop hasn't
+    woken up for longer than `stall_threshold` and logs the loop thread's stack,
+    which points at whatever synchronous code is holding it.
+    """
+
+    def __init__(self, interval: float = 0.1, stall_threshold: float = 0.1, detect_stalls: bool = False):
+        self.interval = interval
+        self.stall_threshold = stall_threshold
+        self.detect_stalls = detect_stalls
+
+        self.lag = metrics.histogram("event_loop_lag_seconds", buckets=LAG_BUCKETS)
+        self.max_lag = metrics.gauge("event_loop_lag_max_seconds")
+        self.stalls = metrics.counter("event_loop_stalls_total")
+
+        self._heartbeat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    async def _sample(self) -> None:
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - expected)
+            self._heartbeat = now
+            self.lag.observe(lag)
+            if lag > self.max_lag.value:
+                self.max_lag.set(lag)
+
+    def _watch(self) -> None:
+        reported_heartbeat = None
+        while not self._stopped.wait(self.stall_threshold / 2):
+            heartbeat = self._heartbeat
+            stalled_for = time.monotonic() - heartbeat - self.interval
+            if stalled_for < self.stall_threshold or heartbeat == reported_heartbeat:
+                continue
+            # One report per stall, taken while the loop is still blocked
+            reported_heartbeat = heartbeat
+            self.stalls.inc()
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame else "<no frame>"
+            logger.warning(f"Event loop blocked for {stalled_for * 1000:.0f}ms+, loop thread stack:\n{stack}")
+
+    def start(self) -> None:
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._task = asyncio.create_task(self._sample())
+        if self.detect_stalls:
+            self._stopped.clear()
+            self._watchdog = threading.Thread(target=self._watch, name="loop-stall-watchdog", daemon=True)
+            self._watchdog.start()
+
+    async def stop(self) -> None:
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        if self._watchdog is not None:
+            await asyncio.to_thread(self._watchdog.join)
@@ -0,0 +1,158 @@
+# core/observability/profiler.py
+import cProfile
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Dict, Optional
+
+# cProfile can only be active once per interpreter, and profiling two requests at
+# once would just mix their samples, so one capture runs at a time.
+_capture_lock = threading.Lock()
+
+
+def acquire_capture() -> bool:
+    return _capture_lock.acquire(blocking=False)
+
+
+def release_capture() -> None:
+    _capture_lock.release()
+
+
+def artifact_name(method: str, path: str) -> str:
+    slug = re.sub(r"[^A-Za-z0-9]+", "-", path).strip("-") or "root"
+    return f"{time.strftime('%Y%m%dT%H%M%S')}-{method.lower()}-{slug}-{os.getpid()}"
+
+
+class SamplingProfiler:
+    """
+    Samples the stack of one thread (the event loop's) from a background thread
+    and counts collapsed stacks, in the folded format flame graph tools read.
+    Everything running on the loop during the capture is included.
+    """
+
+    def __init__(self, interval: float = 0.005, thread_id: Optional[int] = None):
+        self.interval = interval
+        self.thread_id = thread_id or threading.get_ident()
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            frames = []
+            while frame is not None:
+                code = frame.f_code
+                frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            if frames:
+                self.stacks[";".join(reversed(frames))] += 1
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def write(self, path: str) -> str:
+        path = f"{path}.folded"
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        return path
+
+
+class DeterministicProfiler:
+    """cProfile over the capture window; like sampling, it sees the whole loop thread"""
+
+    def __init__(self):
+        self.profile = cProfile.Profile()
+
+    def start(self) -> None:
+        self.profile.enable()
+
+    def stop(self) -> None:
+        self.profile.disable()
+
+    def write(self, path: str) -> str:
+        path = f"{path}.prof"
+        self.profile.dump_stats(path)
+        return path
+
+
+class AllocationTracer:
+    """tracemalloc snapshot of allocations still alive at the end of the capture"""
+
+    def __init__(self, frames: int = 25):
+        self.frames = frames
+        self._started_here = False
+        self.snapshot: Optional[tracemalloc.Snapshot] = None
+
+    def start(self) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self._started_here = True
+
+    def stop(self) -> None:
+        self.snapshot = tracemalloc.take_snapshot()
+        if self._started_here:
+            tracemalloc.stop()
+
+    def write(self, path: str) -> str:
+        self.snapshot.dump(f"{path}.tracemalloc")
+        with open(f"{path}.allocations.txt", "w") as f:
+            for stat in self.snapshot.statistics("lineno")[:50]:
+                f.write(f"{stat}\n")
+        return f"{path}.tracemalloc"
+
+
+def create_profiler(mode: str, sample_interval: float):
+    if mode == "sampling":
+        return SamplingProfiler(sample_interval)
+    if mode == "deterministic":
+        return DeterministicProfiler()
+    raise ValueError(f"Unknown profiling mode: {mode}")
+
+
+class RouteProfileAggregator:
+    """
+    Profiles 1-in-N requests per route and merges the results, flushing one
+    pstats file per route every `flush_every` captures.
+    """
+
+    def __init__(self, output_dir: str, sample_every: int, flush_every: int = 20):
+        self.output_dir = output_dir
+        self.sample_every = sample_every
+        self.flush_every = flush_every
+        self._requests: Dict[str, int] = {}
+        self._stats: Dict[str, pstats.Stats] = {}
+        self._captures: Dict[str, int] = {}
+
+    def should_profile(self, route: str) -> bool:
+        count = self._requests.get(route, 0) + 1
+        self._requests[route] = count
+        return count % self.sample_every == 0
+
+    def add(self, route: str, profiler: DeterministicProfiler) -> Optional[pstats.Stats]:
+        """Merge a capture; returns the merged stats when it's time to flush them"""
+        stats = self._stats.get(route)
+        if stats is None:
+            self._stats[route] = pstats.Stats(profiler.profile)
+        else:
+            stats.add(profiler.profile)
+        self._captures[route] = self._captures.get(route, 0) + 1
+        if self._captures[route] % self.flush_every == 0:
+            return self._stats[route]
+        return None
+
+    def path_for(self, route: str) -> str:
+        slug = re.sub(r"[^A-Za-z0-9]+", "-", route).strip("-").lower() or "root"
+        return os.path.join(self.output_dir, f"aggregate-{slug}-{os.getpid()}.prof")
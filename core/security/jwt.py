@@ -0,0 +1,117 @@
+# core/security/jwt.py
+import base64
+import binascii
+import hashlib
+import time
+import uuid
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+
+from core.config import config
+from core.exceptions.base import InternalServerException, UnauthorizedException
+
+ACCESS_TOKEN = "access"
+REFRESH_TOKEN = "refresh"
+
+
+def _pem_bytes(value: str) -> bytes:
+    """Keys may be configured as PEM text or as base64-encoded PEM"""
+    if not value:
+        raise InternalServerException("JWT keys are not configured")
+    if "-----BEGIN" in value:
+        return value.replace("\\n", "\n").encode()
+    try:
+        return base64.b64decode(value, validate=True)
+    except binascii.Error:
+        raise InternalServerException("JWT key is neither PEM nor base64-encoded PEM")
+
+
+# Parsed once per process; PEM parsing is far more expensive than a verification.
+# PyJWT and cryptography are imported on first use (or by the startup warm-up),
+# not while the worker boots.
+@lru_cache(maxsize=None)
+def _private_key(token_type: str):
+    from cryptography.hazmat.primitives import serialization
+
+    pem = config.ACCESS_TOKEN_PRIVATE_KEY if token_type == ACCESS_TOKEN else config.REFRESH_TOKEN_PRIVATE_KEY
+    return serialization.load_pem_private_key(_pem_bytes(pem), password=None)
+
+
+@lru_cache(maxsize=None)
+def _public_key(token_type: str):
+    from cryptography.hazmat.primitives import serialization
+
+    pem = config.ACCESS_TOKEN_PUBLIC_KEY if token_type == ACCESS_TOKEN else config.REFRESH_TOKEN_PUBLIC_KEY
+    return serialization.load_pem_public_key(_pem_bytes(pem))
+
+
+class VerifiedTokenCache:
+    """Claims of already-verified tokens, keyed by token hash and dropped at expiry"""
+
+    def __init__(self, max_entries: int = 10_000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[bytes, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        key = self._key(token)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, claims = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            return None
+        return claims
+
+    def set(self, token: str, claims: Dict[str, Any]) -> None:
+        self._entries[self._key(token)] = (float(claims["exp"]), claims)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+verified_tokens = VerifiedTokenCache(config.AUTH_TOKEN_CACHE_MAX_ENTRIES)
+
+
+def create_token(subject: str, token_type: str, claims: Optional[Dict[str, Any]] = None) -> str:
+    import jwt
+
+    max_age_minutes = config.ACCESS_TOKEN_MAXAGE if token_type == ACCESS_TOKEN else config.REFRESH_TOKEN_MAXAGE
+    now = int(time.time())
+    payload = {
+        **(claims or {}),
+        "sub": subject,
+        "type": token_type,
+        "iat": now,
+        "exp": now + max_age_minutes * 60,
+        "jti": uuid.uuid4().hex,
+    }
+    return jwt.encode(payload, _private_key(token_type), algorithm=config.JWT_ALGORITHM)
+
+
+def decode_token(token: str, token_type: str = ACCESS_TOKEN) -> Dict[str, Any]:
+    """Verify a token and return its claims; repeat checks of the same token hit the cache"""
+    claims = verified_tokens.get(token)
+    if claims is None:
+        import jwt
+
+        try:
+            claims = jwt.decode(
+                token,
+                _public_key(token_type),
+                algorithms=[config.JWT_ALGORITHM],
+                options={"require": ["exp", "sub"]},
+            )
+        except jwt.PyJWTError as e:
+            raise UnauthorizedException(f"Invalid token: {str(e)}")
+        verified_tokens.set(token, claims)
+    if claims.get("type") != token_type:
+        raise UnauthorizedException("Invalid token type")
+    return claims
@@ -0,0 +1,94 @@
+# core/security/password.py
+import asyncio
+import re
+import statistics
+import time
+from functools import lru_cache
+from typing import Dict, Optional
+
+import bcrypt
+
+from core.config import config
+from core.observability.metrics import metrics
+
+_COST_PATTERN = re.compile(r"^\$2[abxy]?\$(\d{2})\$")
+
+
+def current_cost() -> int:
+    """Work factor new hashes are made with: the pinned cost, never below the floor"""
+    return max(config.PASSWORD_HASH_COST, config.PASSWORD_HASH_MIN_COST)
+
+
+def hash_cost(password_hash: str) -> Optional[int]:
+    """Work factor stored in a bcrypt hash, or None if it isn't one"""
+    match = _COST_PATTERN.match(password_hash)
+    return int(match.group(1)) if match else None
+
+
+def needs_rehash(password_hash: str) -> bool:
+    # Only upgrade: hashes made at a higher cost are left alone
+    cost = hash_cost(password_hash)
+    return cost is not None and cost < current_cost()
+
+
+def _hash(password: str, cost: int) -> str:
+    started = time.perf_counter()
+    hashed = bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds=cost)).decode()
+    metrics.histogram("password_hash_seconds", op="hash", cost=str(cost)).observe(time.perf_counter() - started)
+    return hashed
+
+
+def _time_cost(cost: int, samples: int = 3) -> float:
+    timings = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        bcrypt.hashpw(b"calibration-password", bcrypt.gensalt(rounds=cost))
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def measure_costs(min_cost: int, max_cost: int, target_ms: float) -> Dict[int, float]:
+    """Seconds per hash for each cost from min_cost up, stopping at the first one past 2x the target"""
+    timings = {}
+    for cost in range(min_cost, max_cost + 1):
+        timings[cost] = _time_cost(cost)
+        if timings[cost] * 1000 > target_ms * 2:
+            break
+    return timings
+
+
+def choose_cost(timings: Dict[int, float], target_ms: float) -> int:
+    within = [cost for cost, seconds in timings.items() if seconds * 1000 <= target_ms]
+    return max(within, default=config.PASSWORD_HASH_MIN_COST)
+
+
+@lru_cache(maxsize=1)
+def _dummy_hash() -> str:
+    # Compared against when the user doesn't exist, so a miss costs as much as a wrong password
+    return bcrypt.hashpw(b"dummy-password", bcrypt.gensalt(rounds=current_cost())).decode()
+
+
+def _verify(password: str, password_hash: str) -> bool:
+    started = time.perf_counter()
+    try:
+        return bcrypt.checkpw(password.encode(), password_hash.encode())
+    except ValueError:
+        return False
+    finally:
+        cost = hash_cost(password_hash)
+        if cost is not None:
+            metrics.histogram("password_hash_seconds", op="verify", cost=str(cost)).observe(time.perf_counter() - started)
+
+
+async def hash_password(password: str) -> str:
+    """bcrypt-hash a password at the current cost in a worker thread"""
+    return await asyncio.to_thread(_hash, password, current_cost())
+
+
+async def verify_password(password: str, password_hash: str) -> bool:
+    """Check a password against its bcrypt hash in a worker thread"""
+    return await asyncio.to_thread(_verify, password, password_hash)
+
+
+async def verify_dummy_password(password: str) -> None:
+    await asyncio.to_thread(lambda: _verify(password, _dummy_hash()))
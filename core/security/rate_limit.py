@@ -0,0 +1,201 @@
+# core/security/rate_limit.py
+import asyncio
+import logging
+import math
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+from core.config import config
+from core.db.circuit_breaker import CircuitBreaker, CircuitState
+from core.observability.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Refill, take up to ARGV[3] whole tokens and report how long until the next one.
+# Uses the server clock so every worker sees the same time.
+TOKEN_BUCKET_SCRIPT = """
+local now = redis.call("TIME")
+local now_s = tonumber(now[1]) + tonumber(now[2]) / 1000000
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+local state = redis.call("HMGET", KEYS[1], "tokens", "ts")
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now_s
+tokens = math.min(capacity, tokens + math.max(0, now_s - ts) * rate)
+local granted = math.min(requested, math.floor(tokens))
+tokens = tokens - granted
+redis.call("HSET", KEYS[1], "tokens", tostring(tokens), "ts", tostring(now_s))
+redis.call("EXPIRE", KEYS[1], math.ceil(capacity / rate) + 1)
+local retry_after = 0
+if granted == 0 then
+    retry_after = (1 - tokens) / rate
+end
+return {granted, tostring(retry_after)}
+"""
+
+
+class LocalBuckets:
+    """The same token buckets kept in this process; limits then apply per worker"""
+
+    def __init__(self, rate: float, capacity: int, max_entries: int = 100_000, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.max_entries = max_entries
+        self._clock = clock
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    async def take(self, client: str, requested: int) -> Tuple[int, float]:
+        now = self._clock()
+        tokens, ts = self._buckets.pop(client, (float(self.capacity), now))
+        tokens = min(float(self.capacity), tokens + max(0.0, now - ts) * self.rate)
+        granted = min(requested, math.floor(tokens))
+        tokens -= granted
+        self._buckets[client] = (tokens, now)
+        while len(self._buckets) > self.max_entries:
+            self._buckets.popitem(last=False)
+        return granted, 0.0 if granted else (1 - tokens) / self.rate
+
+
+class RedisBuckets:
+    """Token buckets shared by every worker, updated atomically by a server-side script"""
+
+    key_prefix = "ratelimit:"
+
+    def __init__(self, url: str, rate: float, capacity: int, timeout_seconds: float = 0.1):
+        import redis.asyncio as redis
+
+        self.rate = rate
+        self.capacity = capacity
+        self.client = redis.from_url(url, socket_timeout=timeout_seconds, socket_connect_timeout=timeout_seconds)
+        self._script = self.client.register_script(TOKEN_BUCKET_SCRIPT)
+
+    async def take(self, client: str, requested: int) -> Tuple[int, float]:
+        granted, retry_after = await self._script(keys=[f"{self.key_prefix}{client}"], args=[self.rate, self.capacity, requested])
+        return int(granted), float(retry_after)
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+
+class _Grant:
+    __slots__ = ("tokens", "expires_at", "denied_until")
+
+    def __init__(self, tokens: int = 0, expires_at: float = 0.0, denied_until: float = 0.0):
+        self.tokens = tokens
+        self.expires_at = expires_at
+        self.denied_until = denied_until
+
+
+class TokenBucketLimiter:
+    """
+    Per-client token buckets refilled at `rate` tokens per second up to `burst`.
+
+    Buckets live in Redis so the limit holds across workers. To keep Redis off
+    the hot path, a worker takes up to `local_batch` tokens per round trip and
+    spends them locally; unspent tokens lapse after the time they would take
+    to refill, so a worker can't hoard them. A refusal is remembered until its
+    retry time, so a throttled client costs no round trips either.
+
+    If redis isn't installed, or Redis keeps failing (tracked by a circuit
+    breaker), buckets fall back to this process until it recovers.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: int,
+        local_batch: int = 10,
+        redis: Optional[RedisBuckets] = None,
+        max_clients: int = 100_000,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.local_batch = max(1, min(local_batch, burst))
+        self.redis = redis
+        self.local = LocalBuckets(rate, burst, max_clients, clock)
+        self.max_clients = max_clients
+        self._clock = clock
+        self._grants: "OrderedDict[str, _Grant]" = OrderedDict()
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._breaker = CircuitBreaker("redis", failure_threshold=3, recovery_timeout=5.0)
+        self._redis_calls = metrics.counter("rate_limit_backend_calls_total", backend="redis")
+        self._local_calls = metrics.counter("rate_limit_backend_calls_total", backend="local")
+        self._redis_failures = metrics.counter("rate_limit_redis_failures_total")
+
+    @classmethod
+    def from_config(cls) -> "TokenBucketLimiter":
+        redis = None
+        try:
+            redis = RedisBuckets(
+                config.REDIS_URL, config.RATE_LIMIT_RATE_PER_SECOND, config.RATE_LIMIT_BURST,
+                config.RATE_LIMIT_REDIS_TIMEOUT_SECONDS,
+            )
+        except ImportError:
+            logger.warning("redis is not installed; rate limits are kept per process")
+        return cls(config.RATE_LIMIT_RATE_PER_SECOND, config.RATE_LIMIT_BURST, config.RATE_LIMIT_LOCAL_BATCH, redis)
+
+    async def _take(self, client: str, requested: int) -> Tuple[int, float]:
+        if self.redis is not None and self._breaker.state != CircuitState.OPEN:
+            self._redis_calls.inc()
+            try:
+                result = await self.redis.take(client, requested)
+            except Exception as e:
+                self._breaker.record_failure(timed_out=isinstance(e, (asyncio.TimeoutError, TimeoutError)))
+                self._redis_failures.inc()
+                logger.warning(f"Rate limit lookup in Redis failed, using local buckets: {str(e)}")
+            else:
+                self._breaker.record_success()
+                return result
+        self._local_calls.inc()
+        return await self.local.take(client, requested)
+
+    def _spend(self, client: str, now: float) -> Optional[float]:
+        """0 when a local token was spent, the wait while a refusal stands, None to ask the backend"""
+        grant = self._grants.get(client)
+        if grant is None:
+            return None
+        if grant.denied_until > now:
+            return grant.denied_until - now
+        if grant.tokens > 0 and grant.expires_at > now:
+            grant.tokens -= 1
+            return 0.0
+        return None
+
+    async def acquire(self, client: str) -> float:
+        """0 if the request may proceed, otherwise seconds until the client has a token again"""
+        while True:
+            wait = self._spend(client, self._clock())
+            if wait is not None:
+                return wait
+            pending = self._pending.get(client)
+            if pending is None:
+                break
+            # Another request from this client is already refilling its grant
+            await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending[client] = future
+        try:
+            granted, retry_after = await self._take(client, self.local_batch)
+            now = self._clock()
+            if granted == 0:
+                self._store(client, _Grant(denied_until=now + retry_after))
+                return retry_after
+            self._store(client, _Grant(tokens=granted - 1, expires_at=now + granted / self.rate))
+            return 0.0
+        finally:
+            del self._pending[client]
+            future.set_result(None)
+
+    def _store(self, client: str, grant: _Grant) -> None:
+        self._grants.pop(client, None)
+        self._grants[client] = grant
+        while len(self._grants) > self.max_clients:
+            self._grants.popitem(last=False)
+
+    async def aclose(self) -> None:
+        if self.redis is not None:
+            await self.redis.aclose()
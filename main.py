@@ -1,3 +1,6 @@
+import asyncio
+import json
+import logging
 import os
 import click
 import uvicorn
@@ -8,7 +11,7 @@ def load_config():
     from core.config import get_config
     config = get_config()
 
-@click.command()
+@click.group(invoke_without_command=True)
 @click.option(
     "--env",
     type=click.Choice(["dev", "prod"], case_sensitive=False),
@@ -20,13 +23,22 @@ def load_config():
     is_flag=True,
     default=False,
 )
-def main(env: str, debug: bool):
+@click.pass_context
+def main(ctx: click.Context, env: str, debug: bool):
     os.environ["ENV"] = env
     os.environ["DEBUG"] = str(debug)
 
     # Reload config after setting environment variables
     load_config()
 
+    # Without a subcommand, run the API server
+    if ctx.invoked_subcommand is None:
+        ctx.invoke(serve)
+
+
+@main.command()
+def serve():
+    """Run the API server"""
     uvicorn.run(
         app="app.server:app",
         host=config.APP_HOST,  # No more AttributeError
@@ -36,5 +48,385 @@ def main(env: str, debug: bool):
     )
 
 
+@main.command()
+@click.option("--collection", "collections", multiple=True, help="Collection to archive (repeatable)")
+@click.option("--retention-days", type=int, default=None)
+@click.option("--batch-size", type=int, default=None)
+@click.option("--batch-pause", type=float, default=None, help="Seconds to sleep between batches")
+def archive(collections, retention_days, batch_size, batch_pause):
+    """Move soft-deleted documents past retention into archive collections"""
+    from app.common.archival import SoftDeleteArchiver
+    from core.db.database import get_db_connection
+
+    async def run():
+        db = get_db_connection()
+        for collection_name in collections or config.ARCHIVAL_COLLECTIONS:
+            archiver = SoftDeleteArchiver(
+                collection_name,
+                db,
+                retention_days=retention_days if retention_days is not None else config.ARCHIVAL_RETENTION_DAYS,
+                batch_size=batch_size or config.ARCHIVAL_BATCH_SIZE,
+                batch_pause_seconds=batch_pause if batch_pause is not None else config.ARCHIVAL_BATCH_PAUSE_SECONDS,
+                lease_seconds=config.ARCHIVAL_LEASE_SECONDS,
+            )
+            archived = await archiver.run_once()
+            if archived is None:
+                click.echo(f"{collection_name}: skipped, another archiver holds the lease")
+            else:
+                click.echo(f"{collection_name}: archived {archived} documents")
+        await db.close()
+
+    asyncio.run(run())
+
+
+@main.command()
+@click.option("--batch-size", type=int, default=None)
+@click.option("--rate", type=float, default=None, help="Documents per second")
+def migrate(batch_size, rate):
+    """Rewrite user documents older than the current schema version"""
+    from app.common.migration import SchemaMigrator
+    from app.user.user_model import User
+    from core.db.database import get_db_connection
+
+    async def run():
+        db = get_db_connection()
+        migrator = SchemaMigrator(
+            "users",
+            User,
+            db,
+            batch_size=batch_size or config.SCHEMA_MIGRATION_BATCH_SIZE,
+            docs_per_second=rate or config.SCHEMA_MIGRATION_DOCS_PER_SECOND,
+        )
+        migrated = await migrator.run_once()
+        click.echo(f"users: migrated {migrated} documents to schema v{User.SCHEMA_VERSION}")
+        await db.close()
+
+    asyncio.run(run())
+
+
+def _users_target():
+    from app.common.bulk_io import Target
+    from core.db.database import get_db_connection
+
+    if config.REPOSITORY_BACKEND != "mongo":
+        # Partitions need routing and lookup entries, which the bulk paths don't do
+        raise click.UsageError(f"Bulk import/export needs REPOSITORY_BACKEND=mongo, not {config.REPOSITORY_BACKEND}")
+    db = get_db_connection()
+    return Target(db.uri, db.db_name, "users")
+
+
+@main.command("export-users")
+@click.argument("path")
+@click.option("--workers", type=int, default=os.cpu_count() or 1, help="Processes, one per _id range")
+@click.option("--batch-size", type=int, default=10_000)
+@click.option("--format", "fmt", type=click.Choice(["ndjson", "bson"]), default=None, help="Default: from the file extension")
+def export_users(path, workers, batch_size, fmt):
+    """Dump users to NDJSON or BSON; rerun the same command to resume. Needs REPOSITORY_BACKEND=mongo."""
+    from app.common.bulk_io import bulk_export
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    result = bulk_export(_users_target(), path, workers, batch_size, fmt)
+    click.echo(f"Exported {result['count']} users in {result['seconds']:.1f}s "
+               f"({result['count'] / max(result['seconds'], 1e-9):,.0f}/s)")
+
+
+@main.command("import-users")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--workers", type=int, default=os.cpu_count() or 1, help="Processes, one per slice of the file")
+@click.option("--batch-size", type=int, default=10_000, help="Documents per unordered insert_many")
+@click.option("--format", "fmt", type=click.Choice(["ndjson", "bson"]), default=None, help="Default: from the file extension")
+def import_users(path, workers, batch_size, fmt):
+    """
+    Load users with pre-hashed passwords from NDJSON or BSON; rerun the same command to resume.
+
+    Users whose email or username is already taken, by an existing user or an
+    earlier row of the same batch, are skipped and logged. Rows repeating each
+    other in different workers' slices are not caught, so use --workers 1 for
+    files that may. Inserts go straight to the collection: no outbox events
+    are recorded and cached responses are not invalidated until they expire.
+    Only the single-database backend (REPOSITORY_BACKEND=mongo) is supported.
+    """
+    from app.common.bulk_io import bulk_import
+    from app.user.user_bulk import find_user_conflicts, prepare_user_document
+    from app.user.user_stats import UserStatsCounters
+    from core.db.database import get_db_connection
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    result = bulk_import(_users_target(), path, workers, batch_size, fmt,
+                         prepare=prepare_user_document, conflicts=find_user_conflicts)
+    click.echo(f"Imported {result['inserted']} users in {result['seconds']:.1f}s "
+               f"({result['inserted'] / max(result['seconds'], 1e-9):,.0f}/s); "
+               f"{result['duplicates']} duplicates, {result['conflicts']} conflicts, {result['rejected']} rejected")
+
+    async def reconcile():
+        db = get_db_connection()
+        await UserStatsCounters(db).reconcile()
+        await db.close()
+
+    # Bulk inserts bypass the repository, so recount the stats counters once at the end
+    asyncio.run(reconcile())
+
+
+@main.command("reconcile-stats")
+def reconcile_stats():
+    """Recount users and correct the materialized stats counters"""
+    from api.dependencies import build_container
+    from app.user.interfaces.i_user_repo import IUserRepository
+
+    async def run():
+        container = build_container()
+        drift = await container.resolve(IUserRepository).reconcile_stats()
+        click.echo(f"Corrected drift: {drift}" if drift else "Counters were accurate")
+        await container.aclose()
+
+    asyncio.run(run())
+
+
+@main.command()
+@click.option("--batch-size", type=int, default=500)
+@click.option("--batch-pause", type=float, default=0.5, help="Seconds to sleep between batches")
+@click.option("--dry-run", is_flag=True, default=False, help="Only count documents that would move")
+def rebalance(batch_size, batch_pause, dry_run):
+    """Move users onto the partition that owns them and rebuild lookup entries"""
+    from app.common.partitioned_repo import PartitionRebalancer
+    from app.user.user_partitioned_repo import PartitionedUserRepository
+    from core.db.partitions import PartitionSet
+
+    if not config.MONGODB_PARTITIONS:
+        raise click.UsageError("MONGODB_PARTITIONS is not configured")
+
+    async def run():
+        partitions = PartitionSet.from_config()
+        rebalancer = PartitionRebalancer(
+            "users",
+            partitions,
+            lookup_fields=PartitionedUserRepository.lookup_fields,
+            batch_size=batch_size,
+            batch_pause_seconds=batch_pause,
+            dry_run=dry_run,
+        )
+        for name, stats in (await rebalancer.run_once()).items():
+            verb = "would move" if dry_run else "moved"
+            click.echo(f"{name}: scanned {stats['scanned']}, {verb} {stats['moved']}")
+        await partitions.close()
+
+    asyncio.run(run())
+
+
+@main.command("import-report")
+@click.option("--module", default="app.server", help="Module to import, as a worker would")
+@click.option("--top", type=int, default=20, help="Modules to list")
+@click.option("--budget-ms", type=float, default=None, help="Exit non-zero if the import takes longer")
+def import_report(module, top, budget_ms):
+    """Time a cold import with -X importtime and list the slowest modules"""
+    import subprocess
+    import sys
+
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        env=os.environ.copy(),
+    )
+    if result.returncode != 0:
+        raise click.ClickException(f"Importing {module} failed:\n{result.stderr}")
+
+    # Lines look like "import time:   self [us] | cumulative | imported package"
+    timings = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        timings.append((name.strip(), int(self_us), int(cumulative_us)))
+    total_ms = next((c for name, _, c in timings if name == module), 0) / 1000
+
+    click.echo(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for name, self_us, cumulative_us in sorted(timings, key=lambda t: t[2], reverse=True)[:top]:
+        click.echo(f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>9.1f}  {name}")
+    click.echo(f"\nimport {module}: {total_ms:.1f}ms across {len(timings)} modules")
+
+    if budget_ms is not None and total_ms > budget_ms:
+        click.echo(f"Over the {budget_ms:.0f}ms budget by {total_ms - budget_ms:.1f}ms", err=True)
+        sys.exit(1)
+
+
+@main.command("bench-list-encoding")
+@click.option("--docs", type=int, default=1000, help="Documents per list response")
+@click.option("--rounds", type=int, default=20)
+def bench_list_encoding(docs, rounds):
+    """Compare CPU and memory of the model and raw-BSON paths for encoding a user list"""
+    import datetime
+    import time
+    import tracemalloc
+    import uuid
+    from typing import List
+
+    import bson
+    from bson.raw_bson import RawBSONDocument
+    from pydantic import TypeAdapter
+
+    from app.common.raw_json import JsonDocumentEncoder
+    from app.common.schema import schema_upgrades
+    from app.user.user_model import User
+
+    now = datetime.datetime(2025, 1, 1, 12, 30)
+    stored = [
+        bson.encode({
+            "_id": str(uuid.uuid4()), "created_at": now, "updated_at": now, "is_active": True,
+            "is_deleted": False, "schema_version": User.SCHEMA_VERSION, "username": f"user_{i}",
+            "email": f"user_{i}@example.com", "password_hash": "$2b$12$" + "x" * 53,
+            "full_name": f"User {i}", "status": "active", "roles": ["member"], "last_login": now,
+        })
+        for i in range(docs)
+    ]
+    adapter = TypeAdapter(List[User])
+    to_model = lambda doc: User.model_validate(schema_upgrades.upgrade(User, doc)[0])
+    encoder = JsonDocumentEncoder(User, to_model)
+
+    def model_path():
+        # What the driver, the repository and FastAPI do today
+        return adapter.dump_json([to_model(bson.decode(raw)) for raw in stored], by_alias=True)
+
+    def raw_path():
+        return encoder.encode_raw(RawBSONDocument(raw) for raw in stored)
+
+    if json.loads(model_path()) != json.loads(raw_path()):
+        raise click.ClickException("The two paths produced different JSON")
+
+    scale = 1000 / docs
+    for label, encode in (("model", model_path), ("raw", raw_path)):
+        started = time.process_time()
+        for _ in range(rounds):
+            encode()
+        cpu_ms = (time.process_time() - started) * 1000 / rounds * scale
+        tracemalloc.start()
+        encode()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        click.echo(f"{label:>6}: {cpu_ms:7.2f} ms CPU, {peak * scale / 1024:8.1f} KiB peak allocated per 1000 documents")
+
+
+@main.command("bench-auth")
+@click.option("--requests", "count", type=int, default=2000, help="Token checks per variant")
+def bench_auth(count):
+    """Compare the per-request cost of verifying a bearer token with and without the key and token caches"""
+    import time
+
+    import jwt
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+
+    from core.security import jwt as tokens
+
+    if not config.ACCESS_TOKEN_PRIVATE_KEY or not config.ACCESS_TOKEN_PUBLIC_KEY:
+        # Throwaway key pair, so the benchmark runs without configured keys
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        config.ACCESS_TOKEN_PRIVATE_KEY = key.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        ).decode()
+        config.ACCESS_TOKEN_PUBLIC_KEY = key.public_key().public_bytes(
+            serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+        ).decode()
+        tokens._private_key.cache_clear()
+        tokens._public_key.cache_clear()
+
+    token = tokens.create_token("bench-user", tokens.ACCESS_TOKEN)
+    public_pem = tokens._pem_bytes(config.ACCESS_TOKEN_PUBLIC_KEY)
+    options = {"require": ["exp", "sub"]}
+
+    def parse_and_verify():
+        # No caching: load the PEM and check the signature on every request
+        key = serialization.load_pem_public_key(public_pem)
+        return jwt.decode(token, key, algorithms=[config.JWT_ALGORITHM], options=options)
+
+    def verify():
+        return jwt.decode(token, tokens._public_key(tokens.ACCESS_TOKEN), algorithms=[config.JWT_ALGORITHM], options=options)
+
+    def cached():
+        return tokens.decode_token(token)
+
+    for label, check in (("PEM + verify", parse_and_verify), ("parsed key", verify), ("token cache", cached)):
+        check()
+        started = time.perf_counter()
+        for _ in range(count):
+            check()
+        click.echo(f"{label:>12}: {(time.perf_counter() - started) * 1e6 / count:9.1f} µs per request")
+
+
+@main.command("bench-dependencies")
+@click.option("--requests", "count", type=int, default=1000, help="Requests per route and round")
+@click.option("--rounds", type=int, default=5)
+def bench_dependencies(count, rounds):
+    """Compare the per-request cost of building UserService per request and resolving it from the container"""
+    import time
+
+    try:
+        import httpx
+    except ImportError:
+        raise click.ClickException("bench-dependencies needs httpx; install the dev dependency group")
+    from fastapi import Depends, FastAPI
+
+    from api.dependencies import build_container
+    from app.user.user_repo import UserRepository
+    from app.user.user_service import UserService
+    from core.db.database import get_db_connection
+
+    def per_request_service():
+        # What api/dependencies did before the container: a sync factory, run in the threadpool
+        return UserService(UserRepository(get_db_connection()))
+
+    container = build_container()
+    app = FastAPI()
+
+    @app.get("/none")
+    async def no_dependency():
+        return {}
+
+    @app.get("/per-request")
+    async def per_request(service: UserService = Depends(per_request_service)):
+        return {}
+
+    @app.get("/container")
+    async def from_container(service: UserService = Depends(container.provider(UserService))):
+        return {}
+
+    async def run():
+        get_db_connection()
+        paths = ("/none", "/per-request", "/container")
+        timings = {path: float("inf") for path in paths}
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+            for path in paths:
+                await client.get(path)
+            # Interleave the routes and keep each one's best round, to even out warm-up and noise
+            for _ in range(rounds):
+                for path in paths:
+                    started = time.perf_counter()
+                    for _ in range(count):
+                        await client.get(path)
+                    timings[path] = min(timings[path], (time.perf_counter() - started) * 1e6 / count)
+        await get_db_connection().close()
+        return timings
+
+    timings = asyncio.run(run())
+    baseline = timings["/none"]
+    click.echo(f"{'no dependency':>13}: {baseline:8.1f} µs per request")
+    for label, path in (("per request", "/per-request"), ("container", "/container")):
+        click.echo(f"{label:>13}: {timings[path]:8.1f} µs per request ({timings[path] - baseline:+.1f} µs resolving UserService)")
+
+
+@main.command("calibrate-hash")
+@click.option("--target-ms", type=float, default=None, help="Default: PASSWORD_HASH_TARGET_MS")
+def calibrate_hash(target_ms):
+    """Time bcrypt per cost on this machine and print the cost to pin"""
+    from core.security.password import choose_cost, measure_costs
+
+    target_ms = target_ms or config.PASSWORD_HASH_TARGET_MS
+    timings = measure_costs(config.PASSWORD_HASH_MIN_COST, config.PASSWORD_HASH_MAX_COST, target_ms)
+    for cost, seconds in timings.items():
+        marker = "" if seconds * 1000 <= target_ms else "  (over target)"
+        click.echo(f"cost {cost:>2}: {seconds * 1000:8.1f} ms{marker}")
+    click.echo(f"PASSWORD_HASH_COST={choose_cost(timings, target_ms)}")
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,84 @@
+# tests/conftest.py
+import os
+from typing import Any, Dict, Optional
+
+# Settings are read once at import; fail fast instead of waiting out the 5s server selection
+os.environ.setdefault("ENV", "test")
+os.environ.setdefault("MONGO_SERVER_SELECTION_TIMEOUT_MS", "200")
+
+import pytest
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+from tests.stand_in_mongo import StandInMongo
+
+
+def _hello(uri: str) -> Optional[Dict[str, Any]]:
+    """The server's hello reply, or None if nothing answers at `uri`"""
+    client = MongoClient(uri, serverSelectionTimeoutMS=500)
+    try:
+        return client.admin.command("hello")
+    except PyMongoError:
+        return None
+    finally:
+        client.close()
+
+
+@pytest.fixture
+def stand_in_mongo():
+    server = StandInMongo()
+    server.start()
+    yield server
+    server.shutdown()
+
+
+@pytest.fixture(scope="session")
+def mongo_uri() -> str:
+    """A real MongoDB at TEST_MONGODB_URI (default localhost); tests using it skip without one"""
+    uri = os.environ.get("TEST_MONGODB_URI", "mongodb://localhost:27017")
+    if _hello(uri) is None:
+        pytest.skip(f"No MongoDB at {uri}; set TEST_MONGODB_URI to run against one")
+    return uri
+
+
+@pytest.fixture(scope="session")
+def replica_set_uri() -> str:
+    """
+    A replica set (one node is enough) at TEST_MONGODB_REPLICA_SET_URI, else
+    TEST_MONGODB_URI if that is one; tests using it skip without one
+    """
+    uri = os.environ.get("TEST_MONGODB_REPLICA_SET_URI") or os.environ.get("TEST_MONGODB_URI", "mongodb://localhost:27017")
+    hello = _hello(uri)
+    if hello is None or "setName" not in hello:
+        pytest.skip(f"No replica set at {uri}; set TEST_MONGODB_REPLICA_SET_URI to run against one")
+    return uri
+
+
+@pytest.fixture(scope="session")
+def _rsa_pem_pair():
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    private = key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption())
+    public = key.public_key().public_bytes(serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo)
+    return private.decode(), public.decode()
+
+
+@pytest.fixture
+def jwt_keys(monkeypatch, _rsa_pem_pair):
+    """Sign and verify tokens with a throwaway key pair"""
+    from core.config import config
+    from core.security import jwt
+
+    private, public = _rsa_pem_pair
+    for token_type in ("ACCESS", "REFRESH"):
+        monkeypatch.setattr(config, f"{token_type}_TOKEN_PRIVATE_KEY", private)
+        monkeypatch.setattr(config, f"{token_type}_TOKEN_PUBLIC_KEY", public)
+    jwt._private_key.cache_clear()
+    jwt._public_key.cache_clear()
+    jwt.verified_tokens.clear()
+    yield
+    jwt._private_key.cache_clear()
+    jwt._public_key.cache_clear()
+    jwt.verified_tokens.clear()
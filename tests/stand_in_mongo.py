@@ -0,0 +1,165 @@
+# tests/stand_in_mongo.py
+import asyncio
+import struct
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set
+
+import bson
+
+OP_REPLY = 1
+OP_QUERY = 2004
+OP_MSG = 2013
+
+_HEADER = struct.Struct("<iiii")
+
+
+class StandInMongo:
+    """
+    Just enough of a mongod for the driver to connect, answer `hello`/`ping`
+    and run `find`/`insert` against in-memory collections. It can be stopped
+    and started again on the same port, which is all the circuit breaker
+    tests need from a server.
+
+    It serves from its own thread and event loop, so driver calls that block
+    the test's loop (MongoClient.close() ends sessions synchronously) still
+    get answers.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.host = host
+        self.port = port
+        self.collections: Dict[str, List[Dict[str, Any]]] = {}
+        self._server: Optional[asyncio.base_events.Server] = None
+        self._writers: Set[asyncio.StreamWriter] = set()
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="stand-in-mongo", daemon=True)
+        self._thread.start()
+
+    @property
+    def uri(self) -> str:
+        return f"mongodb://{self.host}:{self.port}/test?directConnection=true"
+
+    def _run(self, coroutine) -> Any:
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    def start(self) -> None:
+        self._run(self._start())
+
+    def stop(self) -> None:
+        """Close the listener and drop every open connection, as a crashed server would"""
+        self._run(self._stop())
+
+    def shutdown(self) -> None:
+        self.stop()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    async def _start(self) -> None:
+        self._server = await asyncio.start_server(self._serve, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def _stop(self) -> None:
+        server, self._server = self._server, None
+        if server is None:
+            return
+        server.close()
+        for writer in list(self._writers):
+            writer.close()
+        await server.wait_closed()
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._writers.add(writer)
+        try:
+            while True:
+                header = await reader.readexactly(_HEADER.size)
+                length, request_id, _, op_code = _HEADER.unpack(header)
+                body = await reader.readexactly(length - _HEADER.size)
+                if op_code == OP_QUERY:
+                    reply = self._op_reply(request_id, self._command(self._parse_query(body)))
+                elif op_code == OP_MSG:
+                    reply = self._op_msg(request_id, self._command(self._parse_msg(body)))
+                else:
+                    break
+                writer.write(reply)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+    # --- wire protocol ------------------------------------------------
+
+    @staticmethod
+    def _parse_query(body: bytes) -> Dict[str, Any]:
+        # flags, fullCollectionName, numberToSkip, numberToReturn, query
+        name_end = body.index(b"\x00", 4)
+        return bson.decode(body[name_end + 9:][:struct.unpack_from("<i", body, name_end + 9)[0]])
+
+    @staticmethod
+    def _parse_msg(body: bytes) -> Dict[str, Any]:
+        command: Dict[str, Any] = {}
+        position = 4  # flagBits
+        while position < len(body):
+            kind = body[position]
+            position += 1
+            size = struct.unpack_from("<i", body, position)[0]
+            if kind == 0:
+                command.update(bson.decode(body[position:position + size]))
+            elif kind == 1:
+                section = body[position + 4:position + size]
+                name_end = section.index(b"\x00")
+                name, docs = section[:name_end].decode(), section[name_end + 1:]
+                command[name] = list(bson.decode_all(docs))
+            else:
+                # Checksum trailer
+                break
+            position += size
+        return command
+
+    @staticmethod
+    def _op_reply(request_id: int, doc: Dict[str, Any]) -> bytes:
+        payload = struct.pack("<iqii", 0, 0, 0, 1) + bson.encode(doc)
+        return _HEADER.pack(_HEADER.size + len(payload), 0, request_id, OP_REPLY) + payload
+
+    @staticmethod
+    def _op_msg(request_id: int, doc: Dict[str, Any]) -> bytes:
+        payload = struct.pack("<I", 0) + b"\x00" + bson.encode(doc)
+        return _HEADER.pack(_HEADER.size + len(payload), 0, request_id, OP_MSG) + payload
+
+    # --- commands -----------------------------------------------------
+
+    def _command(self, command: Dict[str, Any]) -> Dict[str, Any]:
+        name = next(iter(command)).lower()
+        if name in ("hello", "ismaster"):
+            return {
+                "helloOk": True,
+                "isWritablePrimary": True,
+                "ismaster": True,
+                "maxBsonObjectSize": 16 * 1024 * 1024,
+                "maxMessageSizeBytes": 48_000_000,
+                "maxWriteBatchSize": 100_000,
+                "localTime": datetime.utcnow(),
+                "logicalSessionTimeoutMinutes": 30,
+                "connectionId": 1,
+                "minWireVersion": 0,
+                "maxWireVersion": 21,
+                "ok": 1.0,
+            }
+        if name == "find":
+            docs = [doc for doc in self.collections.get(command["find"], []) if self._matches(doc, command.get("filter", {}))]
+            if command.get("limit"):
+                docs = docs[:abs(command["limit"])]
+            namespace = f"{command.get('$db', 'test')}.{command['find']}"
+            return {"cursor": {"firstBatch": docs, "id": 0, "ns": namespace}, "ok": 1.0}
+        if name == "insert":
+            self.collections.setdefault(command["insert"], []).extend(command.get("documents", []))
+            return {"n": len(command.get("documents", [])), "ok": 1.0}
+        # ping, endSessions, buildInfo, ...
+        return {"ok": 1.0}
+
+    @staticmethod
+    def _matches(doc: Dict[str, Any], filter: Dict[str, Any]) -> bool:
+        return all(doc.get(field) == value for field, value in filter.items())
@@ -0,0 +1,65 @@
+# tests/test_auth.py
+import pytest
+from fastapi import HTTPException
+
+from app.auth.auth_service import AuthService
+from app.user.user_memory_repo import InMemoryUserRepository
+from app.user.user_model import User, UserStatus
+from core.config import config
+from core.security import password
+from core.security.jwt import decode_token
+
+
+@pytest.fixture
+def cost(monkeypatch):
+    """Cheap bcrypt costs; returns a setter for the pinned cost"""
+    monkeypatch.setattr(config, "PASSWORD_HASH_MIN_COST", 4)
+    monkeypatch.setattr(config, "PASSWORD_HASH_COST", 4)
+    password._dummy_hash.cache_clear()
+    yield lambda value: monkeypatch.setattr(config, "PASSWORD_HASH_COST", value)
+    password._dummy_hash.cache_clear()
+
+
+@pytest.fixture
+async def users(cost):
+    repository = InMemoryUserRepository()
+    for name, status in (("alice", UserStatus.ACTIVE), ("sam", UserStatus.SUSPENDED), ("ian", UserStatus.INACTIVE)):
+        await repository.create(User(
+            username=name, email=f"{name}@example.com", full_name=name.title(), status=status,
+            password_hash=await password.hash_password("correct horse"),
+        ))
+    return repository
+
+
+def test_cost_never_drops_below_the_floor(monkeypatch):
+    monkeypatch.setattr(config, "PASSWORD_HASH_MIN_COST", 12)
+    monkeypatch.setattr(config, "PASSWORD_HASH_COST", 10)
+    assert password.current_cost() == 12
+    assert password.needs_rehash("$2b$10$" + "x" * 53)
+    assert not password.needs_rehash("$2b$12$" + "x" * 53)
+    assert not password.needs_rehash("$2b$13$" + "x" * 53)
+
+
+async def test_login_issues_tokens_and_records_the_login(users, jwt_keys):
+    tokens = await AuthService(users).login("alice@example.com", "correct horse")
+    user = await users.get_by_username("alice")
+    assert decode_token(tokens.access_token)["sub"] == user.id
+    assert user.last_login is not None
+
+
+@pytest.mark.parametrize("username, secret, status_code", [
+    ("alice", "wrong", 401),
+    ("nobody", "correct horse", 401),
+    ("sam", "correct horse", 403),
+    ("ian", "correct horse", 403),
+])
+async def test_login_rejections(users, jwt_keys, username, secret, status_code):
+    with pytest.raises(HTTPException) as error:
+        await AuthService(users).login(username, secret)
+    assert error.value.status_code == status_code
+
+
+async def test_login_upgrades_hashes_below_the_pinned_cost(users, jwt_keys, cost):
+    cost(5)
+    await AuthService(users).login("alice", "correct horse")
+    assert password.hash_cost((await users.get_by_username("alice")).password_hash) == 5
@@ -0,0 +1,84 @@
+# tests/test_bulk_routes.py
+import httpx
+import pytest
+
+from api.dependencies import container
+from app.server import create_app
+from app.user.interfaces.i_user_repo import IUserRepository
+from app.user.user_memory_repo import InMemoryUserRepository
+from app.user.user_model import User, UserStatus
+from core.config import config
+from core.container import Scope
+from core.security.jwt import ACCESS_TOKEN, create_token
+
+
+@pytest.fixture
+async def users(jwt_keys, monkeypatch):
+    # The checks must hold even when authentication is optional elsewhere
+    monkeypatch.setattr(config, "AUTH_REQUIRED", False)
+    repository = InMemoryUserRepository()
+    with container.override(IUserRepository, lambda c: repository, Scope.SINGLETON):
+        yield repository
+
+
+@pytest.fixture
+async def client(users):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=create_app()), base_url="http://test") as client:
+        yield client
+
+
+async def add(users, username: str, **fields) -> str:
+    user = await users.create(User(
+        username=username, email=f"{username}@example.com", password_hash="x", full_name=username.title(), **fields
+    ))
+    return user.id
+
+
+def bearer(user_id: str):
+    return {"Authorization": f"Bearer {create_token(user_id, ACCESS_TOKEN)}"}
+
+
+DRY_RUN_DELETE = {"filter": {"role": "trial"}, "dry_run": True}
+
+
+async def test_bulk_routes_require_a_token_even_when_auth_is_optional(client):
+    for path in ("/users/bulk/delete", "/users/bulk/update"):
+        response = await client.post(path, json={**DRY_RUN_DELETE, "set": {"is_active": False}})
+        assert response.status_code == 401
+
+
+async def test_bulk_routes_require_a_live_admin(client, users):
+    member = await add(users, "member", roles=["member"])
+    suspended = await add(users, "suspended", roles=["admin"], status=UserStatus.SUSPENDED)
+    admin = await add(users, "admin", roles=["admin"])
+    await add(users, "trial", roles=["trial"])
+
+    for user_id in (member, suspended):
+        response = await client.post("/users/bulk/delete", json=DRY_RUN_DELETE, headers=bearer(user_id))
+        assert response.status_code == 403
+    response = await client.post("/users/bulk/delete", json=DRY_RUN_DELETE, headers=bearer(admin))
+    assert response.status_code == 200
+    assert response.json() == {"matched": 1, "modified": 0, "dry_run": True}
+
+    await users.delete(admin)
+    response = await client.post("/users/bulk/delete", json=DRY_RUN_DELETE, headers=bearer(admin))
+    assert response.status_code == 403
+
+
+async def test_bulk_delete_refuses_more_than_the_maximum(client, users, monkeypatch):
+    monkeypatch.setattr(config, "BULK_DELETE_MAX_MATCHES", 2)
+    admin = await add(users, "admin", roles=["admin"])
+    for name in ("trial1", "trial2", "trial3"):
+        await add(users, name, roles=["trial"])
+
+    response = await client.post("/users/bulk/delete", json=DRY_RUN_DELETE, headers=bearer(admin))
+    assert response.json()["matched"] == 3
+    response = await client.post("/users/bulk/delete", json={"filter": {"role": "trial"}}, headers=bearer(admin))
+    assert response.status_code == 400
+    assert len(await users.get_users_by_role("trial")) == 3
+
+    response = await client.post(
+        "/users/bulk/delete", json={"filter": {"role": "trial", "ids": [await add(users, "trial4", roles=["trial"])]}},
+        headers=bearer(admin),
+    )
+    assert response.json() == {"matched": 1, "modified": 1, "dry_run": False}
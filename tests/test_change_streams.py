@@ -0,0 +1,160 @@
+# tests/test_change_streams.py
+import asyncio
+import inspect
+import time
+import uuid
+from contextlib import suppress
+
+import pytest
+from bson import Timestamp
+
+from app.user.user_model import User
+from app.user.user_repo import UserRepository
+from core.cache.read_cache import ReadCache
+from core.db.change_streams import ChangeEvent, ChangeStreamConsumer, invalidate_read_cache
+from core.db.database import MongoDBConnection
+
+
+async def eventually(check, timeout: float = 10.0) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        result = check()
+        if inspect.isawaitable(result):
+            result = await result
+        if result:
+            return
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not met in time")
+        await asyncio.sleep(0.05)
+
+
+# --- without a server ------------------------------------------------------
+
+@pytest.fixture
+async def offline_db():
+    # Never contacted: dispatch and the handlers don't touch the database
+    db = MongoDBConnection.connect("mongodb://127.0.0.1:9/offline", name="offline")
+    yield db
+    await db.close()
+
+
+def change(collection: str, operation: str, id: str, full_document=None):
+    return {
+        "ns": {"db": "offline", "coll": collection},
+        "operationType": operation,
+        "documentKey": {"_id": id},
+        "fullDocument": full_document,
+        "clusterTime": Timestamp(int(time.time()) - 3, 1),
+    }
+
+
+async def test_dispatch_fans_out_per_collection(offline_db):
+    consumer = ChangeStreamConsumer(offline_db, ["users", "orders"])
+    users, orders = [], []
+
+    def broken(event):
+        raise RuntimeError("handler bug")
+
+    consumer.register("users", broken)
+    consumer.register("users", users.append)
+    consumer.register("orders", orders.append)
+    consumer._dispatch(change("users", "update", "u1", {"_id": "u1"}))
+
+    assert users == [ChangeEvent("users", "update", "u1", {"_id": "u1"})]
+    assert orders == []
+    assert consumer._lag.value >= 3
+
+
+def test_read_cache_handler_refreshes_cached_ids_and_drops_other_lookups():
+    cache = ReadCache(ttl_seconds=60)
+    cache.set("_id:u1", {"_id": "u1", "full_name": "Alice"})
+    cache.set("email:alice@example.com", {"_id": "u1", "full_name": "Alice"})
+    handler = invalidate_read_cache(cache)
+
+    handler(ChangeEvent("users", "update", "u1", {"_id": "u1", "full_name": "Alice Liddell", "is_deleted": False}))
+    assert cache.get("_id:u1")["full_name"] == "Alice Liddell"
+    assert cache.get("email:alice@example.com") is None
+
+    handler(ChangeEvent("users", "update", "u1", {"_id": "u1", "is_deleted": True}))
+    assert cache.get("_id:u1") is None
+    # Documents nobody had cached are not pulled in
+    handler(ChangeEvent("users", "insert", "u2", {"_id": "u2", "is_deleted": False}))
+    assert cache.get("_id:u2") is None
+
+
+# --- against a replica set ---------------------------------------------------
+
+@pytest.fixture
+async def rs_db(replica_set_uri):
+    db = MongoDBConnection.connect(replica_set_uri, f"changes_{uuid.uuid4().hex[:12]}", "changes")
+    yield db
+    await db.client.drop_database(db.db_name)
+    await db.close()
+
+
+def consumer_for(db: MongoDBConnection) -> ChangeStreamConsumer:
+    return ChangeStreamConsumer(db, ["users", "probe"], checkpoint_every=1, retry_seconds=0.1)
+
+
+async def start(consumer: ChangeStreamConsumer) -> asyncio.Task:
+    """Run the consumer and return once its stream is open, i.e. it sees writes to `probe`"""
+    seen = []
+    consumer.register("probe", seen.append)
+    task = asyncio.create_task(consumer.run_forever())
+    probe = consumer.db.get_collection("probe")
+
+    async def probe_seen():
+        await probe.insert_one({})
+        await asyncio.sleep(0.2)
+        return bool(seen)
+
+    await eventually(probe_seen)
+    return task
+
+
+async def stop(task: asyncio.Task) -> None:
+    task.cancel()
+    with suppress(asyncio.CancelledError):
+        await task
+
+
+async def test_writes_from_another_worker_reach_the_read_cache(rs_db):
+    consumer = consumer_for(rs_db)
+    cache = ReadCache(ttl_seconds=60)
+    consumer.register("users", invalidate_read_cache(cache))
+    task = await start(consumer)
+    try:
+        # Another worker's repository, which doesn't share this cache
+        users = UserRepository(rs_db)
+        user = await users.create(User(username="alice", email="alice@example.com", password_hash="x", full_name="Alice"))
+        doc = await rs_db.get_collection("users").find_one({"_id": user.id})
+        cache.set(f"_id:{user.id}", doc)
+        cache.set("email:alice@example.com", doc)
+
+        await users.update(user.id, {"full_name": "Alice Liddell"})
+        await eventually(lambda: (cache.get(f"_id:{user.id}") or {}).get("full_name") == "Alice Liddell")
+        assert cache.get("email:alice@example.com") is None
+
+        await users.delete(user.id)
+        await eventually(lambda: cache.get(f"_id:{user.id}") is None)
+    finally:
+        await stop(task)
+
+
+async def test_restart_resumes_from_the_checkpoint(rs_db):
+    consumer = consumer_for(rs_db)
+    task = await start(consumer)
+    await eventually(lambda: consumer.checkpoints.get(consumer.checkpoint_name))
+    await stop(task)
+
+    # Written while no consumer is running
+    await rs_db.get_collection("users").insert_one({"_id": "missed"})
+
+    restarted = consumer_for(rs_db)
+    seen = []
+    restarted.register("users", seen.append)
+    task = asyncio.create_task(restarted.run_forever())
+    try:
+        await eventually(lambda: any(event.document_id == "missed" for event in seen))
+    finally:
+        await stop(task)
@@ -0,0 +1,203 @@
+# tests/test_circuit_breaker.py
+import asyncio
+import time
+
+import pytest
+from pymongo.errors import AutoReconnect, DuplicateKeyError
+
+from app.common.base_repo import BaseRepository
+from app.user.user_model import User
+from core.cache.read_cache import ReadCache
+from core.db.circuit_breaker import CircuitBreaker, CircuitOpenException, CircuitState
+from core.db.database import MongoDBConnection
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+async def ok():
+    return "ok"
+
+
+async def unreachable():
+    raise AutoReconnect("connection refused")
+
+
+async def timed_out():
+    raise asyncio.TimeoutError()
+
+
+async def duplicate():
+    raise DuplicateKeyError("E11000")
+
+
+def breaker(clock: FakeClock, **options) -> CircuitBreaker:
+    options = {"failure_threshold": 3, "recovery_timeout": 10.0, **options}
+    return CircuitBreaker("test", clock=clock, **options)
+
+
+async def fail(circuit: CircuitBreaker, func, times: int) -> None:
+    for _ in range(times):
+        with pytest.raises(Exception):
+            await circuit.call(func)
+
+
+async def test_opens_after_consecutive_failures():
+    circuit = breaker(FakeClock())
+    await fail(circuit, unreachable, 2)
+    assert circuit.state == CircuitState.CLOSED
+    await fail(circuit, unreachable, 1)
+    assert circuit.state == CircuitState.OPEN
+
+
+async def test_success_resets_consecutive_failures():
+    circuit = breaker(FakeClock())
+    await fail(circuit, unreachable, 2)
+    assert await circuit.call(ok) == "ok"
+    await fail(circuit, unreachable, 2)
+    assert circuit.state == CircuitState.CLOSED
+
+
+async def test_errors_from_a_healthy_server_do_not_count():
+    circuit = breaker(FakeClock())
+    for _ in range(5):
+        with pytest.raises(DuplicateKeyError):
+            await circuit.call(duplicate)
+    assert circuit.state == CircuitState.CLOSED
+
+
+async def test_opens_on_timeout_rate():
+    circuit = breaker(FakeClock(), failure_threshold=100, window_size=10, min_calls=10, timeout_rate_threshold=0.5)
+    for _ in range(4):
+        await circuit.call(ok)
+        await fail(circuit, timed_out, 1)
+    assert circuit.state == CircuitState.CLOSED
+    # The rate is checked when a failure is recorded: 5 timeouts in the last 10 calls
+    await circuit.call(ok)
+    await fail(circuit, timed_out, 1)
+    assert circuit.state == CircuitState.OPEN
+
+
+async def test_open_circuit_fails_fast_without_calling():
+    clock = FakeClock()
+    circuit = breaker(clock)
+    await fail(circuit, unreachable, 3)
+    calls = []
+
+    async def tracked():
+        calls.append(1)
+
+    clock.now = 4.0
+    with pytest.raises(CircuitOpenException) as raised:
+        await circuit.call(tracked)
+    assert calls == []
+    assert raised.value.retry_after == pytest.approx(6.0)
+
+
+async def test_half_open_admits_limited_trials_and_closes_on_success():
+    clock = FakeClock()
+    circuit = breaker(clock, half_open_max_calls=1)
+    await fail(circuit, unreachable, 3)
+    clock.now = 10.0
+    assert circuit.state == CircuitState.HALF_OPEN
+
+    release = asyncio.Event()
+
+    async def slow_probe():
+        await release.wait()
+        return "ok"
+
+    probe = asyncio.create_task(circuit.call(slow_probe))
+    await asyncio.sleep(0)
+    with pytest.raises(CircuitOpenException):
+        await circuit.call(ok)
+    release.set()
+    assert await probe == "ok"
+    assert circuit.state == CircuitState.CLOSED
+
+
+async def test_failed_trial_reopens():
+    clock = FakeClock()
+    circuit = breaker(clock)
+    await fail(circuit, unreachable, 3)
+    clock.now = 10.0
+    await fail(circuit, unreachable, 1)
+    assert circuit.state == CircuitState.OPEN
+    clock.now = 15.0
+    assert circuit.state == CircuitState.OPEN
+    clock.now = 20.0
+    assert circuit.state == CircuitState.HALF_OPEN
+
+
+async def test_cancelled_trial_frees_its_slot():
+    clock = FakeClock()
+    circuit = breaker(clock)
+    await fail(circuit, unreachable, 3)
+    clock.now = 10.0
+    probe = asyncio.create_task(circuit.call(asyncio.sleep, 60))
+    await asyncio.sleep(0)
+    probe.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await probe
+    assert await circuit.call(ok) == "ok"
+    assert circuit.state == CircuitState.CLOSED
+
+
+# --- against a server that goes away and comes back ---------------------
+
+def connect(server, recovery_timeout: float = 0.3) -> MongoDBConnection:
+    db = MongoDBConnection.connect(server.uri, "test", name="stand-in")
+    db.circuit_breaker = CircuitBreaker("stand-in", failure_threshold=2, recovery_timeout=recovery_timeout)
+    return db
+
+
+def user_doc(id: str) -> dict:
+    return {
+        "_id": id, "username": "alice", "email": "alice@example.com", "full_name": "Alice",
+        "password_hash": "x", "is_active": True, "is_deleted": False, "schema_version": User.SCHEMA_VERSION,
+    }
+
+
+async def test_trips_while_server_is_down_and_recovers_when_it_returns(stand_in_mongo):
+    db = connect(stand_in_mongo)
+    users = db.get_collection("users")
+    stand_in_mongo.collections["users"] = [user_doc("u1")]
+    assert (await db.circuit_breaker.call(users.find_one, {"_id": "u1"}))["username"] == "alice"
+
+    stand_in_mongo.stop()
+    await fail(db.circuit_breaker, lambda: users.find_one({"_id": "u1"}), 2)
+    assert db.circuit_breaker.state == CircuitState.OPEN
+
+    started = time.perf_counter()
+    with pytest.raises(CircuitOpenException):
+        await db.circuit_breaker.call(users.find_one, {"_id": "u1"})
+    # No server selection wait while open
+    assert time.perf_counter() - started < 0.05
+
+    stand_in_mongo.start()
+    await asyncio.sleep(0.3)
+    assert db.circuit_breaker.state == CircuitState.HALF_OPEN
+    assert (await db.circuit_breaker.call(users.find_one, {"_id": "u1"}))["username"] == "alice"
+    assert db.circuit_breaker.state == CircuitState.CLOSED
+    await db.close()
+
+
+async def test_serves_stale_cache_entries_while_open(stand_in_mongo):
+    db = connect(stand_in_mongo, recovery_timeout=60)
+    stand_in_mongo.collections["users"] = [user_doc("u1")]
+    repository = BaseRepository(User, "users", db, read_cache=ReadCache(ttl_seconds=0))
+    assert (await repository.get_by_id("u1")).username == "alice"
+
+    stand_in_mongo.stop()
+    # Expired entries are still served while the database is unreachable
+    assert (await repository.get_by_id("u1")).username == "alice"
+    with pytest.raises(Exception):
+        await repository.get_by_id("u2")
+    assert db.circuit_breaker.state == CircuitState.OPEN
+    assert (await repository.get_by_id("u1")).username == "alice"
+    await db.close()
@@ -0,0 +1,54 @@
+# tests/test_hedging.py
+import asyncio
+
+import pytest
+
+from core.db.hedging import HedgedReader
+
+
+def reader(name: str = "test") -> HedgedReader:
+    # Hedge after 10ms with budget to spare; metrics are per name and process-wide
+    hedged = HedgedReader(name, min_delay=0.01, max_delay=0.01, budget_ratio=1.0)
+    hedged.budget.earn()
+    return hedged
+
+
+def answer(value, after: float = 0.0, error: Exception = None):
+    async def attempt():
+        await asyncio.sleep(after)
+        if error is not None:
+            raise error
+        return value
+    return attempt
+
+
+async def test_fast_primary_is_not_hedged():
+    hedged = reader("fast_primary")
+    assert await hedged.read(answer("primary"), answer("hedge")) == "primary"
+    assert hedged._hedges.value == 0
+
+
+async def test_hedge_wins_when_it_finds_the_document():
+    hedged = reader("hedge_hit")
+    assert await hedged.read(answer("primary", after=0.5), answer("hedge")) == "hedge"
+    assert hedged._hedge_wins.value == 1
+
+
+async def test_hedge_miss_waits_for_the_primary():
+    hedged = reader("hedge_miss")
+    assert await hedged.read(answer("primary", after=0.1), answer(None)) == "primary"
+    assert hedged._hedge_wins.value == 0
+
+
+async def test_hedge_miss_is_returned_only_when_the_primary_agrees():
+    assert await reader().read(answer(None, after=0.1), answer(None)) is None
+
+
+async def test_hedge_miss_does_not_hide_a_primary_failure():
+    with pytest.raises(ConnectionError):
+        await reader().read(answer(None, after=0.1, error=ConnectionError("down")), answer(None))
+
+
+async def test_failed_hedge_falls_back_to_the_primary():
+    hedged = reader()
+    assert await hedged.read(answer("primary", after=0.1), answer(None, error=ConnectionError("down"))) == "primary"
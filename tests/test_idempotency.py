@@ -0,0 +1,151 @@
+# tests/test_idempotency.py
+import asyncio
+import uuid
+
+import httpx
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.middleware import Middleware
+
+from core.config import config
+from core.container import Container
+from core.db.idempotency import COMPLETED, IN_PROGRESS, IdempotencyStore
+from core.middlewares.idempotency import IdempotencyMiddleware
+
+
+class FakeStore:
+    """IdempotencyStore's claim/complete/release over a dict; locks never lapse"""
+
+    def __init__(self):
+        self.records = {}
+        self.claims = 0
+
+    async def claim(self, key, fingerprint):
+        self.claims += 1
+        existing = self.records.get(key)
+        if existing is not None:
+            return None, dict(existing)
+        owner = uuid.uuid4().hex
+        self.records[key] = {"_id": key, "fingerprint": fingerprint, "owner": owner, "status": IN_PROGRESS}
+        return owner, None
+
+    def _owned(self, key, owner):
+        record = self.records.get(key)
+        return record is not None and record["owner"] == owner and record["status"] == IN_PROGRESS
+
+    async def complete(self, key, owner, response):
+        if not self._owned(key, owner):
+            return None
+        self.records[key].update(response, status=COMPLETED)
+        return dict(self.records[key])
+
+    async def release(self, key, owner):
+        if self._owned(key, owner):
+            del self.records[key]
+
+
+class Routes:
+    def __init__(self):
+        self.calls = 0
+        self.release = asyncio.Event()
+        self.release.set()
+        self.fail_with = None
+
+    def app(self, store: FakeStore) -> FastAPI:
+        app = FastAPI(middleware=[Middleware(IdempotencyMiddleware)])
+        app.state.container = Container()
+        app.state.container.register(IdempotencyStore, lambda c: store)
+
+        @app.post("/users", status_code=201)
+        async def create(body: dict):
+            self.calls += 1
+            await self.release.wait()
+            if self.fail_with == "error":
+                raise RuntimeError("boom")
+            if self.fail_with is not None:
+                raise HTTPException(status_code=self.fail_with, detail="failed")
+            return {"call": self.calls, **body}
+
+        return app
+
+
+@pytest.fixture
+def store():
+    return FakeStore()
+
+
+@pytest.fixture
+def routes():
+    return Routes()
+
+
+@pytest.fixture
+async def client(store, routes):
+    transport = httpx.ASGITransport(app=routes.app(store))
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+
+
+def post(client, body, key="key-1"):
+    return client.post("/users", json=body, headers={config.IDEMPOTENCY_HEADER: key})
+
+
+async def test_stored_response_is_replayed(client, routes):
+    first = await post(client, {"name": "a"})
+    again = await post(client, {"name": "a"})
+    assert (first.status_code, again.status_code) == (201, 201)
+    assert again.json() == first.json() == {"call": 1, "name": "a"}
+    assert again.headers["idempotent-replayed"] == "true"
+    assert "idempotent-replayed" not in first.headers
+    assert routes.calls == 1
+
+
+async def test_key_reused_with_another_body_is_rejected(client, routes):
+    await post(client, {"name": "a"})
+    reused = await post(client, {"name": "b"})
+    assert reused.status_code == 422
+    assert reused.json()["error_code"] == "IDEMPOTENCY_KEY_REUSED"
+    assert routes.calls == 1
+
+
+async def test_duplicate_in_process_waits_for_the_leader(client, routes, store):
+    routes.release.clear()
+    leader = asyncio.create_task(post(client, {"name": "a"}))
+    follower = asyncio.create_task(post(client, {"name": "a"}))
+    await asyncio.sleep(0.05)
+    assert not follower.done()
+    routes.release.set()
+    first, second = await leader, await follower
+    assert second.json() == first.json()
+    assert second.headers["idempotent-replayed"] == "true"
+    # The follower waited on the leader's future rather than asking the store
+    assert (routes.calls, store.claims) == (1, 1)
+
+
+async def test_duplicate_gives_up_with_409_when_the_wait_times_out(client, routes, monkeypatch):
+    monkeypatch.setattr(config, "IDEMPOTENCY_WAIT_SECONDS", 0.05)
+    routes.release.clear()
+    leader = asyncio.create_task(post(client, {"name": "a"}))
+    await asyncio.sleep(0.01)
+    conflict = await post(client, {"name": "a"})
+    assert conflict.status_code == 409
+    assert conflict.headers["retry-after"] == "1"
+    routes.release.set()
+    assert (await leader).status_code == 201
+
+
+@pytest.mark.parametrize("failure", [500, 429, "error"])
+async def test_failure_releases_the_key_for_a_retry(client, routes, store, failure):
+    routes.fail_with = failure
+    if failure == "error":
+        with pytest.raises(RuntimeError):
+            await post(client, {"name": "a"})
+    else:
+        assert (await post(client, {"name": "a"})).status_code == failure
+    assert store.records == {}
+
+    routes.fail_with = None
+    retry = await post(client, {"name": "a"})
+    assert retry.status_code == 201
+    assert "idempotent-replayed" not in retry.headers
+    assert routes.calls == 2
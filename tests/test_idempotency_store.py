@@ -0,0 +1,50 @@
+# tests/test_idempotency_store.py
+"""IdempotencyStore against a real server (see the mongo_uri fixture); skips without one"""
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+from core.db.database import MongoDBConnection
+from core.db.idempotency import COMPLETED, IN_PROGRESS, IdempotencyStore
+
+
+@pytest.fixture
+async def store(mongo_uri):
+    db = MongoDBConnection.connect(mongo_uri, f"idempotency_{uuid.uuid4().hex[:12]}", "idempotency")
+    yield IdempotencyStore(db, ttl_seconds=3600, lock_seconds=30)
+    await db.client.drop_database(db.db_name)
+    await db.close()
+
+
+async def abandon(store: IdempotencyStore, key: str) -> None:
+    await store.collection.update_one({"_id": key}, {"$set": {"locked_until": datetime.utcnow() - timedelta(seconds=1)}})
+
+
+async def test_second_claim_sees_the_first(store):
+    owner, _ = await store.claim("k", "f")
+    assert owner is not None
+    assert await store.claim("k", "f") == (None, await store.collection.find_one({"_id": "k"}))
+
+
+async def test_stale_owner_cannot_release_or_complete_a_taken_over_claim(store):
+    stale, _ = await store.claim("k", "f")
+    await abandon(store, "k")
+    current, _ = await store.claim("k", "f")
+    assert current not in (None, stale)
+
+    await store.release("k", stale)
+    assert await store.complete("k", stale, {"status_code": 200}) is None
+    record = await store.collection.find_one({"_id": "k"})
+    assert (record["status"], record["owner"]) == (IN_PROGRESS, current)
+
+    assert (await store.complete("k", current, {"status_code": 201}))["status"] == COMPLETED
+    assert (await store.collection.find_one({"_id": "k"}))["status_code"] == 201
+
+
+async def test_abandoned_claim_is_not_taken_over_by_another_request(store):
+    first, _ = await store.claim("k", "f")
+    await abandon(store, "k")
+    owner, existing = await store.claim("k", "other body")
+    assert owner is None
+    assert (existing["fingerprint"], existing["owner"]) == ("f", first)
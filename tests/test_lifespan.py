@@ -0,0 +1,17 @@
+# tests/test_lifespan.py
+from app.server import create_app
+from core.db.database import MongoDBConnection
+
+
+async def test_lifespans_back_to_back_each_get_a_working_connection(stand_in_mongo, monkeypatch):
+    monkeypatch.setenv("MONGODB_URI", stand_in_mongo.uri)
+    monkeypatch.setattr(MongoDBConnection, "_instance", None)
+    connections = []
+    for _ in range(2):
+        app = create_app()
+        async with app.router.lifespan_context(app):
+            db = app.state.container.resolve(MongoDBConnection)
+            assert (await db.client.admin.command("ping"))["ok"] == 1.0
+            connections.append(db)
+    assert connections[0] is not connections[1]
+    assert MongoDBConnection._instance is None
@@ -0,0 +1,43 @@
+# tests/test_partitioned_repo.py
+from datetime import datetime
+
+import pytest
+
+from app.user.user_model import User
+from app.user.user_partitioned_repo import PartitionedUserRepository
+from core.config import config
+from core.db.database import MongoDBConnection
+from core.db.partitions import PartitionSet
+from tests.stand_in_mongo import StandInMongo
+
+
+@pytest.fixture
+async def partitions(monkeypatch):
+    # The stand-in can't explain queries
+    monkeypatch.setattr(config, "QUERY_PLAN_GUARD", "off")
+    servers = {name: StandInMongo() for name in ("a", "b")}
+    for server in servers.values():
+        server.start()
+    partition_set = PartitionSet({name: MongoDBConnection.connect(server.uri, name=f"mongodb:{name}") for name, server in servers.items()})
+    yield partition_set, servers
+    await partition_set.close()
+    for server in servers.values():
+        server.shutdown()
+
+
+def stored_user(id: str) -> dict:
+    now = datetime.utcnow()
+    user = User(_id=id, username="alice", email="alice@example.com", password_hash="x", full_name="Alice")
+    return {**user.model_dump(by_alias=True), "created_at": now, "updated_at": now, "is_deleted": False}
+
+
+async def test_find_by_id_falls_back_to_the_other_partitions(partitions):
+    partition_set, servers = partitions
+    users = PartitionedUserRepository(partition_set)
+    stranger = next(name for name in servers if name != partition_set.owner("u1"))
+    # Not moved to its owner yet, as during a rebalance
+    servers[stranger].collections["users"] = [stored_user("u1")]
+
+    found = await users.find(users.query().eq("id", "u1"), "test_find_by_id")
+    assert [user.id for user in found] == ["u1"]
+    assert await users.find(users.query().eq("id", "missing"), "test_find_by_id") == []
@@ -0,0 +1,64 @@
+# tests/test_query_plan.py
+import pytest
+
+from app.common.query import CompiledQuery, Query, UnindexedQueryException, check_query_plan
+from app.user.user_model import User
+
+
+class ExplainedCollection:
+    """Answers explain() with a fixed winning plan and counts how often it was asked"""
+
+    name = "users"
+
+    def __init__(self, winning_plan):
+        self.winning_plan = winning_plan
+        self.explains = 0
+
+    def find(self, filter, projection=None):
+        return self
+
+    def sort(self, sort):
+        return self
+
+    def limit(self, limit):
+        return self
+
+    async def explain(self):
+        self.explains += 1
+        return {"queryPlanner": {"winningPlan": self.winning_plan}}
+
+
+COLLSCAN = {"stage": "COLLSCAN"}
+IXSCAN = {"stage": "FETCH", "inputStage": {"stage": "IXSCAN", "indexName": "email_1"}}
+
+
+async def test_error_mode_rejects_every_call_for_a_bad_shape():
+    # TestConfig runs the guard in "error" mode
+    collection = ExplainedCollection(COLLSCAN)
+    for _ in range(3):
+        with pytest.raises(UnindexedQueryException):
+            await check_query_plan(collection, "test_collscan", CompiledQuery({"nickname": "x"}))
+    assert collection.explains == 1
+
+
+async def test_indexed_shape_is_explained_once():
+    collection = ExplainedCollection(IXSCAN)
+    for _ in range(3):
+        await check_query_plan(collection, "test_indexed", CompiledQuery({"email": "a@example.com"}))
+    assert collection.explains == 1
+
+
+def test_operators_on_one_field_combine():
+    assert Query(User).eq("status", "active").ne("roles", "x").lt("status", "b").compile().filter == {
+        "status": {"$eq": "active", "$lt": "b"}, "roles": {"$ne": "x"},
+    }
+
+
+@pytest.mark.parametrize("build", [
+    lambda q: q.eq("status", "a").eq("status", "b"),
+    lambda q: q.gte("created_at", 1).gte("created_at", 2),
+    lambda q: q.gt("status", "a").eq("status", "b").eq("status", "c"),
+])
+def test_repeated_operator_on_a_field_is_rejected(build):
+    with pytest.raises(ValueError):
+        build(Query(User))
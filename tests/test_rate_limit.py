@@ -0,0 +1,173 @@
+# tests/test_rate_limit.py
+import asyncio
+import hashlib
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.middleware import Middleware
+from starlette.requests import Request
+
+from app.server import init_middleware
+from core.config import config
+from core.container import Container
+from core.db.circuit_breaker import CircuitState
+from core.middlewares.idempotency import IdempotencyMiddleware
+from core.middlewares.rate_limit import RateLimitMiddleware, client_key
+from core.security.rate_limit import LocalBuckets, TokenBucketLimiter
+from core.security.jwt import ACCESS_TOKEN, create_token
+
+
+def request(**headers) -> Request:
+    return Request({
+        "type": "http", "method": "GET", "path": "/users", "query_string": b"", "client": ("203.0.113.7", 50000),
+        "headers": [(name.replace("_", "-").lower().encode(), value.encode()) for name, value in headers.items()],
+    })
+
+
+def test_known_api_key_gets_its_own_bucket(monkeypatch):
+    monkeypatch.setattr(config, "RATE_LIMIT_API_KEY_HASHES", [hashlib.sha256(b"partner-key").hexdigest()])
+    assert client_key(request(x_api_key="partner-key")).startswith("key:")
+
+
+def test_unknown_api_key_counts_against_the_address():
+    assert client_key(request(x_api_key="made-up")) == "ip:203.0.113.7"
+
+
+def test_bearer_subject_only_when_the_token_verifies(jwt_keys):
+    token = create_token("u1", ACCESS_TOKEN)
+    assert client_key(request(authorization=f"Bearer {token}")) == "sub:u1"
+    assert client_key(request(authorization="Bearer not-a-token")) == "ip:203.0.113.7"
+
+
+def test_rate_limit_runs_outside_idempotency(monkeypatch):
+    monkeypatch.setattr(config, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(config, "IDEMPOTENCY_ENABLED", True)
+    classes = [middleware.cls for middleware in init_middleware()]
+    assert classes.index(RateLimitMiddleware) < classes.index(IdempotencyMiddleware)
+
+
+@pytest.mark.parametrize("status_code, stored", [
+    (200, True), (201, True), (204, True), (400, True), (404, True), (422, True),
+    (302, False), (401, False), (403, False), (409, False), (429, False), (500, False), (503, False),
+])
+def test_only_final_responses_are_stored(status_code, stored):
+    assert IdempotencyMiddleware._storable(status_code) is stored
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class FakeRedis:
+    """RedisBuckets stand-in: LocalBuckets on the same clock, counting calls; can fail or stall"""
+
+    def __init__(self, rate: float, capacity: int, clock: FakeClock):
+        self.buckets = LocalBuckets(rate, capacity, clock=clock)
+        self.calls = 0
+        self.error = None
+        self.gate = None
+
+    async def take(self, client, requested):
+        self.calls += 1
+        if self.gate is not None:
+            await self.gate.wait()
+        if self.error is not None:
+            raise self.error
+        return await self.buckets.take(client, requested)
+
+    async def aclose(self):
+        pass
+
+
+def limiter(rate: float = 1.0, burst: int = 2, local_batch: int = 1):
+    clock = FakeClock()
+    redis = FakeRedis(rate, burst, clock)
+    return TokenBucketLimiter(rate, burst, local_batch, redis=redis, clock=clock), redis, clock
+
+
+async def test_local_buckets_refill_at_the_rate():
+    clock = FakeClock()
+    buckets = LocalBuckets(rate=2.0, capacity=2, clock=clock)
+    assert await buckets.take("c", 5) == (2, 0.0)
+    assert await buckets.take("c", 1) == (0, 0.5)
+    clock.now = 0.25
+    assert await buckets.take("c", 1) == (0, 0.25)
+    clock.now = 0.5
+    assert await buckets.take("c", 1) == (1, 0.0)
+
+
+async def test_burst_then_refusal_with_retry_after():
+    tokens, _, clock = limiter(rate=0.5, burst=2)
+    assert [await tokens.acquire("c") for _ in range(2)] == [0.0, 0.0]
+    assert await tokens.acquire("c") == 2.0
+    clock.now = 2.0
+    assert await tokens.acquire("c") == 0.0
+    # Buckets are per client
+    assert await tokens.acquire("other") == 0.0
+
+
+async def test_refusal_is_remembered_until_its_retry_time():
+    tokens, redis, clock = limiter(rate=1.0, burst=1)
+    await tokens.acquire("c")
+    assert await tokens.acquire("c") == 1.0
+    calls = redis.calls
+    clock.now = 0.75
+    assert await tokens.acquire("c") == 0.25
+    assert redis.calls == calls
+    clock.now = 1.0
+    assert await tokens.acquire("c") == 0.0
+    assert redis.calls == calls + 1
+
+
+async def test_tokens_are_taken_in_batches_and_lapse():
+    tokens, redis, clock = limiter(rate=1.0, burst=10, local_batch=5)
+    assert [await tokens.acquire("c") for _ in range(5)] == [0.0] * 5
+    assert redis.calls == 1
+    await tokens.acquire("c")
+    assert redis.calls == 2
+    # Four local tokens left, but the grant lapses after 5 tokens' worth of refill time
+    clock.now = 5.1
+    await tokens.acquire("c")
+    assert redis.calls == 3
+
+
+async def test_concurrent_acquires_share_one_backend_call():
+    tokens, redis, _ = limiter(rate=1.0, burst=10, local_batch=5)
+    redis.gate = asyncio.Event()
+    waits = asyncio.gather(*(tokens.acquire("c") for _ in range(3)))
+    await asyncio.sleep(0.01)
+    redis.gate.set()
+    assert await waits == [0.0, 0.0, 0.0]
+    assert redis.calls == 1
+
+
+async def test_falls_back_to_local_buckets_when_redis_fails():
+    tokens, redis, _ = limiter(rate=1.0, burst=100)
+    redis.error = ConnectionError("redis down")
+    assert [await tokens.acquire(f"c{i}") for i in range(5)] == [0.0] * 5
+    # Three failures open the breaker; later requests skip Redis altogether
+    assert tokens._breaker.state == CircuitState.OPEN
+    assert redis.calls == 3
+
+
+async def test_throttled_request_gets_429_with_retry_after(monkeypatch):
+    monkeypatch.setattr(config, "RATE_LIMIT_PATH_PREFIXES", ["/limited"])
+    app = FastAPI(middleware=[Middleware(RateLimitMiddleware)])
+    app.state.container = Container()
+    app.state.container.register(TokenBucketLimiter, lambda c: TokenBucketLimiter(0.4, 1, 1))
+
+    @app.get("/limited")
+    async def limited():
+        return {}
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        assert (await client.get("/limited")).status_code == 200
+        throttled = await client.get("/limited")
+    assert throttled.status_code == 429
+    # 2.5s until the next token, rounded up
+    assert throttled.headers["retry-after"] == "3"
@@ -0,0 +1,97 @@
+# tests/test_response_cache.py
+import httpx
+import pytest
+from starlette.requests import Request
+
+from api.dependencies import container
+from app.server import create_app
+from app.user.interfaces.i_user_repo import IUserRepository
+from app.user.user_memory_repo import InMemoryUserRepository
+from core.cache.response_cache import ResponseCache, response_cache
+from core.config import config
+from core.container import Scope
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_entries_expire_after_the_ttl():
+    clock = FakeClock()
+    cache = ResponseCache(ttl_seconds=30, clock=clock)
+    cache.set("k", b"[]")
+    clock.now = 30.0
+    assert cache.get("k") == b"[]"
+    clock.now = 30.1
+    assert cache.get("k") is None
+
+
+def test_least_recently_used_entry_is_evicted_at_capacity():
+    cache = ResponseCache(max_entries=2)
+    cache.set("a", b"1")
+    cache.set("b", b"2")
+    cache.get("a")
+    cache.set("c", b"3")
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (b"1", None, b"3")
+
+
+async def test_failures_from_produce_are_not_cached(monkeypatch):
+    monkeypatch.setattr(config, "RESPONSE_CACHE_ENABLED", True)
+    cache = ResponseCache()
+    request = Request({"type": "http", "method": "GET", "path": "/things", "query_string": b"", "headers": []})
+    calls = []
+
+    async def produce():
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("database unavailable")
+        return b"[1]"
+
+    with pytest.raises(RuntimeError):
+        await cache.respond(request, ("things",), {}, list, produce)
+    response = await cache.respond(request, ("things",), {}, list, produce)
+    assert (response.body, response.headers["x-cache"], len(calls)) == (b"[1]", "MISS", 2)
+
+
+@pytest.fixture
+async def client(monkeypatch):
+    monkeypatch.setattr(config, "RESPONSE_CACHE_ENABLED", True)
+    monkeypatch.setattr(config, "AUTH_REQUIRED", False)
+    monkeypatch.setattr(config, "PASSWORD_HASH_COST", 4)
+    monkeypatch.setattr(config, "PASSWORD_HASH_MIN_COST", 4)
+    response_cache.clear()
+    with container.override(IUserRepository, lambda c: InMemoryUserRepository(), Scope.SINGLETON):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=create_app()), base_url="http://test") as client:
+            yield client
+    response_cache.clear()
+
+
+async def create(client, username: str):
+    response = await client.post("/users", json={
+        "username": username, "email": f"{username}@example.com", "password": "correct horse", "full_name": username.title(),
+    })
+    assert response.status_code == 200
+
+
+async def test_identical_requests_hit_and_other_params_miss(client):
+    await create(client, "alice")
+    first = await client.get("/users")
+    again = await client.get("/users?limit=100&skip=0")
+    other = await client.get("/users?limit=5")
+    assert [r.headers["x-cache"] for r in (first, again, other)] == ["MISS", "HIT", "MISS"]
+    assert again.content == first.content
+
+
+async def test_write_through_the_service_invalidates(client):
+    await create(client, "alice")
+    assert (await client.get("/users")).headers["x-cache"] == "MISS"
+    assert (await client.get("/users")).headers["x-cache"] == "HIT"
+
+    await create(client, "bob")
+    after = await client.get("/users")
+    assert after.headers["x-cache"] == "MISS"
+    assert [user["username"] for user in after.json()] == ["alice", "bob"]
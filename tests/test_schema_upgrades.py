@@ -0,0 +1,31 @@
+# tests/test_schema_upgrades.py
+from app.common.schema import schema_upgrades
+from app.common.search import SEARCH_FIELD, search_key
+from app.user.user_model import User
+
+
+def v1_user(**fields):
+    return {
+        "_id": "u1", "schema_version": 1, "username": "alice", "email": "alice@example.com",
+        "password_hash": "x", "full_name": "Alice", "status": "active", "roles": [], **fields,
+    }
+
+
+def test_v1_user_gets_every_search_key():
+    doc, upgraded = schema_upgrades.upgrade(User, v1_user())
+    assert upgraded
+    assert doc[SEARCH_FIELD] == {field: search_key(doc[field], "u1") for field in User.SEARCH_FIELDS}
+    User.model_validate(doc)
+
+
+def test_v1_user_updated_before_migration_keeps_its_key_and_gains_the_rest():
+    # update() on an unmigrated document $sets only "search.full_name"
+    stored = v1_user(full_name="Alice Liddell", search={"full_name": search_key("Alice Liddell", "u1")})
+    doc, _ = schema_upgrades.upgrade(User, stored)
+    assert doc[SEARCH_FIELD] == {
+        "username": search_key("alice", "u1"),
+        "email": search_key("alice@example.com", "u1"),
+        "full_name": search_key("Alice Liddell", "u1"),
+    }
+    # The stored document is left alone
+    assert stored[SEARCH_FIELD] == {"full_name": search_key("Alice Liddell", "u1")}
@@ -0,0 +1,55 @@
+# tests/test_transactions.py
+"""
+Outbox writes run in a transaction that is retried on transient errors. The
+tests inject those errors with the failCommand fail point, so they need a
+replica set started with enableTestCommands and skip otherwise.
+"""
+import uuid
+from contextlib import suppress
+
+import pytest
+from pymongo.errors import OperationFailure
+
+from app.user.user_model import User
+from app.user.user_repo import UserRepository
+from core.config import config
+from core.db.database import MongoDBConnection
+
+
+@pytest.fixture
+async def db(replica_set_uri, monkeypatch):
+    monkeypatch.setattr(config, "OUTBOX_ENABLED", True)
+    db = MongoDBConnection.connect(replica_set_uri, f"transactions_{uuid.uuid4().hex[:12]}", "transactions")
+    yield db
+    with suppress(OperationFailure):
+        await db.client.admin.command("configureFailPoint", "failCommand", mode="off")
+    await db.client.drop_database(db.db_name)
+    await db.close()
+
+
+async def fail_next(db: MongoDBConnection, command: str, label: str) -> None:
+    try:
+        await db.client.admin.command(
+            "configureFailPoint", "failCommand", mode={"times": 1},
+            data={"failCommands": [command], "errorCode": 112, "errorLabels": [label]},
+        )
+    except OperationFailure:
+        pytest.skip("failCommand needs a server started with enableTestCommands")
+
+
+@pytest.mark.parametrize("command, label", [
+    ("insert", "TransientTransactionError"),
+    ("commitTransaction", "TransientTransactionError"),
+    ("commitTransaction", "UnknownTransactionCommitResult"),
+])
+async def test_create_survives_a_transient_failure(db, command, label):
+    users = UserRepository(db)
+    await users.collection.insert_one({"_id": "setup"})  # collections can't be created inside the transaction
+    await users.outbox.collection.insert_one({"_id": "setup"})
+    await fail_next(db, command, label)
+
+    created = await users.create(User(_id="u1", username="alice", email="alice@example.com", password_hash="x", full_name="Alice"))
+
+    assert created.id == "u1"
+    assert await users.collection.count_documents({"_id": "u1"}) == 1
+    assert await users.outbox.collection.count_documents({"doc_id": "u1"}) == 1
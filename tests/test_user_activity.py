@@ -0,0 +1,49 @@
+# tests/test_user_activity.py
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+
+from api.dependencies import container
+from app.server import create_app
+from app.user.interfaces.i_user_repo import IUserRepository
+from app.user.user_memory_repo import InMemoryUserRepository
+from app.user.user_service import UserService
+from core.config import config
+from core.container import Scope
+from core.exceptions.base import BadRequestException
+
+UNTIL = datetime(2026, 3, 31, 12)
+
+
+@pytest.fixture
+async def service():
+    users = InMemoryUserRepository()
+    await users.activity.record("u1", "login", at=UNTIL - timedelta(days=2))
+    await users.activity.record("u2", "login", at=UNTIL - timedelta(days=20))
+    return UserService(users)
+
+
+async def test_window_up_to_the_cap(service):
+    result = await service.get_active_users_between(UNTIL - timedelta(days=config.ACTIVITY_MAX_WINDOW_DAYS), UNTIL)
+    assert result["count"] == 2
+    assert [user["user_id"] for user in result["users"]] == ["u1", "u2"]
+
+
+async def test_window_wider_than_the_cap_is_rejected(service):
+    with pytest.raises(BadRequestException):
+        await service.get_active_users_between(UNTIL - timedelta(days=config.ACTIVITY_MAX_WINDOW_DAYS, seconds=1), UNTIL)
+
+
+async def test_aware_bounds_are_read_as_utc(service, monkeypatch):
+    monkeypatch.setattr(config, "AUTH_REQUIRED", False)
+    with container.override(IUserRepository, lambda c: service.user_repository, Scope.SINGLETON):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=create_app()), base_url="http://test") as client:
+            response = await client.get("/users/active", params={
+                "since": (UNTIL - timedelta(days=3)).isoformat() + "Z",
+                # 14:00 at +02:00 is UNTIL, 12:00 UTC
+                "until": (UNTIL + timedelta(hours=2)).isoformat() + "+02:00",
+            })
+    assert response.status_code == 200
+    assert response.json()["count"] == 1
+    assert response.json()["until"].startswith(UNTIL.isoformat())
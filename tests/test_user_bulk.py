@@ -0,0 +1,75 @@
+# tests/test_user_bulk.py
+from datetime import datetime
+
+from click.testing import CliRunner
+
+from app.common.search import SEARCH_FIELD
+from app.user.user_bulk import find_user_conflicts, prepare_user_document
+from main import main
+
+
+def record(**fields):
+    return {"username": "alice", "email": "alice@example.com", "password_hash": "$2b$12$hash", "full_name": "Alice", **fields}
+
+
+def test_valid_record_gets_defaults():
+    doc = prepare_user_document(record(_id="u1"))
+    assert doc["_id"] == "u1"
+    assert isinstance(doc["created_at"], datetime)
+    assert doc["is_deleted"] is False
+    assert doc[SEARCH_FIELD]["username"].startswith("alice")
+    # Stored as imported; upgraded to the current schema on read
+    assert "schema_version" not in doc
+
+
+def test_plaintext_or_missing_fields_are_rejected():
+    assert prepare_user_document(record(password="secret")) is None
+    assert prepare_user_document(record(email="")) is None
+
+
+def test_records_that_fail_model_validation_are_rejected():
+    assert prepare_user_document(record(email="not-an-email")) is None
+    assert prepare_user_document(record(username="no spaces allowed")) is None
+    assert prepare_user_document(record(status="banned")) is None
+    assert prepare_user_document(record(full_name=None)) is None
+    assert prepare_user_document(record(roles="admin")) is None
+
+
+class Users:
+    """find() over a list, for the {field: {"$in": [...]}, "is_deleted": False} queries conflict checks make"""
+
+    def __init__(self, *docs):
+        self.docs = list(docs)
+
+    def find(self, filter, projection=None):
+        (field, condition), = ((k, v) for k, v in filter.items() if k != "is_deleted")
+        return [doc for doc in self.docs if doc[field] in condition["$in"] and doc["is_deleted"] == filter["is_deleted"]]
+
+
+def test_conflicts_with_live_users_and_earlier_rows():
+    existing = Users(
+        {"_id": "old", "email": "taken@example.com", "username": "taken", "is_deleted": False},
+        {"_id": "gone", "email": "freed@example.com", "username": "freed", "is_deleted": True},
+    )
+    batch = [
+        record(_id="a", email="taken@example.com", username="a"),
+        record(_id="b", email="b@example.com", username="taken"),
+        record(_id="c", email="freed@example.com", username="freed"),
+        record(_id="d", email="d@example.com", username="d"),
+        record(_id="e", email="d@example.com", username="e"),
+        record(_id="old", email="taken@example.com", username="taken"),
+    ]
+    assert [doc["_id"] for doc in find_user_conflicts(existing, batch)] == ["a", "b", "e"]
+
+
+def test_bulk_commands_refuse_other_backends(tmp_path, monkeypatch):
+    monkeypatch.setenv("REPOSITORY_BACKEND", "partitioned")
+    # main() overwrites these; monkeypatch puts the originals back
+    monkeypatch.setenv("ENV", "test")
+    monkeypatch.setenv("DEBUG", "False")
+    path = tmp_path / "users.ndjson"
+    path.write_text("")
+    for args in (["import-users", str(path)], ["export-users", str(path)]):
+        result = CliRunner().invoke(main, args)
+        assert result.exit_code == 2
+        assert "REPOSITORY_BACKEND=mongo" in result.output
@@ -0,0 +1,160 @@
+# tests/test_user_repo_conformance.py
+"""
+The same behaviour checked against every IUserRepository backend. The Mongo
+run needs a server (see the mongo_uri fixture) and skips without one.
+"""
+import json
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.user.interfaces.i_user_repo import IUserRepository
+from app.user.schemas.user_bulk_request import UserFilter
+from app.user.user_memory_repo import InMemoryUserRepository
+from app.user.user_model import User, UserStatus
+from app.user.user_repo import UserRepository
+from app.user.user_service import UserService
+from core.db.database import MongoDBConnection
+
+
+@pytest.fixture(params=["memory", "mongo"])
+async def users(request):
+    if request.param == "memory":
+        yield InMemoryUserRepository()
+    else:
+        db = MongoDBConnection.connect(request.getfixturevalue("mongo_uri"), f"conformance_{uuid.uuid4().hex[:12]}", "conformance")
+        repository = UserRepository(db)
+        await repository.ensure_indexes()
+        yield repository
+        await db.client.drop_database(db.db_name)
+        await db.close()
+
+
+async def add(users: IUserRepository, id: str, username: str, **fields) -> User:
+    fields = {"email": f"{username}@example.com", "password_hash": "x", "full_name": username.title(), **fields}
+    return await users.create(User(_id=id, username=username, **fields))
+
+
+async def test_create_then_point_reads(users):
+    created = await add(users, "u1", "alice")
+    assert created.id == "u1"
+    assert created.schema_version == User.SCHEMA_VERSION
+    assert not created.is_deleted
+    for found in (
+        await users.get_by_id("u1"),
+        await users.get_by_email("alice@example.com"),
+        await users.get_by_username("alice", consistent=True),
+    ):
+        assert found.id == "u1"
+    assert await users.get_by_id("missing") is None
+    assert await users.get_by_email("nobody@example.com") is None
+
+
+async def test_update(users):
+    created = await add(users, "u1", "alice")
+    updated = await users.update("u1", {"full_name": "Alice Liddell"})
+    assert updated.full_name == "Alice Liddell"
+    assert updated.updated_at >= created.updated_at
+    assert (await users.update_status("u1", UserStatus.SUSPENDED)).status == UserStatus.SUSPENDED
+    assert await users.update("missing", {"full_name": "Nobody"}) is None
+
+
+async def test_delete_is_soft_and_hides_the_user(users):
+    await add(users, "u1", "alice")
+    assert await users.delete("u1")
+    assert await users.get_by_id("u1") is None
+    assert await users.get_by_email("alice@example.com") is None
+    assert await users.get_all() == []
+    assert not await users.delete("u1")
+    assert await users.update("u1", {"full_name": "Ghost"}) is None
+
+
+async def test_get_all_pages_in_creation_order(users):
+    for i, name in enumerate(("alice", "bob", "carol")):
+        await add(users, f"u{i}", name)
+    assert [user.username for user in await users.get_all()] == ["alice", "bob", "carol"]
+    assert [user.username for user in await users.get_all(skip=1, limit=1)] == ["bob"]
+    as_json = json.loads(await users.get_all_json())
+    assert as_json == [json.loads(user.model_dump_json(by_alias=True)) for user in await users.get_all()]
+
+
+async def test_status_and_role_listings(users):
+    await add(users, "u1", "alice", roles=["admin"])
+    await add(users, "u2", "bob", roles=["member"], status=UserStatus.SUSPENDED)
+    await add(users, "u3", "carol", roles=["admin", "member"])
+    assert [user.id for user in await users.get_active_users()] == ["u1", "u3"]
+    assert [user.id for user in await users.get_users_by_role("member")] == ["u2", "u3"]
+    assert [user.id for user in await users.get_users_by_role("admin", skip=1)] == ["u3"]
+
+
+async def test_bulk_update_and_delete(users):
+    await add(users, "u1", "alice", roles=["trial"])
+    await add(users, "u2", "bob", roles=["trial"])
+    await add(users, "u3", "carol")
+
+    trial = lambda: users.query().eq("roles", "trial")
+    assert await users.update_many(trial(), {"status": UserStatus.INACTIVE}, dry_run=True) == {"matched": 2, "modified": 0}
+    assert (await users.get_by_id("u1")).status == UserStatus.ACTIVE
+    assert await users.update_many(trial(), {"status": UserStatus.INACTIVE}) == {"matched": 2, "modified": 2}
+    assert (await users.get_by_id("u2")).status == UserStatus.INACTIVE
+    with pytest.raises(ValueError):
+        await users.update_many(trial(), {"username": "same"})
+
+    assert await users.delete_many(trial(), dry_run=True) == {"matched": 2, "modified": 0}
+    assert await users.delete_many(trial()) == {"matched": 2, "modified": 2}
+    assert [user.id for user in await users.get_all()] == ["u3"]
+
+
+async def test_bulk_filter_with_aware_bounds(users):
+    await add(users, "u1", "alice")
+    await add(users, "u2", "bob")
+    now = datetime.now(timezone.utc)
+    user_filter = UserFilter.model_validate({
+        # Bounds around now written in other zones: as naive wall times they'd match nobody
+        "created_after": (now - timedelta(minutes=1)).astimezone(timezone(timedelta(hours=2))).isoformat(),
+        "created_before": (now + timedelta(minutes=1)).astimezone(timezone(timedelta(hours=-5))).isoformat(),
+    })
+    result = await UserService(users).bulk_update_users(user_filter, {"is_active": False}, dry_run=True)
+    assert result == {"matched": 2, "modified": 0}
+
+
+async def test_prefix_search_with_cursor(users):
+    await add(users, "u1", "alice")
+    await add(users, "u2", "alfred", full_name="Alfred Pennyworth")
+    await add(users, "u3", "bob", full_name="Alan Bob")
+
+    page, cursor = await users.search("AL", ["username"], limit=1)
+    assert [user.username for user in page] == ["alfred"]
+    page, cursor = await users.search("al", ["username"], limit=1, cursor=cursor)
+    assert [user.username for user in page] == ["alice"]
+    page, _ = await users.search("al", ["username"], limit=1, cursor=cursor)
+    assert page == []
+
+    page, _ = await users.search("al", ["username", "full_name"], limit=10)
+    assert sorted(user.id for user in page) == ["u1", "u2", "u3"]
+
+
+async def test_stats_follow_writes(users):
+    await add(users, "u1", "alice", roles=["admin"])
+    await add(users, "u2", "bob", status=UserStatus.SUSPENDED)
+    await add(users, "u3", "carol")
+    await users.delete("u3")
+    await users.update_status("u2", UserStatus.ACTIVE)
+
+    stats = await users.get_stats()
+    assert stats["live"] == 2
+    assert stats["deleted"] == 1
+    assert stats["by_status"]["active"] == 2
+    assert stats["by_status"].get("suspended", 0) == 0
+    assert stats["by_role"]["admin"] == 1
+
+
+async def test_login_history(users):
+    await add(users, "u1", "alice")
+    await users.update_last_login("u1")
+    await users.update_last_login("u1")
+    logins = await users.get_recent_logins("u1", limit=5)
+    assert len(logins) == 2
+    assert logins[0] >= logins[1]
+    assert (await users.get_by_id("u1")).last_login is not None